@@ -0,0 +1,11 @@
+#!/bin/sh
+# Run the benchmark suite with "src" as working directory and compare against the stored baseline.
+# Regressions are reported but do not fail the run; pass --strict to exit with 1 on them, which is
+# only meaningful on the quiet machine the baseline was recorded on.
+# Extra arguments go to benchmark.py, e.g. --output ../benchmarks/baseline.json --repeat 20 to
+# record a new baseline.
+BASE_DIR=`pwd`
+(
+    cd "$BASE_DIR/src" &&
+    python3 benchmark.py --baseline "$BASE_DIR/benchmarks/baseline.json" "$@"
+)
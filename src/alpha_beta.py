@@ -0,0 +1,272 @@
+import time
+
+import numpy as np
+import bitmask
+import quoridor
+from zobrist import TranspositionTable, POLICY_DEPTH
+
+# Baseline agents that need no model. AlphaBetaAgent runs an iterative deepening alpha-beta search
+# under a time budget; positions are scored by how much shorter the agent's path to its goal is
+# than the closest opponent's. With more than two players the opponents are treated as one side
+# that minimizes the agent's score.
+#
+# Wall moves are limited to walls crossing an opponent's current shortest path (the only ones that
+# can make it longer), which keeps the branching factor around 20 instead of 130 on 9x9.
+# The transposition table and the history scores are kept between moves. The search plays moves on
+# the game it is given with make_move/unmake_move and leaves it as it found it.
+
+WIN = 10000
+# scores beyond this are wins or losses, evaluations stay far below it
+WIN_BOUND = WIN // 2
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+DEFAULT_TIME_BUDGET = 0.5
+DEFAULT_MAX_DEPTH = 12
+DEFAULT_TABLE_SIZE = 1 << 16
+
+
+class _Timeout(Exception):
+    pass
+
+
+# Win scores count plies from the root. The table keeps them as plies from the stored node, so
+# an entry reached at another ply (or from another root) still gives the right distance to the win.
+def to_table_score(value, ply):
+    if value >= WIN_BOUND:
+        return value + ply
+    if value <= -WIN_BOUND:
+        return value - ply
+    return value
+
+
+def from_table_score(value, ply):
+    if value >= WIN_BOUND:
+        return value - ply
+    if value <= -WIN_BOUND:
+        return value + ply
+    return value
+
+
+class RandomAgent:
+    def __init__(self, num_of_actions=None, seed=None):
+        self.num_of_actions = num_of_actions
+        self.rnd = np.random.default_rng(seed)
+
+    def act(self, game, player):
+        legal = legal_actions(game, player, self.num_of_actions)
+        return int(self.rnd.choice(legal)) if len(legal) else 0
+
+
+# legal actions below num_of_actions; None allows walls, 4 is the env's steps only action space
+def legal_actions(game, player, num_of_actions=None):
+    if num_of_actions is not None and num_of_actions <= 4:
+        return np.flatnonzero(game.legal_step_mask(player)[:num_of_actions])
+    mask = game.legal_action_mask(player)
+    return np.flatnonzero(mask if num_of_actions is None else mask[:num_of_actions])
+
+
+class AlphaBetaAgent:
+    def __init__(self, num_of_actions=None, time_budget=DEFAULT_TIME_BUDGET, max_depth=DEFAULT_MAX_DEPTH,
+                 table_size=DEFAULT_TABLE_SIZE, wall_weight=0.25, check_every=64):
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError('time_budget must be positive, got {}'.format(time_budget))
+        self.num_of_actions = num_of_actions
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.wall_weight = wall_weight
+        self.check_every = check_every
+        # one table per root player, scores are from that player's point of view
+        self.tables = {}
+        self.history = {}
+        self.killers = {}
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+
+    def table(self, player):
+        if player not in self.tables:
+            self.tables[player] = TranspositionTable(self.table_size, POLICY_DEPTH)
+        return self.tables[player]
+
+    def act(self, game, player):
+        return self.search(game, player)[0]
+
+    # (action, score, completed depth) for player to move in game
+    def search(self, game, player):
+        self.root_player = player
+        self.num_of_players = game.num_of_players
+        self.deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        self.nodes = 0
+        self.killers = {}
+        # older history still orders moves, recent cutoffs count more
+        for key in self.history:
+            self.history[key] //= 2
+        self._table = self.table(player)
+        legal = self._ordered_moves(game, player, None, 0)
+        best = (int(legal[0]) if legal else 0), self.evaluate(game), 0
+        for depth in range(1, self.max_depth + 1):
+            self._root_move = None
+            try:
+                # the first iteration always completes so there is a searched move to return
+                self._can_stop = depth > 1
+                score = self._search(game, player, depth, -np.inf, np.inf, 0)
+            except _Timeout:
+                break
+            if self._root_move is not None:
+                best = self._root_move, score, depth
+            if abs(score) >= WIN - self.max_depth:
+                break
+        self.depth = best[2]
+        self.score = best[1]
+        return best
+
+    def evaluate(self, game):
+        distances = [self._distance(game, p) for p in range(game.num_of_players)]
+        opponents = [p for p in range(game.num_of_players) if p != self.root_player]
+        closest = min(distances[p] for p in opponents)
+        walls = min(game.dominoes[p] for p in opponents)
+        return closest - distances[self.root_player] + self.wall_weight * (game.dominoes[self.root_player] - walls)
+
+    @staticmethod
+    def _distance(game, player):
+        d = game.shortest_path_for_player_to_win(player)
+        return game.sx * game.sy if d == -1 else d
+
+    def _search(self, game, to_move, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self._can_stop and self.deadline is not None and self.nodes % self.check_every == 0 \
+                and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        finished, winner = game.is_finished()
+        if finished:
+            if winner == -1:
+                return 0
+            return WIN - ply if winner == self.root_player else ply - WIN
+        if depth == 0:
+            return self.evaluate(game)
+
+        key = game.state_hash(to_move)
+        entry = self._table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, value, tt_move = entry
+            value = from_table_score(value, ply)
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        next_player = (to_move + 1) % self.num_of_players
+        moves = self._ordered_moves(game, to_move, tt_move, ply)
+        if not moves:
+            # a pawn that cannot move passes
+            return self._search(game, next_player, depth - 1, alpha, beta, ply + 1)
+        maximizing = to_move == self.root_player
+        original_alpha, original_beta = alpha, beta
+        best_value = -np.inf if maximizing else np.inf
+        best_move = moves[0]
+        for move in moves:
+            undo = game.make_move(move, to_move)
+            try:
+                value = self._search(game, next_player, depth - 1, alpha, beta, ply + 1)
+            finally:
+                game.unmake_move(undo)
+            if maximizing and value > best_value or not maximizing and value < best_value:
+                best_value, best_move = value, move
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                self._cutoff(to_move, move, depth, ply)
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._table.put(key, (depth, flag, to_table_score(best_value, ply), best_move), depth)
+        if ply == 0:
+            self._root_move = best_move
+        return best_value
+
+    def _cutoff(self, player, move, depth, ply):
+        key = (player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    # transposition table move, killers, then by history; steps before walls on ties
+    def _ordered_moves(self, game, player, tt_move, ply):
+        moves = [int(m) for m in np.flatnonzero(game.legal_step_mask(player)[:self.num_of_actions or 4])]
+        if (self.num_of_actions is None or self.num_of_actions > 4) and game.dominoes[player] > 0:
+            mask = game.legal_action_mask(player)
+            if self.num_of_actions is not None:
+                mask = mask[:self.num_of_actions]
+            moves += [4 + slot for slot in self._path_walls(game, player) if 4 + slot < len(mask) and mask[4 + slot]]
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def priority(move):
+            if move == tt_move:
+                return 0, 0
+            if move in killers:
+                return 1, killers.index(move)
+            return 2, -history.get((player, move), 0) - (move < 4)
+
+        moves.sort(key=priority)
+        return moves
+
+    # wall slots crossing one shortest path of each player the mover plays against
+    def _path_walls(self, game, player):
+        opponents = [p for p in range(game.num_of_players) if p != player] if player == self.root_player \
+            else [self.root_player]
+        move_right, move_down = game.move_masks()
+        goals = bitmask.board_masks(game.sx, game.sy)[2]
+        slots = set()
+        for opponent in opponents:
+            goal = goals[opponent]
+            layers = bitmask.flood_layers(int(game.positions[opponent]), goal, move_right, move_down, game.sy)
+            if layers is None:
+                continue
+            for edge in bitmask.path_edges(layers, goal, move_right, move_down, game.sy):
+                slots.update(game.edge_slots.get(edge, ()))
+        return sorted(slots)
+
+    def stats(self):
+        return {
+            'nodes': self.nodes,
+            'depth': self.depth,
+            'score': float(self.score),
+            'table': {player: table.stats() for player, table in self.tables.items()}
+        }
+
+
+# plays one game between agents (one per seat, each with act(game, player)); returns the moves
+# and the winner, -1 for a draw or when max_moves runs out
+def play_game(agents, sx=9, sy=9, engine=quoridor.ENGINE_ARRAY, first_player=0, max_moves=500, game=None):
+    game = quoridor.create_game(len(agents), sx, sy, engine) if game is None else game
+    player = first_player
+    moves = []
+    for _ in range(max_moves):
+        finished, winner = game.is_finished()
+        if finished:
+            return moves, winner
+        move = agents[player].act(game, player)
+        game.do_move(move, player)
+        moves.append(move)
+        player = (player + 1) % len(agents)
+    finished, winner = game.is_finished()
+    return moves, winner if finished else -1
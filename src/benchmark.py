@@ -0,0 +1,240 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import quoridor
+import quoridor_env
+from replay_memory import ReplayMemory, state_dtype
+
+# Reproducible timings of the engine, environment and training hot paths. Every case runs on
+# fixed seeds; results are keyed 'case/engine/SXxSY/Pp' so runs can be diffed against a baseline.
+
+SEED = 1234
+SIZES = [5, 9, 13]
+# --scaling runs every odd size in between as well
+SCALING_SIZES = [5, 7, 9, 11, 13, 15, 17]
+SCALING_CASES = ['do_move', 'legal_action_mask', 'path_to_win', 'shortest_path', 'make_unmake_wall']
+PLAYER_COUNTS = [2, 4]
+ENGINES = [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]
+MOVES_PER_GAME = 100
+ENV_MAX_TURNS = 200
+REPLAY_BATCH_SIZE = 256
+MEMORY_CAPACITY = 10000
+TOLERANCE = 0.5
+
+
+def timed(fn, repeat, number):
+    # best of `repeat` runs of `number` calls after one warm-up call, the least noisy
+    # estimate on a shared machine
+    fn()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def random_moves(game, count, rnd):
+    # half pawn steps, half wall attempts, so games keep moving after the walls run out
+    steps = rnd.integers(0, 4, count)
+    walls = rnd.integers(4, game.num_of_possible_moves(), count)
+    return np.where(rnd.random(count) < 0.5, steps, walls).tolist()
+
+
+def midgame(num_of_players, sx, sy, engine, rnd):
+    game = quoridor.create_game(num_of_players, sx, sy, engine)
+    for turn, move in enumerate(random_moves(game, MOVES_PER_GAME // 2, rnd)):
+        game.do_move(move, turn % num_of_players)
+    return game
+
+
+def bench_do_move(num_of_players, sx, sy, engine, repeat):
+    rnd = np.random.default_rng(SEED)
+    moves = random_moves(quoridor.create_game(num_of_players, sx, sy, engine), MOVES_PER_GAME, rnd)
+
+    # games are built before the clock starts, one per timed call and one for the warm-up
+    games = [quoridor.create_game(num_of_players, sx, sy, engine) for _ in range(repeat + 1)]
+
+    def play():
+        game = games.pop()
+        for turn, move in enumerate(moves):
+            game.do_move(move, turn % num_of_players)
+
+    return {'seconds_per_op': timed(play, repeat, 1) / len(moves)}
+
+
+def bench_game_calls(num_of_players, sx, sy, engine, repeat):
+    game = midgame(num_of_players, sx, sy, engine, np.random.default_rng(SEED))
+    x, y = game.to_coordinates(game.positions[0])
+    # the midgame has no walls left, walls are placed on a fresh board
+    fresh = quoridor.create_game(num_of_players, sx, sy, engine)
+    wall = 4 + (sx - 1) * (sy - 1) // 2
+    return {
+        'shortest_path': {'seconds_per_op': timed(lambda: game.shortest_path(x, y, -1, sy - 1), repeat, 20)},
+        'path_to_win': {'seconds_per_op': timed(lambda: game.shortest_path_for_player_to_win(0), repeat, 100)},
+        'legal_action_mask': {'seconds_per_op': timed(lambda: fresh.legal_action_mask(0), repeat, 20)},
+        'is_finished': {'seconds_per_op': timed(game.is_finished, repeat, 100)},
+        'render': {'seconds_per_op': timed(game.render, repeat, 5)},
+        'copy_do_wall': {'seconds_per_op': timed(lambda: fresh.copy().do_move(wall, 0), repeat, 100)},
+        'make_unmake_wall': {'seconds_per_op': timed(lambda: fresh.unmake_move(fresh.make_move(wall, 0)), repeat, 100)},
+        'state_view': {'seconds_per_op': timed(lambda: game.state_view(0), repeat, 100)}
+    }
+
+
+# QuoridorEnv keyword arguments for a board size
+def env_size(num_of_players, sx, sy):
+    return {'num_of_players': num_of_players, 'sx': sx, 'sy': sy}
+
+
+def bench_env_games(num_of_players, sx, sy, engine, games, repeat):
+    steps = []
+
+    def play():
+        env = quoridor_env.QuoridorEnv(engine=engine, **env_size(num_of_players, sx, sy))
+        rnd = np.random.default_rng(SEED)
+        steps.clear()
+        for _ in range(games):
+            env.reset()
+            for action in rnd.integers(0, 4, ENV_MAX_TURNS).tolist():
+                steps.append(action)
+                if env.step(action)[2]:
+                    break
+
+    elapsed = timed(play, repeat, 1)
+    return {'games_per_second': games / elapsed, 'steps_per_second': len(steps) / elapsed}
+
+
+def bench_memory(num_of_players, sx, sy):
+    state_size = quoridor_env.observation_size(num_of_players, sx, sy)
+    memory = ReplayMemory(MEMORY_CAPACITY, state_size, state_dtype(sx, sy), 4)
+    return {'bytes_per_transition': memory.nbytes / MEMORY_CAPACITY, 'nbytes': memory.nbytes}
+
+
+def bench_replay(num_of_players, sx, sy, repeat):
+    import server
+    state_size = quoridor_env.observation_size(num_of_players, sx, sy)
+    # only the parts of D2Solver that replay() touches; the full constructor needs the gym registry
+    solver = server.D2Solver.__new__(server.D2Solver)
+    try:
+        server.init_session()
+        solver.model = server.build_model(state_size, 4)
+    except ImportError as e:
+        return {'skipped': str(e)}
+    solver.gamma = 1.0
+    solver.positive_batch_injection = 10
+    solver.memory = ReplayMemory(MEMORY_CAPACITY, state_size, state_dtype(sx, sy), 4, seed=SEED)
+    solver.q_cache = server.TranspositionTable(1)
+    solver.replay_batch = np.empty(((REPLAY_BATCH_SIZE + solver.positive_batch_injection) * 2, state_size), dtype=np.float32)
+    rnd = np.random.default_rng(SEED)
+    count = REPLAY_BATCH_SIZE * 4
+    states = rnd.integers(0, 8, (count, state_size))
+    solver.memory.extend(states, rnd.integers(0, 4, count), rnd.random(count) < 0.05, np.roll(states, 1, axis=0), rnd.random(count) < 0.05)
+    solver.replay(REPLAY_BATCH_SIZE)
+    return {'seconds_per_op': timed(lambda: solver.replay(REPLAY_BATCH_SIZE), repeat, 1)}
+
+
+def run(sizes=SIZES, player_counts=PLAYER_COUNTS, engines=ENGINES, repeat=5, env_games=20):
+    results = {}
+    for num_of_players in player_counts:
+        for size in sizes:
+            shape = '{}x{}/{}p'.format(size, size, num_of_players)
+            for engine in engines:
+                results['do_move/{}/{}'.format(engine, shape)] = bench_do_move(num_of_players, size, size, engine, repeat)
+                for name, result in bench_game_calls(num_of_players, size, size, engine, repeat).items():
+                    results['{}/{}/{}'.format(name, engine, shape)] = result
+                results['env_games/{}/{}'.format(engine, shape)] = bench_env_games(num_of_players, size, size, engine, env_games, repeat)
+            results['replay_memory/{}'.format(shape)] = bench_memory(num_of_players, size, size)
+            results['replay/{}'.format(shape)] = bench_replay(num_of_players, size, size, repeat)
+    return {
+        'meta': {
+            'seed': SEED,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+# seconds per op of every case and size relative to the smallest size, as text rows
+def scaling_table(results, sizes, num_of_players, engine, cases=SCALING_CASES):
+    rows = ['{:<18}'.format('case') + ''.join('{:>10}'.format('{}x{}'.format(size, size)) for size in sizes)]
+    for case in cases:
+        times = [results.get('{}/{}/{}x{}/{}p'.format(case, engine, size, size, num_of_players), {}).get('seconds_per_op')
+                 for size in sizes]
+        if times[0] is None:
+            continue
+        cells = ''.join('{:>10}'.format('-' if t is None else '{:.1f}x'.format(t / times[0])) for t in times)
+        rows.append('{:<18}'.format(case) + cells + '   ({:.3g} us at {}x{})'.format(times[0] * 1e6, sizes[0], sizes[0]))
+    return rows
+
+
+# (key, metric, baseline, current) for every metric that got worse by more than tolerance
+def compare(current, baseline, tolerance=TOLERANCE):
+    res = []
+    for key, old in baseline['results'].items():
+        new = current['results'].get(key)
+        if new is None:
+            continue
+        for metric, old_value in old.items():
+            new_value = new.get(metric)
+            if not isinstance(old_value, (int, float)) or not isinstance(new_value, (int, float)):
+                continue
+            # times and sizes should go down, rates should go up
+            if metric.endswith('per_second'):
+                worse = new_value < old_value * (1 - tolerance)
+            else:
+                worse = new_value > old_value * (1 + tolerance)
+            if worse:
+                res.append((key, metric, old_value, new_value))
+    return res
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Quoridor benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--players', type=int, nargs='+', default=PLAYER_COUNTS)
+    parser.add_argument('--engines', nargs='+', default=ENGINES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--env-games', type=int, default=20)
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='JSON results to compare against; regressions are reported')
+    parser.add_argument('--strict', action='store_true',
+                        help='exit with 1 on regressions; only meaningful on the quiet machine the baseline came from')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--scaling', action='store_true',
+                        help='run {} and print how every case grows with the board'.format(SCALING_SIZES))
+    args = parser.parse_args(argv)
+
+    sizes = SCALING_SIZES if args.scaling else args.sizes
+    current = run(sizes, args.players, args.engines, args.repeat, args.env_games)
+    if args.scaling:
+        for num_of_players in args.players:
+            for engine in args.engines:
+                print('{} engine, {} players'.format(engine, num_of_players), file=sys.stderr)
+                for row in scaling_table(current['results'], sizes, num_of_players, engine):
+                    print(row, file=sys.stderr)
+    text = json.dumps(current, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(current, json.load(f), args.tolerance)
+        for key, metric, old, new in regressions:
+            print('REGRESSION {} {}: {:.6g} -> {:.6g}'.format(key, metric, old, new), file=sys.stderr)
+        # absolute timings swing with the machine, so by default the comparison is advisory
+        return 1 if regressions and args.strict else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
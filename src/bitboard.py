@@ -0,0 +1,278 @@
+import numpy as np
+import zobrist
+from bitmask import mask_to_array, array_to_mask, board_masks, flood_distance
+from quoridor import QuoridorGame, board_tables, DIR_RIGHT, DIR_DOWN, DIR_RIGHT_AND_DOWN, \
+    MOVE_UP, MOVE_RIGHT, MOVE_DOWN, MOVE_LEFT
+
+# Every cell is one bit at index x * sy + y (same numbering as QuoridorGame positions).
+# Edge bits live in three masks, one per direction, mirroring the bits of QuoridorGame.board.
+# Pawn positions and remaining dominoes are packed into one integer each.
+
+POSITION_BITS = 16
+POSITION_MASK = (1 << POSITION_BITS) - 1
+DOMINO_BITS = 8
+DOMINO_MASK = (1 << DOMINO_BITS) - 1
+
+
+class BitboardQuoridorGame(QuoridorGame):
+    def __init__(self, num_of_players, sx, sy):
+        self.num_of_players = num_of_players
+        self.sx = sx
+        self.sy = sy
+        self.tables = board_tables(sx, sy)
+        self.cells = sx * sy
+        self.full = (1 << self.cells) - 1
+        self.x_masks, self.y_masks, self.goal_masks = board_masks(sx, sy)
+
+        self.pawns = 0
+        for player, position in enumerate(self.init_positions(num_of_players, sx, sy)):
+            self.pawns |= int(position) << (player * POSITION_BITS)
+        self.walls = 0
+        for player in range(num_of_players):
+            self.walls |= 5 << (player * DOMINO_BITS)
+        self.right = self.full
+        self.down = self.full
+        self.diag = self.full
+        self._unpack()
+        self._update_move_masks()
+        self.init_hash()
+        self.init_wall_slots()
+        self._state = None
+
+    # edge masks and packed fields are immutable ints, only the array mirrors need copying
+    def copy(self):
+        game = object.__new__(type(self))
+        game.__dict__.update(self.__dict__)
+        game._positions = np.copy(self._positions)
+        game._dominoes = np.copy(self._dominoes)
+        game._read_only_views()
+        game.wall_free = np.copy(self.wall_free)
+        game._state = None
+        return game
+
+    def _update_move_masks(self):
+        # cells from which a step right / down stays on the board and is not blocked
+        self.move_right = self.right & ~self.x_masks[self.sx - 1]
+        self.move_down = self.down & ~self.y_masks[self.sy - 1]
+        self._board = None
+
+    def position(self, player):
+        return (self.pawns >> (player * POSITION_BITS)) & POSITION_MASK
+
+    def set_position(self, player, position):
+        shift = player * POSITION_BITS
+        keys = self.zobrist.pawn[player]
+        self.hash ^= keys[(self.pawns >> shift) & POSITION_MASK] ^ keys[position]
+        self.pawns = (self.pawns & ~(POSITION_MASK << shift)) | (position << shift)
+        self._positions[player] = position
+
+    def walls_left(self, player):
+        return (self.walls >> (player * DOMINO_BITS)) & DOMINO_MASK
+
+    # array copies of the packed integers, kept in step with them for the numpy-facing API; callers
+    # get read-only views, writes have to go through the packed fields (init_from_state, moves)
+
+    @property
+    def positions(self):
+        return self._positions_view
+
+    @property
+    def dominoes(self):
+        return self._dominoes_view
+
+    def _unpack(self):
+        self._positions = np.array([self.position(p) for p in range(self.num_of_players)], dtype=np.float64)
+        self._dominoes = np.array([self.walls_left(p) for p in range(self.num_of_players)], dtype=np.int64)
+        self._read_only_views()
+
+    def _read_only_views(self):
+        self._positions_view = self._positions.view()
+        self._positions_view.flags.writeable = False
+        self._dominoes_view = self._dominoes.view()
+        self._dominoes_view.flags.writeable = False
+
+    @property
+    def board(self):
+        if self._board is None:
+            board = mask_to_array(self.right, self.cells) << DIR_RIGHT
+            board |= mask_to_array(self.down, self.cells) << DIR_DOWN
+            board |= mask_to_array(self.diag, self.cells) << DIR_RIGHT_AND_DOWN
+            self._board = board.reshape((self.sx, self.sy))
+        return self._board
+
+    def init_from_state(self, game_state):
+        n = self.num_of_players
+        self.pawns = 0
+        self.walls = 0
+        for player in range(n):
+            self.pawns |= int(game_state[player]) << (player * POSITION_BITS)
+            self.walls |= int(game_state[n + player]) << (player * DOMINO_BITS)
+        board = np.asarray(game_state[n * 2:self.cells + n * 2]).astype(np.int64)
+        self.right = array_to_mask(board & (1 << DIR_RIGHT))
+        self.down = array_to_mask(board & (1 << DIR_DOWN))
+        self.diag = array_to_mask(board & (1 << DIR_RIGHT_AND_DOWN))
+        self._unpack()
+        self._update_move_masks()
+        self.init_hash()
+        self.init_wall_slots()
+
+    def do_move(self, move, player):
+        move = int(move)
+        if move < 4:
+            self.do_step(player, move)
+        elif self.walls_left(player) > 0:
+            self.add_border(move - 4, player)
+
+        return np.concatenate((self.positions, self.dominoes, np.reshape(self.board, self.cells)))
+
+    # the packed fields are plain ints, so the undo record is just their previous values
+    def make_move(self, move, player):
+        move = int(move)
+        undo = (self.hash, player, self.pawns, self.walls, self.right, self.down, self.diag, None)
+        if move < 4:
+            self.do_step(player, move)
+            return undo
+        if self.walls_left(player) <= 0:
+            return undo
+        direction, edges, centre = self.wall_bits(move - 4)
+        first = centre.bit_length() - 1
+        second = (edges ^ centre).bit_length() - 1
+        free = [slot for edge in ((direction, first), (direction, second), (DIR_RIGHT_AND_DOWN, first))
+                for slot in self.edge_slots[edge] if self.wall_free[slot]]
+        self.add_border(move - 4, player)
+        return undo[:-1] + (free,)
+
+    def unmake_move(self, undo):
+        self.hash, player, self.pawns, self.walls, right, down, diag, free = undo
+        self._positions[player] = self.position(player)
+        if free is not None:
+            self.right, self.down, self.diag = right, down, diag
+            self._dominoes[player] = self.walls_left(player)
+            self.wall_free[free] = True
+            self._update_move_masks()
+
+    def do_step(self, player, move):
+        position = self.position(player)
+        bit = 1 << position
+        if move == MOVE_UP:
+            if (bit >> 1) & self.move_down:
+                self.set_position(player, position - 1)
+        elif move == MOVE_DOWN:
+            if bit & self.move_down:
+                self.set_position(player, position + 1)
+        elif move == MOVE_RIGHT:
+            if bit & self.move_right:
+                self.set_position(player, position + self.sy)
+        elif move == MOVE_LEFT:
+            if (bit >> self.sy) & self.move_right:
+                self.set_position(player, position - self.sy)
+
+    def legal_step_mask(self, player, mask=None):
+        if mask is None:
+            mask = np.zeros(4, dtype=bool)
+        position = self.position(player)
+        mask[MOVE_UP] = (self.move_down >> (position - 1)) & 1 if position % self.sy else False
+        mask[MOVE_RIGHT] = (self.move_right >> position) & 1
+        mask[MOVE_DOWN] = (self.move_down >> position) & 1
+        mask[MOVE_LEFT] = (self.move_right >> (position - self.sy)) & 1 if position >= self.sy else False
+        return mask
+
+    def wall_bits(self, location):
+        # (direction of the blocked edges, their bits, centre bit) for a wall slot
+        cells = (self.sx - 1) * (self.sy - 1)
+        if location < cells:
+            x = location // (self.sy - 1)
+            y = location % (self.sy - 1)
+            first = 1 << (x * self.sy + y)
+            return DIR_RIGHT, first | (first << 1), first
+        location -= cells
+        x = location // (self.sy - 1)
+        y = location % (self.sy - 1)
+        first = 1 << (x * self.sy + y)
+        return DIR_DOWN, first | (first << self.sy), first
+
+    def add_border(self, location, player):
+        direction, edges, centre = self.wall_bits(location)
+        if not centre & self.diag:
+            return
+        if direction == DIR_RIGHT:
+            if self.right & edges != edges:
+                return
+            self.right &= ~edges
+        else:
+            if self.down & edges != edges:
+                return
+            self.down &= ~edges
+        self.diag &= ~centre
+        first = centre.bit_length() - 1
+        second = (edges ^ centre).bit_length() - 1
+        count = self.walls_left(player)
+        self.hash ^= self.zobrist.edge[direction][first] ^ self.zobrist.edge[direction][second] ^ \
+            self.zobrist.edge[DIR_RIGHT_AND_DOWN][first] ^ \
+            self.zobrist.domino_key(player, count) ^ self.zobrist.domino_key(player, count - 1)
+        self.edge_removed_from_slots(direction, first)
+        self.edge_removed_from_slots(direction, second)
+        self.edge_removed_from_slots(DIR_RIGHT_AND_DOWN, first)
+        self.walls -= 1 << (player * DOMINO_BITS)
+        self._dominoes[player] -= 1
+        self._update_move_masks()
+
+    def get_game_state(self, player):
+        return np.concatenate((np.full(1, player), self.positions, self.dominoes, np.reshape(self.board, self.cells)))
+
+    def _edge_mask(self, direction):
+        if direction == DIR_RIGHT:
+            return self.right
+        if direction == DIR_DOWN:
+            return self.down
+        return self.diag
+
+    def remove_edge(self, from_coords, to_coords):
+        direction = self.find_direction(from_coords, to_coords)
+        position = self.to_position(int(from_coords[0]), int(from_coords[1]))
+        bit = 1 << position
+        if self._edge_mask(direction) & bit:
+            self.hash ^= self.zobrist.edge[direction][position]
+            self.edge_removed_from_slots(direction, position)
+        if direction == DIR_RIGHT:
+            self.right &= ~bit
+        elif direction == DIR_DOWN:
+            self.down &= ~bit
+        else:
+            self.diag &= ~bit
+        self._update_move_masks()
+
+    def connected(self, coords_1, coords_2):
+        if coords_1 == coords_2:
+            return True
+        if coords_1[0] > coords_2[0] or coords_1[1] > coords_2[1]:
+            coords_1, coords_2 = coords_2, coords_1
+        direction = self.find_direction(coords_1, coords_2)
+        position = self.to_position(int(coords_1[0]), int(coords_1[1]))
+        return (self._edge_mask(direction) >> position) & 1 == 1
+
+    def move_masks(self):
+        return self.move_right, self.move_down
+
+    def distance_to_mask(self, position, goal):
+        return flood_distance(position, goal, self.move_right, self.move_down, self.sy)
+
+    def shortest_path(self, x1, y1, x2, y2):
+        goal = self.full
+        if x2 != -1:
+            goal &= self.x_masks[x2] if 0 <= x2 < self.sx else 0
+        if y2 != -1:
+            goal &= self.y_masks[y2] if 0 <= y2 < self.sy else 0
+        return self.distance_to_mask(self.to_position(x1, y1), goal)
+
+    def shortest_path_for_player_to_win(self, player):
+        return self.distance_to_mask(self.position(player), self.goal_masks[player])
+
+    def find_player(self, position):
+        res = 0
+        for i in range(self.num_of_players):
+            if position == self.position(i):
+                res += i + 1
+
+        return res
+
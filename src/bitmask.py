@@ -0,0 +1,91 @@
+import numpy as np
+
+# Boards as Python integer bitsets: cell (x, y) is bit x * sy + y. move_right / move_down hold the
+# cells from which a step right / down is open and stays on the board.
+
+# same values as quoridor.DIR_RIGHT / DIR_DOWN
+DIR_RIGHT = 0
+DIR_DOWN = 1
+
+_masks = {}
+
+
+def mask_to_array(mask, size):
+    raw = np.frombuffer(mask.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:size].astype(np.int64)
+
+
+def array_to_mask(bits):
+    packed = np.packbits(np.asarray(bits, dtype=bool), bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+
+# (x_masks, y_masks, goal_masks) for a board size, goal_masks in player order
+def board_masks(sx, sy):
+    key = (sx, sy)
+    if key not in _masks:
+        x_masks = [((1 << sy) - 1) << (x * sy) for x in range(sx)]
+        y_masks = [sum(1 << (x * sy + y) for x in range(sx)) for y in range(sy)]
+        goal_masks = [y_masks[sy - 1], y_masks[0], x_masks[sx - 1], x_masks[0]]
+        _masks[key] = x_masks, y_masks, goal_masks
+    return _masks[key]
+
+
+def move_masks(board, sx, sy):
+    x_masks, y_masks, _ = board_masks(sx, sy)
+    cells = np.asarray(board).astype(np.int64).reshape(-1)
+    move_right = array_to_mask(cells & (1 << DIR_RIGHT)) & ~x_masks[sx - 1]
+    move_down = array_to_mask(cells & (1 << DIR_DOWN)) & ~y_masks[sy - 1]
+    return move_right, move_down
+
+
+def expand(frontier, move_right, move_down, sy):
+    return ((frontier & move_down) << 1) | ((frontier >> 1) & move_down) | \
+           ((frontier & move_right) << sy) | ((frontier >> sy) & move_right)
+
+
+def flood_distance(position, goal, move_right, move_down, sy):
+    reached = 1 << position
+    frontier = reached
+    length = 0
+    while frontier:
+        if frontier & goal:
+            return length
+        frontier = expand(frontier, move_right, move_down, sy) & ~reached
+        reached |= frontier
+        length += 1
+    return -1
+
+
+# BFS frontiers from position until one touches goal, None if the goal cannot be reached
+def flood_layers(position, goal, move_right, move_down, sy):
+    reached = 1 << position
+    layers = [reached]
+    while not layers[-1] & goal:
+        frontier = expand(layers[-1], move_right, move_down, sy) & ~reached
+        if not frontier:
+            return None
+        reached |= frontier
+        layers.append(frontier)
+    return layers
+
+
+# edges (direction, upper-left cell) along one shortest path found by flood_layers
+def path_edges(layers, goal, move_right, move_down, sy):
+    last = layers[-1] & goal
+    cell = (last & -last).bit_length() - 1
+    res = []
+    for previous in reversed(layers[:-1]):
+        if cell % sy and (previous & move_down) >> (cell - 1) & 1:
+            cell -= 1
+            res.append((DIR_DOWN, cell))
+        elif (move_down >> cell) & (previous >> (cell + 1)) & 1:
+            res.append((DIR_DOWN, cell))
+            cell += 1
+        elif cell >= sy and (previous & move_right) >> (cell - sy) & 1:
+            cell -= sy
+            res.append((DIR_RIGHT, cell))
+        else:
+            res.append((DIR_RIGHT, cell))
+            cell += sy
+    return res
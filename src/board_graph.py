@@ -0,0 +1,107 @@
+import numpy as np
+from quoridor import DIR_RIGHT, DIR_DOWN
+
+# Breadth-first searches over whole batches of boards with NumPy. A frontier is a boolean array
+# (..., sx, sy); one expansion step shifts it by one cell in each direction, masked by the edge bits
+# of the board, so every source, player and board of a batch advances together. Boards are
+# (N, sx, sy) arrays in QuoridorGame.board layout, or a single (sx, sy) board.
+
+RIGHT_BIT = 1 << DIR_RIGHT
+DOWN_BIT = 1 << DIR_DOWN
+UNREACHABLE = -1
+
+
+def goal_masks(num_of_players, sx, sy):
+    goals = np.zeros((num_of_players, sx, sy), dtype=bool)
+    lines = [(slice(None), sy - 1), (slice(None), 0), (sx - 1, slice(None)), (0, slice(None))]
+    for player in range(num_of_players):
+        goals[(player,) + lines[player]] = True
+    return goals
+
+
+# open edges: right (N, sx - 1, sy) between x and x + 1, down (N, sx, sy - 1) between y and y + 1
+def edge_masks(boards):
+    boards = np.asarray(boards)
+    return (boards[..., :-1, :] & RIGHT_BIT) > 0, (boards[..., :, :-1] & DOWN_BIT) > 0
+
+
+def expand(frontier, right, down):
+    grown = np.zeros_like(frontier)
+    grown[..., 1:, :] |= frontier[..., :-1, :] & right
+    grown[..., :-1, :] |= frontier[..., 1:, :] & right
+    grown[..., :, 1:] |= frontier[..., :, :-1] & down
+    grown[..., :, :-1] |= frontier[..., :, 1:] & down
+    return grown
+
+
+# distance from every cell to the nearest source cell; sources (..., sx, sy) must broadcast
+# against right and down
+def bfs(sources, right, down):
+    frontier = np.array(sources, dtype=bool)
+    reached = frontier.copy()
+    distances = np.full(frontier.shape, UNREACHABLE, dtype=np.int32)
+    length = 0
+    while frontier.any():
+        distances[frontier] = length
+        frontier = expand(frontier, right, down) & ~reached
+        reached |= frontier
+        length += 1
+    return distances
+
+
+# (N, P, sx, sy): distance from every cell to each player's goal line, -1 when it is cut off
+def distance_fields(boards, num_of_players):
+    boards = np.asarray(boards)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[None]
+    n, sx, sy = boards.shape
+    right, down = edge_masks(boards)
+    sources = np.broadcast_to(goal_masks(num_of_players, sx, sy), (n, num_of_players, sx, sy))
+    res = bfs(sources, right[:, None], down[:, None])
+    return res[0] if single else res
+
+
+# (N, sx * sy, sx * sy): distance between every pair of cells, positions as in QuoridorGame
+def all_pairs_distances(boards):
+    boards = np.asarray(boards)
+    single = boards.ndim == 2
+    if single:
+        boards = boards[None]
+    n, sx, sy = boards.shape
+    cells = sx * sy
+    right, down = edge_masks(boards)
+    sources = np.broadcast_to(np.eye(cells, dtype=bool).reshape(cells, sx, sy), (n, cells, sx, sy))
+    res = bfs(sources, right[:, None], down[:, None]).reshape(n, cells, cells)
+    return res[0] if single else res
+
+
+# Length of the shortest path from every pawn to its goal line, -1 when there is none.
+# boards (N, sx, sy), positions (N, P) -> (N, P). Searches start at the pawns and stop at the goal,
+# which is cheaper than full distance fields when only the pawns matter.
+def pawn_distances(boards, positions, goals):
+    n, sx, sy = boards.shape
+    num_of_players = positions.shape[1]
+    right, down = edge_masks(boards)
+    right = right[:, None]
+    down = down[:, None]
+
+    frontier = np.zeros((n, num_of_players, sx, sy), dtype=bool)
+    rows = np.repeat(np.arange(n), num_of_players)
+    cols = np.tile(np.arange(num_of_players), n)
+    flat = positions.reshape(-1).astype(np.int64)
+    frontier[rows, cols, flat // sy, flat % sy] = True
+    reached = frontier.copy()
+    distances = np.full((n, num_of_players), UNREACHABLE)
+    pending = np.ones((n, num_of_players), dtype=bool)
+    length = 0
+    while True:
+        arrived = pending & (frontier & goals).any(axis=(2, 3))
+        distances[arrived] = length
+        pending &= ~arrived
+        frontier[~pending] = False
+        if not frontier.any():
+            return distances
+        frontier = expand(frontier, right, down) & ~reached
+        reached |= frontier
+        length += 1
@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# Model weights as .npz files (w0, w1, ... in get_weights() order). Saves copy the weights in the
+# caller's thread and write them on a background thread; only the newest pending numbered snapshot
+# and the newest pending 'latest' one are kept, so a slow disk drops intermediate checkpoints instead
+# of stalling training. Files are written to a temporary name and renamed, so readers only ever see
+# complete checkpoints. A failed write is raised from the next save() or flush().
+
+LATEST = 'latest'
+SUFFIX = '.npz'
+
+
+# extra arrays are stored next to the weights under their own names
+def save_weights(path, weights, half=False, **extra):
+    arrays = dict(extra)
+    for i, w in enumerate(weights):
+        w = np.asarray(w)
+        arrays['w{}'.format(i)] = w.astype(np.float16) if half and w.dtype.kind == 'f' else w
+    tmp = '{}.tmp{}'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_weights(path, dtype=np.float32):
+    with np.load(path) as data:
+        count = sum(1 for name in data.files if name[0] == 'w' and name[1:].isdigit())
+        return [data['w{}'.format(i)].astype(dtype, copy=False) for i in range(count)]
+
+
+class CheckpointManager:
+    def __init__(self, directory, every_episodes=1, every_seconds=None, keep=5, half=False, prefix='episode_'):
+        if keep < 1:
+            raise ValueError('keep must be at least 1, got {}'.format(keep))
+        self.directory = directory
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.keep = keep
+        self.half = half
+        self.prefix = prefix
+        self.saved = 0
+        self.dropped = 0
+        self._last_time = time.monotonic()
+        # maybe_save calls since the last save; episode numbers are only used as names
+        self._since = None
+        # numbered snapshots and 'latest' ones are queued apart so a 'latest' never replaces an episode
+        self._pending = None
+        self._pending_latest = None
+        self._writing = False
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, '{}{}{}'.format(self.prefix, name, SUFFIX))
+
+    # episodes saved on disk, oldest write first (D2Solver.run restarts its episode numbers)
+    def episodes(self):
+        pattern = re.compile(r'^{}(\d+){}$'.format(re.escape(self.prefix), re.escape(SUFFIX)))
+        found = []
+        for name in os.listdir(self.directory):
+            m = pattern.match(name)
+            if m:
+                try:
+                    found.append((os.stat(os.path.join(self.directory, name)).st_mtime_ns, int(m.group(1))))
+                except FileNotFoundError:
+                    pass
+        return [episode for _, episode in sorted(found)]
+
+    def due(self):
+        if self._since is None:
+            return True
+        if self.every_episodes and self._since >= self.every_episodes:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self._last_time >= self.every_seconds
+
+    # get_weights is only called when a checkpoint is due
+    def maybe_save(self, episode, get_weights):
+        if self._since is not None:
+            self._since += 1
+        if not self.due():
+            return False
+        self.save(episode, get_weights())
+        return True
+
+    def save(self, episode, weights):
+        snapshot = [np.array(w, copy=True) for w in weights]
+        if episode != LATEST:
+            self._since = 0
+            self._last_time = time.monotonic()
+        with self._condition:
+            if self._closed:
+                raise ValueError('CheckpointManager is closed')
+            self._raise_error()
+            if episode == LATEST:
+                if self._pending_latest is not None:
+                    self.dropped += 1
+                self._pending_latest = (episode, snapshot)
+            else:
+                if self._pending is not None:
+                    self.dropped += 1
+                # an episode write updates 'latest' too, with newer weights than the pending one
+                if self._pending_latest is not None:
+                    self._pending_latest = None
+                    self.dropped += 1
+                self._pending = (episode, snapshot)
+            if not self._writer_alive():
+                self._thread = threading.Thread(target=self._writer, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _writer_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _has_pending(self):
+        return self._pending is not None or self._pending_latest is not None
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _writer(self):
+        while True:
+            with self._condition:
+                while not self._has_pending() and not self._closed:
+                    self._condition.wait()
+                if not self._has_pending():
+                    return
+                # episodes first, a 'latest' queued after one is newer and goes out after it
+                if self._pending is not None:
+                    episode, weights = self._pending
+                    self._pending = None
+                else:
+                    episode, weights = self._pending_latest
+                    self._pending_latest = None
+                self._writing = True
+            try:
+                self._write(episode, weights)
+            except Exception as e:
+                # kept for the caller; the writer stays up for later saves
+                with self._condition:
+                    self._error = e
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _write(self, episode, weights):
+        save_weights(self.path(episode), weights, self.half)
+        if episode != LATEST:
+            save_weights(self.path(LATEST), weights, self.half)
+            for old in self.episodes()[:-self.keep]:
+                try:
+                    os.remove(self.path(old))
+                except FileNotFoundError:
+                    pass
+        self.saved += 1
+
+    # blocks until every pending checkpoint is on disk, raises the error of a failed write
+    def flush(self):
+        with self._condition:
+            while (self._has_pending() or self._writing) and self._writer_alive():
+                self._condition.wait(0.1)
+            self._raise_error()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            if self._thread is not None:
+                self._thread.join()
+
+    def load(self, name=LATEST):
+        path = self.path(name)
+        return load_weights(path) if os.path.exists(path) else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,86 @@
+import heapq
+from collections import deque
+
+UNREACHABLE = -1
+INFINITY = float('inf')
+
+
+# Distance from every cell to a goal set, kept up to date while edges are removed.
+# neighbours(position) must return the positions reachable in one step on the current board.
+class DistanceMap:
+    def __init__(self, neighbours, goals, size):
+        self.neighbours = neighbours
+        self.goals = list(goals)
+        self.size = size
+        self.rebuild()
+
+    def rebuild(self):
+        dist = [INFINITY] * self.size
+        q = deque()
+        for goal in self.goals:
+            dist[goal] = 0
+            q.append(goal)
+        while q:
+            position = q.popleft()
+            for n in self.neighbours(position):
+                if dist[n] == INFINITY:
+                    dist[n] = dist[position] + 1
+                    q.append(n)
+        self.dist = dist
+
+    def copy(self, neighbours):
+        res = DistanceMap.__new__(DistanceMap)
+        res.neighbours = neighbours
+        res.goals = self.goals
+        res.size = self.size
+        res.dist = list(self.dist)
+        return res
+
+    def distance(self, position):
+        d = self.dist[int(position)]
+        return UNREACHABLE if d == INFINITY else d
+
+    def edge_removed(self, a, b):
+        dist = self.dist
+        if dist[a] == dist[b]:
+            return
+        # only the farther end can lose its way to the goal through this edge
+        self._repair(a if dist[a] > dist[b] else b)
+
+    def _repair(self, start):
+        dist = self.dist
+        neighbours = self.neighbours
+
+        # cells whose every remaining parent (neighbour one step closer) is itself affected;
+        # the queue holds candidates in order of distance, so parents are settled first
+        affected = set()
+        q = deque([start])
+        while q:
+            position = q.popleft()
+            if position in affected:
+                continue
+            d = dist[position]
+            if any(dist[n] == d - 1 and n not in affected for n in neighbours(position)):
+                continue
+            affected.add(position)
+            for n in neighbours(position):
+                if dist[n] == d + 1:
+                    q.append(n)
+
+        for position in affected:
+            dist[position] = INFINITY
+        heap = []
+        for position in affected:
+            d = min((dist[n] + 1 for n in neighbours(position)), default=INFINITY)
+            if d < INFINITY:
+                dist[position] = d
+                heap.append((d, position))
+        heapq.heapify(heap)
+        while heap:
+            d, position = heapq.heappop(heap)
+            if d > dist[position]:
+                continue
+            for n in neighbours(position):
+                if n in affected and d + 1 < dist[n]:
+                    dist[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
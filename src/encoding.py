@@ -0,0 +1,210 @@
+import numpy as np
+from quoridor import ALL_FREE, DIR_RIGHT, DIR_DOWN, DIR_RIGHT_AND_DOWN
+
+# Plane encoding of a game as one flat row:
+#   num_of_players pawn planes, one per player in player order
+#   3 wall planes: blocked right edge, blocked down edge, wall centre (blocked diagonal)
+#   num_of_players to-move flags, then num_of_players walls-left counts
+# Planes are (sx, sy) with cell (x, y) at x * sy + y, the same order as the board.
+#
+# Symmetries map a state to an equivalent one; a transition (s, a, r, s', done) stays valid when
+# s, a and s' are all transformed, so every stored transition yields one sample per symmetry.
+# MIRROR flips x, which keeps every goal for two players. SWAP flips y and exchanges players 0
+# and 1, whose goals are the top and bottom rows. With four players either one would change the
+# turn order, so only IDENTITY applies.
+
+IDENTITY = 'identity'
+MIRROR = 'mirror'
+SWAP = 'swap'
+MIRROR_SWAP = 'mirror_swap'
+
+# (flip x, flip y) per symmetry
+FLIPS = {
+    IDENTITY: (False, False),
+    MIRROR: (True, False),
+    SWAP: (False, True),
+    MIRROR_SWAP: (True, True)
+}
+WALL_PLANES = 3
+EDGE_DIRECTIONS = [DIR_RIGHT, DIR_DOWN, DIR_RIGHT_AND_DOWN]
+# pawn steps: up, right, down, left
+STEP_MIRROR = np.array([0, 3, 2, 1])
+STEP_SWAP = np.array([2, 1, 0, 3])
+
+
+def symmetries(num_of_players):
+    return [IDENTITY, MIRROR, SWAP, MIRROR_SWAP] if num_of_players == 2 else [IDENTITY]
+
+
+def _flips(symmetry, num_of_players):
+    if symmetry not in symmetries(num_of_players):
+        raise ValueError('Unsupported symmetry for {} players: {}'.format(num_of_players, symmetry))
+    return FLIPS[symmetry]
+
+
+def _player_permutation(symmetry, num_of_players):
+    res = np.arange(num_of_players)
+    if FLIPS[symmetry][1]:
+        res[[0, 1]] = [1, 0]
+    return res
+
+
+# planes[..., d, x, y] for d in EDGE_DIRECTIONS. An edge sits between a cell and its right or lower
+# neighbour and the wall centre between four cells, so along a flipped axis they move to
+# size - 2 - i instead of size - 1 - i; the last row or column has no such edges.
+def _flip_wall_planes(planes, flip_x, flip_y):
+    res = np.zeros_like(planes)
+    sx, sy = planes.shape[-2:]
+    # (x-extent, y-extent) of the part of each plane that can hold a wall
+    extents = [(sx - 1, sy), (sx, sy - 1), (sx - 1, sy - 1)]
+    for d, (ex, ey) in enumerate(extents):
+        src = planes[..., d, :ex, :ey]
+        if flip_x:
+            src = src[..., ::-1, :]
+        if flip_y:
+            src = src[..., ::-1]
+        res[..., d, :ex, :ey] = src
+    return res
+
+
+def _flip_positions(positions, sx, sy, flip_x, flip_y):
+    x, y = np.divmod(positions.astype(np.int64), sy)
+    if flip_x:
+        x = sx - 1 - x
+    if flip_y:
+        y = sy - 1 - y
+    return x * sy + y
+
+
+def transform_actions(actions, symmetry, num_of_players, sx, sy):
+    flip_x, flip_y = _flips(symmetry, num_of_players)
+    actions = np.asarray(actions)
+    res = actions.copy()
+    steps = actions < 4
+    if flip_x:
+        res[steps] = STEP_MIRROR[res[steps]]
+    if flip_y:
+        res[steps] = STEP_SWAP[res[steps]]
+    # both wall orientations use slots (x, y) with x < sx - 1 and y < sy - 1
+    slots = (sx - 1) * (sy - 1)
+    walls = ~steps
+    orientation, slot = np.divmod(actions[walls] - 4, slots)
+    x, y = np.divmod(slot, sy - 1)
+    if flip_x:
+        x = sx - 2 - x
+    if flip_y:
+        y = sy - 2 - y
+    res[walls] = 4 + orientation * slots + x * (sy - 1) + y
+    return res
+
+
+# rows in QuoridorGame.get_game_state layout: player, positions, dominoes, board
+def transform_states(states, symmetry, num_of_players, sx, sy):
+    flip_x, flip_y = _flips(symmetry, num_of_players)
+    states = np.asarray(states)
+    if symmetry == IDENTITY:
+        return states.copy()
+    n = num_of_players
+    permutation = _player_permutation(symmetry, n)
+    res = np.empty_like(states)
+    res[:, 0] = permutation[states[:, 0].astype(np.int64)]
+    # the pawn of player p becomes the pawn of permutation[p]
+    res[:, 1 + permutation] = _flip_positions(states[:, 1:1 + n], sx, sy, flip_x, flip_y)
+    res[:, 1 + n + permutation] = states[:, 1 + n:1 + 2 * n]
+    board = states[:, 1 + 2 * n:1 + 2 * n + sx * sy].astype(np.int64).reshape(-1, sx, sy)
+    blocked = np.stack([(board >> d) & 1 == 0 for d in EDGE_DIRECTIONS], axis=1)
+    blocked = _flip_wall_planes(blocked, flip_x, flip_y)
+    flipped = np.full(board.shape, ALL_FREE, dtype=np.int64)
+    for i, d in enumerate(EDGE_DIRECTIONS):
+        flipped &= ~(blocked[:, i].astype(np.int64) << d)
+    res[:, 1 + 2 * n:1 + 2 * n + sx * sy] = flipped.reshape(len(states), -1)
+    res[:, 1 + 2 * n + sx * sy:] = states[:, 1 + 2 * n + sx * sy:]
+    return res
+
+
+# (states, actions, rewards, next_states, dones) with one copy of the batch per symmetry
+def augment(states, actions, rewards, next_states, dones, num_of_players, sx, sy, use=None):
+    use = symmetries(num_of_players) if use is None else use
+    parts = [(transform_states(states, s, num_of_players, sx, sy), transform_actions(actions, s, num_of_players, sx, sy),
+              rewards, transform_states(next_states, s, num_of_players, sx, sy), dones) for s in use]
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class Encoder:
+    def __init__(self, num_of_players, sx, sy, dtype=np.float32):
+        self.num_of_players = num_of_players
+        self.sx = sx
+        self.sy = sy
+        self.dtype = np.dtype(dtype)
+        self.cells = sx * sy
+        self.planes = num_of_players + WALL_PLANES
+        self.to_move_offset = self.planes * self.cells
+        self.walls_offset = self.to_move_offset + num_of_players
+        self.size = self.walls_offset + num_of_players
+        self._bits = np.empty(self.cells, dtype=np.int64)
+
+    def empty(self, batch_size=None):
+        shape = (self.size,) if batch_size is None else (batch_size, self.size)
+        return np.empty(shape, dtype=self.dtype)
+
+    # (planes, sx, sy) view of an encoded row, or (N, planes, sx, sy) of a batch
+    def planes_view(self, encoded):
+        return encoded[..., :self.to_move_offset].reshape(encoded.shape[:-1] + (self.planes, self.sx, self.sy))
+
+    # writes into out (a row of a caller's buffer) without allocating
+    def encode(self, game, player, out=None):
+        if out is None:
+            out = self.empty()
+        cells = self.cells
+        out[:self.num_of_players * cells] = 0
+        for p in range(self.num_of_players):
+            out[p * cells + int(game.positions[p])] = 1
+        board = np.asarray(game.board).reshape(-1)
+        for i, d in enumerate(EDGE_DIRECTIONS):
+            np.bitwise_and(board, 1 << d, out=self._bits)
+            start = (self.num_of_players + i) * cells
+            np.equal(self._bits, 0, out=out[start:start + cells], casting='unsafe')
+        out[self.to_move_offset:self.walls_offset] = 0
+        out[self.to_move_offset + player] = 1
+        out[self.walls_offset:] = game.dominoes
+        return out
+
+    # batch version of encode for rows in get_game_state layout
+    def encode_states(self, states, out=None):
+        states = np.asarray(states)
+        n, cells = self.num_of_players, self.cells
+        if out is None:
+            out = self.empty(len(states))
+        out[:] = 0
+        rows = np.arange(len(states))
+        for p in range(n):
+            out[rows, p * cells + states[:, 1 + p].astype(np.int64)] = 1
+        board = states[:, 1 + 2 * n:1 + 2 * n + cells].astype(np.int64)
+        for i, d in enumerate(EDGE_DIRECTIONS):
+            start = (n + i) * cells
+            out[:, start:start + cells] = (board >> d) & 1 == 0
+        out[rows, self.to_move_offset + states[:, 0].astype(np.int64)] = 1
+        out[:, self.walls_offset:] = states[:, 1 + n:1 + 2 * n]
+        return out
+
+    # the encoding of the transformed state, for (N, size) batches
+    def transform(self, encoded, symmetry):
+        flip_x, flip_y = _flips(symmetry, self.num_of_players)
+        encoded = np.asarray(encoded)
+        if symmetry == IDENTITY:
+            return encoded.copy()
+        n = self.num_of_players
+        permutation = _player_permutation(symmetry, n)
+        planes = self.planes_view(encoded)
+        res = np.empty_like(encoded)
+        res_planes = self.planes_view(res)
+        pawns = planes[:, :n]
+        if flip_x:
+            pawns = pawns[..., ::-1, :]
+        if flip_y:
+            pawns = pawns[..., ::-1]
+        res_planes[:, permutation] = pawns
+        res_planes[:, n:] = _flip_wall_planes(planes[:, n:], flip_x, flip_y)
+        res[:, self.to_move_offset + permutation] = encoded[:, self.to_move_offset:self.walls_offset]
+        res[:, self.walls_offset + permutation] = encoded[:, self.walls_offset:]
+        return res
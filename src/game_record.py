@@ -0,0 +1,153 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import quoridor
+import quoridor_env
+from replay_memory import state_dtype
+
+# Games stored as move lists. A file is a 16 byte header followed by games, each an 8 byte game
+# header and its moves. Moves take one byte while every action fits (boards up to 12x12 with both
+# wall orientations), two bytes on larger boards. Files are only ever appended to, so writers
+# can add games to an archive that readers are streaming.
+#
+# States are rebuilt by replaying the moves through QuoridorGame when they are read, as
+# (state, action, reward, next_state, done) transitions in the layout the env produces:
+# get_game_state of the mover before the move, of the next player after it.
+
+MAGIC = b'QGAMEREC'
+VERSION = 1
+FILE_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('reserved', 'V4')
+])
+GAME_HEADER_DTYPE = np.dtype([
+    ('num_of_players', 'u1'),
+    ('sx', 'u1'),
+    ('sy', 'u1'),
+    ('first_player', 'u1'),
+    ('winner', 'i1'),
+    ('action_bytes', 'u1'),
+    ('num_of_moves', '<u2')
+])
+MAX_MOVES = np.iinfo(np.uint16).max
+DEFAULT_SHUFFLE_BUFFER = 1 << 16
+
+GameRecord = namedtuple('GameRecord', ['num_of_players', 'sx', 'sy', 'first_player', 'winner', 'moves'])
+
+
+def action_dtype(sx, sy):
+    return np.dtype('u1') if 4 + 2 * (sx - 1) * (sy - 1) <= 256 else np.dtype('<u2')
+
+
+class GameRecordWriter:
+    def __init__(self, path):
+        self.path = path
+        # unbuffered, so every game is a single append to the file
+        self.file = open(path, 'ab', buffering=0)
+        if self.file.tell() == 0:
+            header = np.zeros(1, dtype=FILE_HEADER_DTYPE)
+            header['magic'] = MAGIC
+            header['version'] = VERSION
+            self.file.write(header.tobytes())
+        self.games = 0
+
+    def write(self, moves, num_of_players, sx, sy, first_player=0, winner=-1):
+        if len(moves) > MAX_MOVES:
+            raise ValueError('A game record holds at most {} moves, got {}'.format(MAX_MOVES, len(moves)))
+        dtype = action_dtype(sx, sy)
+        header = np.zeros(1, dtype=GAME_HEADER_DTYPE)
+        header[0] = (num_of_players, sx, sy, first_player, winner, dtype.itemsize, len(moves))
+        # header and moves go out in one write call; read_records still skips a tail cut short
+        self.file.write(header.tobytes() + np.asarray(moves, dtype=dtype).tobytes())
+        self.games += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# GameRecords from path one at a time; a truncated last game (still being written) is skipped
+def read_records(path):
+    with open(path, 'rb') as f:
+        header = np.frombuffer(f.read(FILE_HEADER_DTYPE.itemsize), dtype=FILE_HEADER_DTYPE)
+        if len(header) == 0 or header[0]['magic'] != MAGIC or header[0]['version'] != VERSION:
+            raise ValueError('{} is not a game record file'.format(path))
+        while True:
+            raw = f.read(GAME_HEADER_DTYPE.itemsize)
+            if len(raw) < GAME_HEADER_DTYPE.itemsize:
+                return
+            players, sx, sy, first_player, winner, action_bytes, count = np.frombuffer(raw, dtype=GAME_HEADER_DTYPE)[0].tolist()
+            raw = f.read(count * action_bytes)
+            if len(raw) < count * action_bytes:
+                return
+            moves = np.frombuffer(raw, dtype='u1' if action_bytes == 1 else '<u2')
+            yield GameRecord(players, sx, sy, first_player, winner, moves)
+
+
+# (state, action, reward, next_state, done) for every move of the game, or only the moves of
+# `players`; the game is replayed as the transitions are consumed
+def transitions(record, players=None, engine=quoridor.ENGINE_ARRAY):
+    game = quoridor.create_game(record.num_of_players, record.sx, record.sy, engine)
+    dtype = state_dtype(record.sx, record.sy)
+    player = record.first_player
+    state = game.get_game_state(player).astype(dtype)
+    for move in record.moves.tolist():
+        game.do_move(move, player)
+        next_player = (player + 1) % record.num_of_players
+        if players is None or player in players:
+            next_state = game.get_game_state(next_player).astype(dtype)
+            done = game.is_finished()[0]
+            yield state, move, quoridor_env.reward(game, player), next_state, done
+            state = next_state
+        else:
+            state = game.get_game_state(next_player).astype(dtype)
+        player = next_player
+
+
+# Shuffled (states, actions, rewards, next_states, dones) batches from many record files. Files are
+# visited in random order and transitions pass through a shuffle buffer of `buffer_size`, so at most
+# that many states are held in memory. The last batch may be smaller than batch_size.
+def batches(paths, batch_size, buffer_size=DEFAULT_SHUFFLE_BUFFER, players=None, seed=None, engine=quoridor.ENGINE_ARRAY):
+    if buffer_size < batch_size:
+        raise ValueError('buffer_size must be at least batch_size, got {} < {}'.format(buffer_size, batch_size))
+    rnd = np.random.default_rng(seed)
+    buffer = []
+    out = []
+    for index in rnd.permutation(len(paths)):
+        for record in read_records(paths[index]):
+            for transition in transitions(record, players, engine):
+                if len(buffer) < buffer_size:
+                    buffer.append(transition)
+                    continue
+                i = rnd.integers(len(buffer))
+                out.append(buffer[i])
+                buffer[i] = transition
+                if len(out) == batch_size:
+                    yield _stack(out)
+                    out = []
+    rnd.shuffle(buffer)
+    out.extend(buffer)
+    for start in range(0, len(out), batch_size):
+        yield _stack(out[start:start + batch_size])
+
+
+def _stack(rows):
+    states, actions, rewards, next_states, dones = zip(*rows)
+    return (np.array(states), np.array(actions, dtype=np.int64), np.array(rewards, dtype=np.float32),
+            np.array(next_states), np.array(dones, dtype=bool))
+
+
+# record files in a directory, for batches()
+def record_files(directory, suffix='.qgr'):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from instrumentation import Histogram
+
+# Collects predict requests from many games and runs them through the model as one batch. A batch
+# starts with the oldest pending request and closes when it holds max_batch_size rows or that
+# request has waited max_wait_us. Requests are (n,) or (k, n) arrays; results come back as
+# concurrent.futures.Future objects with the matching (actions,) or (k, actions) rows.
+#
+# Actor processes reach the server through multiprocessing queues: serve() forwards requests from
+# one shared queue and answers on per-actor queues, and QueueClient wraps that as model.predict.
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_US = 500
+LATENCY_BUCKETS_US = 1 << 20
+
+_STOP = object()
+
+
+class InferenceServer:
+    def __init__(self, predict, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_us=DEFAULT_MAX_WAIT_US):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1, got {}'.format(max_batch_size))
+        self.predict_batch = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.requests = queue.Queue()
+        self.batch_sizes = Histogram.exponential(max_batch_size)
+        # microseconds from submit() until the request's batch goes to the model
+        self.queue_latency = Histogram.exponential(LATENCY_BUCKETS_US)
+        self.batches = 0
+        self._closed = False
+        self._carry = None
+        self._servers = []
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, state):
+        if self._closed:
+            raise ValueError('InferenceServer is closed')
+        future = Future()
+        self.requests.put((np.asarray(state), future, time.perf_counter()))
+        return future
+
+    def predict(self, state, timeout=None):
+        return self.submit(state).result(timeout)
+
+    async def predict_async(self, state):
+        return await asyncio.wrap_future(self.submit(state))
+
+    def _next_batch(self):
+        first = self._carry if self._carry is not None else self.requests.get()
+        self._carry = None
+        if first is _STOP:
+            return None
+        batch = [first]
+        rows = 1 if first[0].ndim == 1 else len(first[0])
+        deadline = first[2] + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._carry = request
+                break
+            size = 1 if request[0].ndim == 1 else len(request[0])
+            if rows + size > self.max_batch_size:
+                # a multi-row request that does not fit opens the next batch
+                self._carry = request
+                break
+            batch.append(request)
+            rows += size
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            states = [np.reshape(state, (-1, state.shape[-1])) for state, _, _ in batch]
+            sizes = [len(s) for s in states]
+            for _, _, submitted in batch:
+                self.queue_latency.add((start - submitted) * 1e6)
+            self.batch_sizes.add(sum(sizes))
+            self.batches += 1
+            try:
+                results = np.asarray(self.predict_batch(np.concatenate(states)))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            offsets = itertools.accumulate([0] + sizes)
+            for (state, future, _), offset, size in zip(batch, offsets, sizes):
+                rows = results[offset:offset + size]
+                future.set_result(rows[0] if state.ndim == 1 else rows)
+
+    # answers (client_id, request_id, state) messages from request_queue on response_queues[client_id]
+    def serve(self, request_queue, response_queues):
+        def forward():
+            while True:
+                message = request_queue.get()
+                if message is None:
+                    return
+                client_id, request_id, state = message
+
+                def reply(future, client_id=client_id, request_id=request_id):
+                    error = future.exception()
+                    response_queues[client_id].put((request_id, None if error else future.result(), error and repr(error)))
+
+                self.submit(state).add_done_callback(reply)
+
+        thread = threading.Thread(target=forward, daemon=True)
+        thread.start()
+        self._servers.append((request_queue, thread))
+        return thread
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'batch_size': self.batch_sizes.to_dict(),
+            'queue_latency_us': self.queue_latency.to_dict()
+        }
+
+    def close(self):
+        for request_queue, thread in self._servers:
+            request_queue.put(None)
+            thread.join()
+        self._servers = []
+        self._closed = True
+        self.requests.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# model.predict look-alike for actor processes; one request in flight at a time
+class QueueClient:
+    def __init__(self, client_id, request_queue, response_queue):
+        self.client_id = client_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.next_id = 0
+
+    def predict(self, states, batch_size=None, timeout=None):
+        request_id = self.next_id
+        self.next_id += 1
+        self.request_queue.put((self.client_id, request_id, np.asarray(states)))
+        while True:
+            response_id, result, error = self.response_queue.get(timeout=timeout)
+            if response_id != request_id:
+                continue
+            if error is not None:
+                raise RuntimeError('Inference failed: {}'.format(error))
+            return result
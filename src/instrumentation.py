@@ -0,0 +1,166 @@
+import bisect
+import json
+import signal
+import time
+import traceback
+from collections import Counter
+
+# Counters, phase timers and gauges for the training loop. snapshot() reports totals plus rates over
+# the window since the previous snapshot; export() appends snapshots to a JSONL file at most every
+# `every` seconds. The optional profiler samples the main thread's stack on SIGPROF and writes
+# collapsed stacks ("a;b;c count" lines) that flamegraph tools read directly.
+
+DEFAULT_EVERY = 10.0
+DEFAULT_PROFILE_INTERVAL = 0.005
+
+
+# Counts of values per bucket; bucket i holds values <= bounds[i], the last one everything above.
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    # powers of two from 1 up to at least high
+    @classmethod
+    def exponential(cls, high):
+        bounds = [1]
+        while bounds[-1] < high:
+            bounds.append(bounds[-1] * 2)
+        return cls(bounds)
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    # upper bound of the bucket holding the q-th quantile, inf for the overflow bucket
+    def quantile(self, q):
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'bounds': self.bounds,
+            'counts': self.counts,
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99)
+        }
+
+
+class _Timer:
+    __slots__ = ('totals', 'counts', 'name', 'start')
+
+    def __init__(self, totals, counts, name):
+        self.totals = totals
+        self.counts = counts
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.totals[self.name] += time.perf_counter() - self.start
+        self.counts[self.name] += 1
+        return False
+
+
+class Instruments:
+    def __init__(self, path=None, every=DEFAULT_EVERY):
+        self.path = path
+        self.every = every
+        self.counters = Counter()
+        self.timer_totals = Counter()
+        self.timer_counts = Counter()
+        self.gauges = {}
+        self._timers = {}
+        self.started = time.perf_counter()
+        self._last_time = self.started
+        self._last_counters = Counter()
+        self._last_timer_totals = Counter()
+        self.samples = Counter()
+        self._profile_path = None
+        self._previous_handler = signal.SIG_DFL
+        self._previous_timer = (0, 0)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    # with instruments.timer('replay'): ...
+    def timer(self, name):
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _Timer(self.timer_totals, self.timer_counts, name)
+        return timer
+
+    def snapshot(self):
+        now = time.perf_counter()
+        window = max(now - self._last_time, 1e-9)
+        elapsed = now - self.started
+        res = {
+            'time': time.time(),
+            'elapsed': elapsed,
+            'counters': dict(self.counters),
+            'rates': {name + '_per_second': (value - self._last_counters[name]) / window for name, value in self.counters.items()},
+            'timers': {
+                name: {
+                    'count': self.timer_counts[name],
+                    'total': total,
+                    'mean': total / self.timer_counts[name] if self.timer_counts[name] else 0.0,
+                    # share of the window spent in this phase
+                    'share': (total - self._last_timer_totals[name]) / window
+                } for name, total in self.timer_totals.items()
+            },
+            'gauges': dict(self.gauges)
+        }
+        self._last_time = now
+        self._last_counters = Counter(self.counters)
+        self._last_timer_totals = Counter(self.timer_totals)
+        return res
+
+    # appends a snapshot when `every` seconds have passed since the last one, returns it or None
+    def export(self, force=False):
+        if not force and time.perf_counter() - self._last_time < self.every:
+            return None
+        res = self.snapshot()
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(res) + '\n')
+        return res
+
+    def start_profiler(self, path, interval=DEFAULT_PROFILE_INTERVAL):
+        # SIGPROF only reaches the main thread, so this profiles the training loop itself
+        self._profile_path = path
+        # whatever SIGPROF handler and timer were there before come back in stop_profiler
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        self._previous_timer = signal.setitimer(signal.ITIMER_PROF, interval, interval)
+
+    def _sample(self, signum, frame):
+        stack = traceback.extract_stack(frame)
+        self.samples[';'.join('{}:{}'.format(entry.filename.rsplit('/', 1)[-1], entry.name) for entry in stack)] += 1
+
+    def stop_profiler(self):
+        signal.setitimer(signal.ITIMER_PROF, *self._previous_timer)
+        # a handler installed outside Python reads back as None and cannot be put back
+        signal.signal(signal.SIGPROF, signal.SIG_DFL if self._previous_handler is None else self._previous_handler)
+        if self._profile_path is not None:
+            with open(self._profile_path, 'w') as f:
+                for stack, count in self.samples.most_common():
+                    f.write('{} {}\n'.format(stack, count))
+        self._profile_path = None
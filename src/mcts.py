@@ -0,0 +1,279 @@
+import math
+import time
+
+import numpy as np
+
+# PUCT search over QuoridorGame. The tree lives in flat arrays indexed by node id; the children
+# of a node are one contiguous block [first_child, first_child + num_children). Values are stored
+# from the point of view of the player who made the move into the node. With more than two
+# players the opponents are treated as one side. Simulations play their moves on the searched game
+# with make_move and take them back, so no game is copied.
+#
+# capacity counts child slots, not simulations: every expansion takes one slot per legal action
+# (up to 132 on 9x9 with walls), so a search expands at most capacity / num_of_actions leaves. The
+# default is num_of_actions * DEFAULT_EXPANSIONS, enough for 100k+ simulations per move. The arrays
+# start at INITIAL_NODES and double as the tree grows, about 40 bytes per slot (some 700 MB for a
+# full default tree on 9x9 with walls).
+
+ROOT = 0
+UNEXPANDED = -1
+DEFAULT_EXPANSIONS = 1 << 17
+INITIAL_NODES = 1 << 16
+
+# per node arrays and the value new slots start with
+_ARRAYS = [
+    ('parent', np.int32, -1),
+    ('action', np.int16, 0),
+    ('player', np.int8, 0),
+    ('first_child', np.int32, UNEXPANDED),
+    ('num_children', np.int16, 0),
+    ('visits', np.int32, 0),
+    ('value_sum', np.float32, 0),
+    ('prior', np.float32, 0),
+    ('in_flight', np.int16, 0),
+    ('terminal', bool, False),
+    ('terminal_value', np.float32, 0),
+    ('hash', np.uint64, 0)
+]
+
+
+# Adapts the D2Solver Q-network: softmax over Q-values as priors, tanh of the best one as value.
+def q_network_evaluator(model):
+    def evaluate(states):
+        q = model.predict(states, batch_size=len(states))
+        priors = np.exp(q - q.max(axis=1, keepdims=True))
+        priors /= priors.sum(axis=1, keepdims=True)
+        return priors, np.tanh(q.max(axis=1))
+    return evaluate
+
+
+class MCTS:
+    def __init__(self, evaluator, num_of_actions, capacity=None, c_puct=1.5, batch_size=32, virtual_loss=1.0):
+        self.evaluator = evaluator
+        self.num_of_actions = num_of_actions
+        self.capacity = capacity if capacity is not None else num_of_actions * DEFAULT_EXPANSIONS
+        self.c_puct = c_puct
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.allocated = 0
+        self._reserve(min(self.capacity, INITIAL_NODES))
+        self.root = ROOT
+        self.size = 0
+        self.max_nodes = self.capacity
+        self.evaluations = 0
+
+    # makes room for count nodes, doubling the arrays up to capacity
+    def _reserve(self, count):
+        if count <= self.allocated:
+            return
+        size = min(self.capacity, max(count, 2 * self.allocated))
+        for name, dtype, fill in _ARRAYS:
+            array = np.full(size, fill, dtype=dtype)
+            if self.allocated:
+                array[:self.allocated] = getattr(self, name)
+            setattr(self, name, array)
+        self.allocated = size
+
+    def reset(self):
+        self.size = 0
+        self.root = ROOT
+
+    def _new_node(self, parent, action, player):
+        node = self.size
+        self.size += 1
+        self.parent[node] = parent
+        self.action[node] = action
+        self.player[node] = player
+        self.first_child[node] = UNEXPANDED
+        self.num_children[node] = 0
+        self.visits[node] = 0
+        self.value_sum[node] = 0
+        self.prior[node] = 0
+        self.in_flight[node] = 0
+        self.terminal[node] = False
+        self.terminal_value[node] = 0
+        self.hash[node] = 0
+        return node
+
+    def _children(self, node):
+        first = self.first_child[node]
+        return first, first + self.num_children[node]
+
+    # re-roots at a known descendant (our move and the replies to it) if one matches the game
+    def _find_root(self, game, player):
+        key = np.uint64(game.state_hash(player))
+        frontier = [self.root]
+        for _ in range(game.num_of_players + 1):
+            for node in frontier:
+                if self.hash[node] == key and self.player[node] == player:
+                    return node
+            next_frontier = []
+            for node in frontier:
+                if self.first_child[node] != UNEXPANDED:
+                    next_frontier.extend(range(*self._children(node)))
+            frontier = next_frontier
+        return None
+
+    def advance(self, action):
+        if self.size == 0 or self.first_child[self.root] == UNEXPANDED:
+            self.reset()
+            return
+        first, last = self._children(self.root)
+        matches = np.flatnonzero(self.action[first:last] == action)
+        if len(matches) == 0:
+            self.reset()
+            return
+        self._set_root(first + matches[0])
+
+    def _set_root(self, node):
+        self.root = node
+        self.parent[node] = -1
+        if self.size > self.capacity // 2:
+            self._compact()
+
+    # copies the subtree under the root to the front of the arrays, keeping child blocks contiguous
+    def _compact(self):
+        order = [self.root]
+        new_first = {}
+        i = 0
+        while i < len(order):
+            node = order[i]
+            i += 1
+            if self.first_child[node] != UNEXPANDED:
+                new_first[node] = len(order)
+                order.extend(range(*self._children(node)))
+        order = np.array(order)
+        remap = np.full(self.size, -1, dtype=np.int32)
+        remap[order] = np.arange(len(order))
+        for array in (self.action, self.player, self.num_children, self.visits, self.value_sum,
+                      self.prior, self.in_flight, self.terminal, self.terminal_value, self.hash):
+            array[:len(order)] = array[order]
+        parents = self.parent[order]
+        self.parent[:len(order)] = np.where(parents >= 0, remap[np.maximum(parents, 0)], -1)
+        firsts = np.full(len(order), UNEXPANDED, dtype=np.int32)
+        for node, first in new_first.items():
+            firsts[remap[node]] = first
+        self.first_child[:len(order)] = firsts
+        self.root = ROOT
+        self.size = len(order)
+
+    def _select_child(self, node):
+        first, last = self._children(node)
+        visits = self.visits[first:last] + self.in_flight[first:last]
+        value = self.value_sum[first:last] - self.virtual_loss * self.in_flight[first:last]
+        q = np.where(visits > 0, value / np.maximum(visits, 1), 0.0)
+        u = self.c_puct * self.prior[first:last] * math.sqrt(visits.sum() + 1) / (1 + visits)
+        return first + int(np.argmax(q + u))
+
+    def _backup(self, path, value, player):
+        # value is for `player`, the one to move at the leaf
+        for node in path:
+            self.in_flight[node] -= 1
+            self.visits[node] += 1
+            mover = self.player[self.parent[node]] if self.parent[node] >= 0 else -1
+            self.value_sum[node] += value if mover == player else -value
+
+    def _expand(self, node, mask, priors):
+        legal = np.flatnonzero(mask)
+        if len(legal) == 0 or self.size + len(legal) > self.max_nodes:
+            return False
+        self._reserve(self.size + len(legal))
+        p = priors[legal]
+        p = p / p.sum() if p.sum() > 0 else np.full(len(legal), 1.0 / len(legal))
+        first = self.size
+        child_player = (self.player[node] + 1) % self.num_of_players
+        for action, prior in zip(legal, p):
+            child = self._new_node(node, action, child_player)
+            self.prior[child] = prior
+        self.first_child[node] = first
+        self.num_children[node] = len(legal)
+        return True
+
+    # walks down to a leaf playing the moves on game; the undo records take them back
+    def _simulate(self, game):
+        node = self.root
+        path = [node]
+        undo = []
+        self.in_flight[node] += 1
+        while self.first_child[node] != UNEXPANDED and not self.terminal[node]:
+            child = self._select_child(node)
+            undo.append(game.make_move(int(self.action[child]), int(self.player[node])))
+            node = child
+            path.append(node)
+            self.in_flight[node] += 1
+        return node, path, undo
+
+    def search(self, game, player, num_simulations=800, time_budget=None, max_nodes=None):
+        self.num_of_players = game.num_of_players
+        root = self._find_root(game, player) if self.size > 0 else None
+        if root is None:
+            self.reset()
+            self._reserve(1)
+            root = self._new_node(-1, 0, player)
+            self.hash[root] = np.uint64(game.state_hash(player))
+        self._set_root(root)
+        self.max_nodes = min(max_nodes or self.capacity, self.capacity)
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        simulations = 0
+        # leaf states are written straight into the evaluator's batch
+        states = np.empty((self.batch_size, len(game.state_view(player))))
+        while simulations < num_simulations and self.size + self.num_of_actions <= self.max_nodes:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            leaves = {}
+            for _ in range(min(self.batch_size, num_simulations - simulations)):
+                leaf, path, undo = self._simulate(game)
+                simulations += 1
+                try:
+                    self._visit_leaf(game, leaf, path, leaves, states)
+                finally:
+                    for record in reversed(undo):
+                        game.unmake_move(record)
+            if not leaves:
+                continue
+            nodes = list(leaves)
+            priors, values = self.evaluator(states[:len(nodes)])
+            self.evaluations += 1
+            for i, leaf in enumerate(nodes):
+                mask, paths = leaves[leaf]
+                # a pawn with no legal move ends the line as a draw
+                if not self._expand(leaf, mask, priors[i]) and not mask.any():
+                    self.terminal[leaf] = True
+                for path in paths:
+                    self._backup(path, float(values[i]), int(self.player[leaf]))
+        return self.policy()
+
+    # backs up terminal leaves, queues the others for evaluation with their state in states
+    def _visit_leaf(self, game, leaf, path, leaves, states):
+        leaf_player = int(self.player[leaf])
+        if self.terminal[leaf]:
+            self._backup(path, self.terminal_value[leaf], leaf_player)
+            return
+        finished, winner = game.is_finished()
+        if finished:
+            self.terminal[leaf] = True
+            self.terminal_value[leaf] = 0.0 if winner == -1 else (1.0 if winner == leaf_player else -1.0)
+            self._backup(path, self.terminal_value[leaf], leaf_player)
+            return
+        if leaf in leaves:
+            leaves[leaf][1].append(path)
+            return
+        if self.num_of_actions > 4:
+            mask = game.legal_action_mask(leaf_player)[:self.num_of_actions]
+        else:
+            mask = game.legal_step_mask(leaf_player)[:self.num_of_actions]
+        self.hash[leaf] = np.uint64(game.state_hash(leaf_player))
+        game.state_view(leaf_player, states[len(leaves)])
+        leaves[leaf] = (mask, [path])
+
+    def policy(self):
+        res = np.zeros(self.num_of_actions, dtype=np.float32)
+        if self.first_child[self.root] == UNEXPANDED:
+            return res
+        first, last = self._children(self.root)
+        res[self.action[first:last]] = self.visits[first:last]
+        total = res.sum()
+        return res / total if total > 0 else res
+
+    def best_action(self, game, player, **budget):
+        return int(np.argmax(self.search(game, player, **budget)))
@@ -0,0 +1,89 @@
+import numpy as np
+from checkpoint import load_weights, save_weights
+
+# Inference for the Dense Q-network without TensorFlow. Only NumPy is imported, so actors,
+# evaluation workers and the game server start in milliseconds. The .npz files are the ones
+# checkpoint.save_weights writes (w0, w1, ... as in model.get_weights()); export_model adds the
+# layer activations so other Dense stacks load as well.
+
+# activations of server.build_model, layer by layer
+ACTIVATIONS = ['linear', 'linear', 'tanh', 'softmax', 'linear']
+
+
+def _activate(x, activation):
+    if activation == 'linear':
+        return x
+    if activation == 'tanh':
+        return np.tanh(x)
+    if activation == 'relu':
+        return np.maximum(x, 0)
+    if activation == 'sigmoid':
+        return 1 / (1 + np.exp(-x))
+    if activation == 'softmax':
+        e = np.exp(x - x.max(axis=-1, keepdims=True))
+        return e / e.sum(axis=-1, keepdims=True)
+    raise ValueError('Unknown activation: {}'.format(activation))
+
+
+# weights are [kernel, bias, kernel, bias, ...]; a leading model axis on both the weights and
+# the states evaluates several models at once
+def forward(weights, states, activations=ACTIVATIONS):
+    x = np.asarray(states, dtype=weights[0].dtype)
+    for i, activation in enumerate(activations):
+        kernel, bias = weights[2 * i], weights[2 * i + 1]
+        x = _activate(np.matmul(x, kernel) + bias[..., None, :], activation)
+    return x
+
+
+# layer sizes of server.build_model
+def layer_sizes(observation_size, action_size):
+    return [observation_size, observation_size * 2, observation_size, observation_size, observation_size, action_size]
+
+
+class NumpyModel:
+    def __init__(self, weights, activations=ACTIVATIONS, dtype=np.float32):
+        if len(weights) != 2 * len(activations):
+            raise ValueError('Expected {} weight arrays for {} layers, got {}'.format(2 * len(activations), len(activations), len(weights)))
+        self.activations = list(activations)
+        self.dtype = np.dtype(dtype)
+        self.set_weights(weights)
+
+    @classmethod
+    def load(cls, path, dtype=np.float32):
+        with np.load(path) as data:
+            activations = [str(a) for a in data['activations']] if 'activations' in data.files else ACTIVATIONS
+        return cls(load_weights(path, dtype), activations, dtype)
+
+    def get_weights(self):
+        return list(self.weights)
+
+    def set_weights(self, weights):
+        self.weights = [np.ascontiguousarray(w, dtype=self.dtype) for w in weights]
+
+    # same arguments and output as keras' model.predict
+    def predict(self, states, batch_size=None):
+        states = np.asarray(states)
+        if batch_size is None or len(states) <= batch_size:
+            return forward(self.weights, states, self.activations)
+        return np.concatenate([forward(self.weights, states[i:i + batch_size], self.activations)
+                               for i in range(0, len(states), batch_size)])
+
+
+# an untrained model shaped like server.build_model, glorot uniform kernels and zero biases as in keras
+def build_model(observation_size, action_size, dtype=np.float32, seed=None):
+    rnd = np.random.default_rng(seed)
+    sizes = layer_sizes(observation_size, action_size)
+    weights = []
+    for n_in, n_out in zip(sizes, sizes[1:]):
+        limit = np.sqrt(6 / (n_in + n_out))
+        weights += [rnd.uniform(-limit, limit, (n_in, n_out)), np.zeros(n_out)]
+    return NumpyModel(weights, ACTIVATIONS, dtype)
+
+
+# saves a keras Dense stack (or a NumpyModel) for NumpyModel.load
+def export_model(model, path, half=False):
+    if isinstance(model, NumpyModel):
+        activations = model.activations
+    else:
+        activations = [layer.get_config()['activation'] for layer in model.layers]
+    save_weights(path, model.get_weights(), half, activations=np.array(activations))
@@ -0,0 +1,154 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+from checkpoint import load_weights, save_weights
+from numpy_model import ACTIVATIONS, forward
+
+# A league of past learner snapshots to play against. Opponents are sampled by prioritized
+# fictitious self-play: the worse the learner does against one, the more often it is picked.
+# Weights live on disk in `directory` and are cached in memory up to `memory_cap` bytes,
+# evicting the least recently used opponent first.
+#
+# Opponents are evaluated with numpy_model instead of Keras, and models with the same shapes are
+# stacked so that predict_many runs every opponent in one batched matmul per layer.
+
+PFSP_HARD = 'hard'
+PFSP_VARIANCE = 'variance'
+PFSP_UNIFORM = 'uniform'
+
+DEFAULT_MEMORY_CAP = 64 * 1024 * 1024
+# win rate assumed for an opponent that has not been played yet
+PRIOR_WIN_RATE = 0.5
+PRIOR_GAMES = 1
+
+
+def pfsp_priority(win_rate, weighting=PFSP_HARD):
+    if weighting == PFSP_HARD:
+        return (1 - win_rate) ** 2
+    if weighting == PFSP_VARIANCE:
+        return win_rate * (1 - win_rate)
+    if weighting == PFSP_UNIFORM:
+        return np.ones_like(win_rate)
+    raise ValueError('Unknown weighting: {}'.format(weighting))
+
+
+class OpponentPool:
+    def __init__(self, directory, memory_cap=DEFAULT_MEMORY_CAP, max_opponents=None,
+                 weighting=PFSP_HARD, half=False, activations=ACTIVATIONS, seed=None):
+        pfsp_priority(np.zeros(1), weighting)
+        self.directory = directory
+        self.memory_cap = memory_cap
+        self.max_opponents = max_opponents
+        self.weighting = weighting
+        self.half = half
+        self.activations = activations
+        self.rnd = np.random.default_rng(seed)
+        # name -> [games, learner wins], in the order the opponents were added
+        self.results = OrderedDict()
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def names(self):
+        return list(self.results)
+
+    def path(self, name):
+        return os.path.join(self.directory, '{}.npz'.format(name))
+
+    def add(self, name, weights):
+        save_weights(self.path(name), weights, self.half)
+        self.results[name] = [0, 0]
+        self._drop(name)
+        self._cache(name, [np.array(w, dtype=np.float32) for w in weights])
+        if self.max_opponents is not None:
+            while len(self.results) > self.max_opponents:
+                self.remove(next(iter(self.results)))
+
+    def remove(self, name):
+        del self.results[name]
+        self._drop(name)
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def record(self, name, learner_won):
+        if name in self.results:
+            self.results[name][0] += 1
+            self.results[name][1] += int(learner_won)
+
+    def win_rates(self):
+        counts = np.array(list(self.results.values()), dtype=np.float64).reshape(-1, 2)
+        return (counts[:, 1] + PRIOR_WIN_RATE * PRIOR_GAMES) / (counts[:, 0] + PRIOR_GAMES)
+
+    def probabilities(self):
+        priorities = pfsp_priority(self.win_rates(), self.weighting) + 1e-6
+        return priorities / priorities.sum()
+
+    def sample(self):
+        if not self.results:
+            return None
+        return self.names()[self.rnd.choice(len(self.results), p=self.probabilities())]
+
+    def weights(self, name):
+        weights = self.cache.get(name)
+        if weights is not None:
+            self.cache.move_to_end(name)
+            return weights
+        if name not in self.results:
+            raise KeyError(name)
+        self.loads += 1
+        weights = load_weights(self.path(name))
+        self._cache(name, weights)
+        return weights
+
+    def _cache(self, name, weights):
+        self.cache[name] = weights
+        self.cached_bytes += sum(w.nbytes for w in weights)
+        # the opponent just asked for always stays, even when it alone is over the cap
+        while self.cached_bytes > self.memory_cap and len(self.cache) > 1:
+            cold = next(iter(self.cache))
+            self._drop(cold)
+            self.evictions += 1
+
+    def _drop(self, name):
+        weights = self.cache.pop(name, None)
+        if weights is not None:
+            self.cached_bytes -= sum(w.nbytes for w in weights)
+
+    def predict(self, name, states):
+        return forward(self.weights(name), np.reshape(states, (-1, np.shape(states)[-1])), self.activations)
+
+    # Q-values for states[i] as seen by opponent names[i]; all opponents share one forward pass
+    def predict_many(self, names, states):
+        states = np.asarray(states, dtype=np.float32)
+        unique, inverse = np.unique(np.asarray(names), return_inverse=True)
+        rows = [np.flatnonzero(inverse == i) for i in range(len(unique))]
+        batch = np.zeros((len(unique), max(len(r) for r in rows), states.shape[-1]), dtype=np.float32)
+        for i, r in enumerate(rows):
+            batch[i, :len(r)] = states[r]
+        models = [self.weights(name) for name in unique]
+        stacked = [np.stack(layer) for layer in zip(*models)]
+        q = forward(stacked, batch, self.activations)
+        res = np.empty((len(states), q.shape[-1]), dtype=q.dtype)
+        for i, r in enumerate(rows):
+            res[r] = q[i, :len(r)]
+        return res
+
+    def stats(self):
+        return {
+            'opponents': len(self.results),
+            'cached': len(self.cache),
+            'cached_bytes': self.cached_bytes,
+            'loads': self.loads,
+            'evictions': self.evictions
+        }
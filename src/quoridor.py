@@ -1,5 +1,8 @@
 import numpy as np
-from queue import Queue
+from collections import deque
+import zobrist
+import bitmask
+from distance_map import DistanceMap
 
 # moves 0 up, 1 right, 2 down, 3 left, rest -> border on a position
 
@@ -14,6 +17,83 @@ DIR_RIGHT_AND_DOWN = 2
 
 ALL_FREE = (1 << (DIR_RIGHT_AND_DOWN + 1)) - 1
 
+ENGINE_ARRAY = 'array'
+ENGINE_BITBOARD = 'bitboard'
+
+
+def create_game(num_of_players, sx, sy, engine=ENGINE_ARRAY):
+    if engine == ENGINE_ARRAY:
+        return QuoridorGame(num_of_players, sx, sy)
+    if engine == ENGINE_BITBOARD:
+        import bitboard
+        return bitboard.BitboardQuoridorGame(num_of_players, sx, sy)
+    raise ValueError('Unknown engine: {}'.format(engine))
+
+
+_board_tables = {}
+
+
+# Lookups that depend only on the board size, built once and shared by every game of that size:
+#   steps[position][move] = (target, cell, bit): the cell a step reaches (-1 off the board) and the
+#       board bit of `cell` that has to be set for it; neighbours[position] lists the on-board ones
+#   slot_edges[slot] = the three (direction, position) edge bits a wall removes, movement edges first
+#   edge_slots[(direction, position)] = every slot using that edge bit
+#   slot_nodes[slot] = the two cell pairs a wall separates, as find_nodes returns them
+#   slot_cells (slots, 2) and slot_bits (slots,): the movement edges of every slot as arrays
+#   goals[player] = the goal line of each player
+class BoardTables:
+    def __init__(self, sx, sy):
+        self.sx = sx
+        self.sy = sy
+        self.steps = []
+        for position in range(sx * sy):
+            x, y = divmod(position, sy)
+            row = []
+            for move in range(4):
+                nx, ny = QuoridorGame.calculate_new_position(x, y, move)
+                if not (0 <= nx < sx and 0 <= ny < sy):
+                    row.append((-1, position, 0))
+                    continue
+                # the edge bit lives on the upper-left of the two cells
+                direction = DIR_RIGHT if nx != x else DIR_DOWN
+                row.append((nx * sy + ny, min(nx, x) * sy + min(ny, y), 1 << direction))
+            self.steps.append(tuple(row))
+        self.neighbours = [tuple(step for step in row if step[0] >= 0) for row in self.steps]
+
+        self.slot_edges = []
+        self.slot_nodes = []
+        for direction in (DIR_RIGHT, DIR_DOWN):
+            for x in range(sx - 1):
+                for y in range(sy - 1):
+                    p = x * sy + y
+                    if direction == DIR_RIGHT:
+                        self.slot_edges.append(((DIR_RIGHT, p), (DIR_RIGHT, p + 1), (DIR_RIGHT_AND_DOWN, p)))
+                        self.slot_nodes.append((((x, y), (x, y + 1)), ((x + 1, y), (x + 1, y + 1))))
+                    else:
+                        self.slot_edges.append(((DIR_DOWN, p), (DIR_DOWN, p + sy), (DIR_RIGHT_AND_DOWN, p)))
+                        self.slot_nodes.append((((x, y), (x + 1, y)), ((x, y + 1), (x + 1, y + 1))))
+        self.edge_slots = {}
+        for slot, edges in enumerate(self.slot_edges):
+            for edge in edges:
+                self.edge_slots.setdefault(edge, []).append(slot)
+        self.slot_cells = np.array([[edges[0][1], edges[1][1]] for edges in self.slot_edges], dtype=np.int64).reshape(-1, 2)
+        self.slot_bits = np.array([1 << edges[0][0] for edges in self.slot_edges], dtype=np.int64)
+
+        self.goals = [
+            [x * sy + sy - 1 for x in range(sx)],
+            [x * sy for x in range(sx)],
+            [(sx - 1) * sy + y for y in range(sy)],
+            [y for y in range(sy)]
+        ]
+
+
+def board_tables(sx, sy):
+    key = (sx, sy)
+    if key not in _board_tables:
+        _board_tables[key] = BoardTables(sx, sy)
+    return _board_tables[key]
+
+
 class QuoridorGame:
     @staticmethod
     def init_positions(num_of_players, rows, cols):
@@ -29,15 +109,150 @@ class QuoridorGame:
         self.num_of_players = num_of_players
         self.sx = sx
         self.sy = sy
+        self.tables = board_tables(sx, sy)
         self.positions = self.init_positions(num_of_players, sx, sy)
         self.board = np.full((sx, sy), ALL_FREE)
         self.dominoes = np.full(num_of_players, 5)
+        self.init_distance_maps()
+        self.init_hash()
+        self.init_wall_slots()
+        self._state = None
+
+    def copy(self):
+        game = object.__new__(type(self))
+        game.__dict__.update(self.__dict__)
+        game.positions = np.copy(self.positions)
+        game.dominoes = np.copy(self.dominoes)
+        game.board = np.copy(self.board)
+        game.wall_free = np.copy(self.wall_free)
+        game.distance_maps = [distance_map.copy(game.neighbours) for distance_map in self.distance_maps]
+        game._state = None
+        return game
 
     def init_from_state(self, game_state):
         self.positions = game_state[:self.num_of_players]
         self.dominoes = game_state[self.num_of_players:self.num_of_players * 2]
         board = game_state[self.num_of_players * 2:self.sx * self.sy + self.num_of_players * 2]
         self.board = np.reshape(board, (self.sx, self.sy))
+        self.init_distance_maps()
+        self.init_hash()
+        self.init_wall_slots()
+
+    # Zobrist hash of positions, removed edges and dominoes, updated on every change
+    def init_hash(self):
+        self.zobrist = zobrist.table(self.num_of_players, self.sx, self.sy)
+        self.hash = self.zobrist.compute(self.positions, self.dominoes, self.board)
+
+    def state_hash(self, player):
+        return self.hash ^ self.zobrist.to_move[int(player)]
+
+    # wall_free[slot]: all three edges of the slot are still there, updated as edges are removed
+    def init_wall_slots(self):
+        self.slot_edges, self.edge_slots = self.tables.slot_edges, self.tables.edge_slots
+        cells = np.asarray(self.board).astype(np.int64).reshape(-1)
+        self.wall_free = np.array([all((cells[p] >> d) & 1 for d, p in edges) for edges in self.slot_edges], dtype=bool)
+        self._blocked = None
+
+    def edge_removed_from_slots(self, direction, position):
+        for slot in self.edge_slots.get((direction, position), ()):
+            self.wall_free[slot] = False
+
+    def move_masks(self):
+        return bitmask.move_masks(self.board, self.sx, self.sy)
+
+    # Free wall slots that would leave some player without a path to its goal. Only walls crossing a
+    # player's shortest path can cut it off, so only those are flooded. The result is kept per player
+    # with that path and stays valid until a wall is placed or the pawn leaves the path; a step along
+    # the path only has to recheck the slots of the edges it walked past.
+    def blocking_wall_slots(self):
+        walls = self.walls_hash()
+        if self._blocked is None or self._blocked[0] != walls:
+            self._blocked = (walls, {})
+        paths = self._blocked[1]
+        masks = []
+        blocked = set()
+        for player in range(min(self.num_of_players, len(bitmask.board_masks(self.sx, self.sy)[2]))):
+            blocked |= self._player_blocking(player, paths, masks)
+        return sorted(blocked)
+
+    # hash of the walls and dominoes only, the pawns are taken out
+    def walls_hash(self):
+        res = self.hash
+        for player, position in enumerate(self.positions):
+            res ^= self.zobrist.pawn[player][int(position)]
+        return res
+
+    # paths[player] = (position, path cells from it, path edges, blocked slots)
+    def _player_blocking(self, player, paths, masks):
+        position = int(self.positions[player])
+        entry = paths.get(player)
+        if entry is not None and entry[0] == position:
+            return entry[3]
+        if not masks:
+            masks.extend(self.move_masks())
+        move_right, move_down = masks
+        goal = bitmask.board_masks(self.sx, self.sy)[2][player]
+        if entry is not None and position in entry[1]:
+            i = entry[1].index(position)
+            cells, edges = entry[1][i:], entry[2][i:]
+            passed = {slot for edge in entry[2][:i] for slot in self.edge_slots[edge]}
+            ahead = {slot for edge in edges for slot in self.edge_slots[edge]}
+            # the old and new position stay connected under any other wall, so their answers agree
+            blocked = entry[3] - passed
+            blocked |= {slot for slot in passed & ahead if self._cuts_off(slot, position, goal, move_right, move_down)}
+        else:
+            layers = bitmask.flood_layers(position, goal, move_right, move_down, self.sy)
+            # a player who is already cut off cannot be cut off by another wall
+            if layers is None:
+                paths[player] = (position, [position], [], set())
+                return paths[player][3]
+            edges = list(reversed(bitmask.path_edges(layers, goal, move_right, move_down, self.sy)))
+            cells = [position]
+            for direction, cell in edges:
+                cells.append(cell + (1 if direction == DIR_DOWN else self.sy) if cells[-1] == cell else cell)
+            candidates = {slot for edge in edges for slot in self.edge_slots[edge]}
+            blocked = {slot for slot in candidates if self._cuts_off(slot, position, goal, move_right, move_down)}
+        paths[player] = (position, cells, edges, blocked)
+        return blocked
+
+    def _cuts_off(self, slot, position, goal, move_right, move_down):
+        if not self.wall_free[slot]:
+            return False
+        (direction, first), (_, second) = self.slot_edges[slot][:2]
+        cut = ~((1 << first) | (1 << second))
+        right = move_right & cut if direction == DIR_RIGHT else move_right
+        down = move_down & cut if direction == DIR_DOWN else move_down
+        return bitmask.flood_distance(position, goal, right, down, self.sy) == -1
+
+    def legal_step_mask(self, player, mask=None):
+        if mask is None:
+            mask = np.zeros(4, dtype=bool)
+        cells = self.board.flat
+        for move, (target, cell, bit) in enumerate(self.tables.steps[int(self.positions[player])]):
+            mask[move] = target >= 0 and int(cells[cell]) & bit > 0
+        return mask
+
+    def legal_action_mask(self, player):
+        mask = np.zeros(self.num_of_possible_moves(), dtype=bool)
+        self.legal_step_mask(player, mask)
+        if self.dominoes[player] > 0:
+            walls = mask[4:]
+            walls[:] = self.wall_free
+            walls[self.blocking_wall_slots()] = False
+        return mask
+
+    def legal_moves(self, player):
+        return np.flatnonzero(self.legal_action_mask(player))
+
+    # per-player distance to the goal line for every cell, updated when an edge is removed
+    def init_distance_maps(self):
+        goals = self.tables.goals
+        self.distance_maps = [DistanceMap(self.neighbours, goals[player], self.sx * self.sy)
+                              for player in range(min(self.num_of_players, len(goals)))]
+
+    def neighbours(self, position):
+        cells = self.board.flat
+        return [target for target, cell, bit in self.tables.neighbours[int(position)] if int(cells[cell]) & bit]
 
     def do_move(self, move, player):
         if move < 4:
@@ -48,11 +263,69 @@ class QuoridorGame:
 
         return np.concatenate((self.positions, self.dominoes, np.reshape(self.board, self.sx * self.sy)))
 
+    # Applies move like do_move without building a state and returns the undo record for
+    # unmake_move: (hash, player, previous position, wall), where wall holds the board cells the
+    # wall changes, the wall slots it closes and the distance lists it replaces. Moves have to be
+    # taken back in reverse order.
+    def make_move(self, move, player):
+        move = int(move)
+        previous = self.hash
+        if move < 4:
+            position = self.positions[player]
+            self.do_step(player, move)
+            return previous, player, position, None
+        if self.dominoes[player] <= 0:
+            return previous, player, None, None
+        edges = self.slot_edges[move - 4]
+        board = self.board.flat
+        cells = [(edges[0][1], int(board[edges[0][1]])), (edges[1][1], int(board[edges[1][1]]))]
+        free = [slot for edge in edges for slot in self.edge_slots[edge] if self.wall_free[slot]]
+        dists = [distance_map.dist for distance_map in self.distance_maps]
+        for distance_map in self.distance_maps:
+            distance_map.dist = list(distance_map.dist)
+        self.add_border(move - 4, player)
+        if self.hash == previous:
+            for distance_map, dist in zip(self.distance_maps, dists):
+                distance_map.dist = dist
+            return previous, player, None, None
+        return previous, player, None, (cells, free, dists)
+
+    def unmake_move(self, undo):
+        previous, player, position, wall = undo
+        if position is not None:
+            self.positions[player] = position
+        if wall is not None:
+            cells, free, dists = wall
+            board = self.board.flat
+            for cell, value in cells:
+                board[cell] = value
+            self.wall_free[free] = True
+            for distance_map, dist in zip(self.distance_maps, dists):
+                distance_map.dist = dist
+            self.dominoes[player] += 1
+        self.hash = previous
+
+    # get_game_state(player) written into out, or into a buffer owned by the game that the next
+    # call overwrites; nothing is allocated
+    def state_view(self, player, out=None):
+        n = self.num_of_players
+        if out is None:
+            if self._state is None:
+                self._state = np.empty(1 + 2 * n + self.sx * self.sy)
+            out = self._state
+        out[0] = player
+        out[1:1 + n] = self.positions
+        out[1 + n:1 + 2 * n] = self.dominoes
+        out[1 + 2 * n:] = self.board.reshape(-1)
+        return out
+
     def do_step(self, player, move):
-        player_x, player_y = self.to_coordinates(self.positions[player])
-        new_x, new_y = self.calculate_new_position(player_x, player_y, move)
-        if self.in_board(new_x, new_y) and self.connected((player_x, player_y), (new_x, new_y)):
-            self.positions[player] = self.to_position(new_x, new_y)
+        position = int(self.positions[player])
+        target, cell, bit = self.tables.steps[position][move]
+        if target >= 0 and int(self.board.flat[cell]) & bit:
+            keys = self.zobrist.pawn[player]
+            self.hash ^= keys[position] ^ keys[target]
+            self.positions[player] = target
 
     # step over is not here yet :(
     def add_border(self, location, player):
@@ -62,36 +335,19 @@ class QuoridorGame:
             self.remove_edge(from_nodes[0], to_nodes[0])
             self.remove_edge(from_nodes[1], to_nodes[1])
             self.remove_edge(from_nodes[0], to_nodes[1])
+            self.hash ^= self.zobrist.domino_key(player, self.dominoes[player])
             self.dominoes[player] -= 1
+            self.hash ^= self.zobrist.domino_key(player, self.dominoes[player])
 
     def get_game_state(self, player):
         return np.concatenate((np.full(1, player), np.copy(self.positions), np.copy(self.dominoes), np.copy(self.board).reshape(self.sy * self.sx)))
 
+    # ((from, from), (to, to)) cells on both sides of a wall, horizontal slots first
     def find_nodes(self, location):
-        # horizontal
-        if location < (self.sx - 1) * (self.sy - 1):
-            x = location // (self.sy - 1)
-            y = location % (self.sy - 1)
-            return ((x, y), (x, y + 1)), \
-                   ((x + 1, y), (x + 1, y + 1))
-        # vertical
-        else:
-            location -= (self.sx - 1) * (self.sy - 1)
-            x = location // (self.sy - 1)
-            y = location % (self.sy - 1)
-            return ((x, y), (x + 1, y)), \
-                   ((x, y + 1), (x + 1, y + 1))
+        return self.tables.slot_nodes[location]
 
     def shortest_path_for_player_to_win(self, player):
-        dests = [
-            (-1,          self.sy - 1),
-            (-1,          0          ),
-            (self.sx - 1, -1         ),
-            (0,           -1         )
-        ]
-        player_pos = self.positions[player]
-        x, y = self.to_coordinates(player_pos)
-        return self.shortest_path(x, y, dests[player][0], dests[player][1])
+        return self.distance_maps[player].distance(self.positions[player])
 
 
     def is_finished(self):
@@ -133,8 +389,16 @@ class QuoridorGame:
     def remove_edge(self, from_coords, to_coords):
         direction = self.find_direction(from_coords, to_coords)
         val = int(self.board[int(from_coords[0]), int(from_coords[1])])
+        a = self.to_position(int(from_coords[0]), int(from_coords[1]))
+        if val & (1 << direction):
+            self.hash ^= self.zobrist.edge[direction][a]
+            self.edge_removed_from_slots(direction, a)
         val &= ~(1 << direction)
         self.board[int(from_coords[0]), int(from_coords[1])] = val
+        if direction != DIR_RIGHT_AND_DOWN:
+            b = self.to_position(int(to_coords[0]), int(to_coords[1]))
+            for distance_map in self.distance_maps:
+                distance_map.edge_removed(a, b)
 
     def connected(self, coords_1, coords_2):
         if coords_1 == coords_2:
@@ -159,23 +423,23 @@ class QuoridorGame:
 
     # you can specify -1 for one of the destination coordinates if you don't care about it
     def shortest_path(self, x1, y1, x2, y2):
-        q = Queue()
-        visited = []
-        q.put((x1, y1, 0))
-        while not q.empty():
-            x, y, l = q.get()
+        cells = self.board.flat
+        neighbours = self.tables.neighbours
+        start = self.to_position(x1, y1)
+        q = deque()
+        visited = bytearray(self.sx * self.sy)
+        q.append((start, 0))
+        visited[start] = 1
+        while q:
+            position, l = q.popleft()
+            x, y = divmod(position, self.sy)
             if (x == x2 or x2 == -1) and (y == y2 or y2 == -1):
                 return l
-            p = self.to_position(x, y)
-            visited.append(p)
-            for i in range(4):
-                nx, ny = QuoridorGame.calculate_new_position(x, y, i)
-                np = self.to_position(nx, ny)
-                # check if valid and reachable from current point
-                if not self.in_board(nx, ny) or not self.connected((x, y), (nx, ny)):
-                    continue
-                if np not in visited:
-                    q.put((nx, ny, l + 1))
+            # reachable neighbours on the board that were not visited yet
+            for target, cell, bit in neighbours[position]:
+                if not visited[target] and int(cells[cell]) & bit:
+                    visited[target] = 1
+                    q.append((target, l + 1))
         return -1
 
     @staticmethod
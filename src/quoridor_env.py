@@ -1,18 +1,40 @@
-import gym
 import quoridor
-from gym import spaces
 
+# gym is only imported when QuoridorEnv is first used: the class is put together from
+# _QuoridorEnv and gym.Env on first access, so importing this module for its constants is cheap.
+
+# the size of envs created without one; QuoridorEnv, D2Solver and the self-play workers take
+# num_of_players, sx and sy arguments
 ROWS = 9
 COLS = 9
 NUMBER_OF_PLAYERS = 2
+ENV_ID = 'quoridor-v0'
+
+
+# length of get_game_state: player to move, positions, dominoes and the board cells
+def observation_size(num_of_players=None, sx=None, sy=None):
+    num_of_players, sx, sy = env_shape(num_of_players, sx, sy)
+    return sx * sy + num_of_players * 2 + 1
+
+
+# (num_of_players, sx, sy) with the module constants for whatever is None
+def env_shape(num_of_players=None, sx=None, sy=None):
+    return (NUMBER_OF_PLAYERS if num_of_players is None else num_of_players,
+            ROWS if sx is None else sx, COLS if sy is None else sy)
 
 
-class QuoridorEnv(gym.Env):
-    def __init__(self, player=0):
+class _QuoridorEnv:
+    def __init__(self, player=0, engine=quoridor.ENGINE_ARRAY, cache=None, num_of_players=None, sx=None, sy=None):
+        from gym import spaces
+
+        self.num_of_players, self.sx, self.sy = env_shape(num_of_players, sx, sy)
         self.init_player = player
-        self.game = quoridor.QuoridorGame(NUMBER_OF_PLAYERS, ROWS, COLS)
+        self.engine = engine
+        # optional zobrist.TranspositionTable for rewards, keyed by state hash
+        self.cache = cache
+        self.game = quoridor.create_game(self.num_of_players, self.sx, self.sy, engine)
         self.action_space = spaces.Discrete(4)
-        self.observation_space = spaces.Discrete(ROWS * COLS + NUMBER_OF_PLAYERS * 2 + 1)
+        self.observation_space = spaces.Discrete(observation_size(self.num_of_players, self.sx, self.sy))
         self.player = player
         self.reward_range = [0, 1]
         self.metadata['render.modes'] = ['ansi']
@@ -25,13 +47,13 @@ class QuoridorEnv(gym.Env):
 
         self.game.do_move(action, self.player)
         reward = self._calculate_reward()
-        self.player = (self.player + 1) % NUMBER_OF_PLAYERS
+        self.player = (self.player + 1) % self.num_of_players
         return self.game.get_game_state(self.player), reward, self.game.is_finished()[0], 'Action: {}'.format(action)
 
     def _reset(self):
-        self.game = quoridor.QuoridorGame(NUMBER_OF_PLAYERS, ROWS, COLS)
-        self.player = (self.init_player + 1) % NUMBER_OF_PLAYERS
-        self.init_player = (self.init_player + 1) % NUMBER_OF_PLAYERS
+        self.game = quoridor.create_game(self.num_of_players, self.sx, self.sy, self.engine)
+        self.player = (self.init_player + 1) % self.num_of_players
+        self.init_player = (self.init_player + 1) % self.num_of_players
         return self.game.get_game_state(self.player)
 
     def _isDone(self):
@@ -44,16 +66,65 @@ class QuoridorEnv(gym.Env):
     def _seed(self, seed=None):
         return [seed]
 
+    # gym >= 0.9.6 calls step/reset/render/seed directly instead of the underscored hooks
+    def step(self, action):
+        return self._step(action)
+
+    def reset(self):
+        return self._reset()
+
+    def render(self, mode='ansi', close=False):
+        return self._render(mode, close)
+
+    def seed(self, seed=None):
+        return self._seed(seed)
+
+    # the steps only action space never pays for wall legality
+    def legal_action_mask(self):
+        if self.action_space.n <= 4:
+            return self.game.legal_step_mask(self.player)[:self.action_space.n]
+        return self.game.legal_action_mask(self.player)[:self.action_space.n]
+
+    def state_hash(self):
+        return self.game.state_hash(self.player)
+
     def _calculate_reward(self):
-        finished = self.game.is_finished()
-        if finished[0]:
-            if finished[1] == self.player:
-                return 1
-            # max for -1 if there is no path
-            return max(0, (max(self.game.sx, self.game.sy) - self.game.shortest_path_for_player_to_win(self.player)) * 0.1)
-        return 0
-
-gym.envs.register(
-    id='quoridor-v0',
-    entry_point='quoridor_env:QuoridorEnv'
-)
\ No newline at end of file
+        if self.cache is None:
+            return self._reward()
+        key = self.state_hash()
+        reward = self.cache.get(key)
+        if reward is None:
+            reward = self._reward()
+            self.cache.put(key, reward)
+        return reward
+
+    def _reward(self):
+        return reward(self.game, self.player)
+
+
+# reward of player for the move that led to game
+def reward(game, player):
+    finished = game.is_finished()
+    if finished[0]:
+        if finished[1] == player:
+            return 1
+        # max for -1 if there is no path
+        return max(0, (max(game.sx, game.sy) - game.shortest_path_for_player_to_win(player)) * 0.1)
+    return 0
+
+def __getattr__(name):
+    if name == 'QuoridorEnv':
+        import gym
+        cls = type('QuoridorEnv', (_QuoridorEnv, gym.Env), {'__module__': __name__})
+        globals()['QuoridorEnv'] = cls
+        return cls
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# makes gym.make(ENV_ID) work, safe to call more than once
+def register():
+    import gym
+    try:
+        gym.spec(ENV_ID)
+    except gym.error.Error:
+        gym.envs.register(id=ENV_ID, entry_point='quoridor_env:QuoridorEnv')
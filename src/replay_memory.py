@@ -0,0 +1,106 @@
+import numpy as np
+
+
+# Every field of a game state (player, positions, dominoes, board cells) is a small non-negative
+# integer bounded by the number of cells, so states are stored in the smallest unsigned type.
+def state_dtype(sx, sy):
+    return np.min_scalar_type(max(sx * sy, 1 << 3))
+
+
+# one byte while every action fits, two otherwise; None keeps room for any action space
+def action_dtype(num_of_actions=None):
+    return np.dtype('u1') if num_of_actions is not None and num_of_actions <= 256 else np.dtype('<u2')
+
+
+def transition_dtype(state_size, state_type=np.uint8, action_type=np.uint8):
+    return np.dtype([
+        ('state', state_type, (state_size,)),
+        ('action', action_type),
+        ('reward', np.float32),
+        ('next_state', state_type, (state_size,)),
+        ('done', np.bool_)
+    ])
+
+
+class ReplayMemory:
+    def __init__(self, capacity, state_size, state_type=np.uint8, num_of_actions=None, seed=None):
+        self.capacity = capacity
+        self.dtype = transition_dtype(state_size, state_type, action_dtype(num_of_actions))
+        self.data = self._allocate()
+        self.size = 0
+        self.next = 0
+        self.rnd = np.random.default_rng(seed)
+        # indices of the transitions with a positive reward, kept up to date as rows are written
+        self._positive = set()
+        self._positive_indices = None
+
+    # the transition array, subclasses that keep their records elsewhere start with less
+    def _allocate(self):
+        return np.zeros(self.capacity, dtype=self.dtype)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def append(self, state, action, reward, next_state, done):
+        row = self.data[self.next]
+        row['state'] = np.reshape(state, -1)
+        row['action'] = action
+        row['reward'] = reward
+        row['next_state'] = np.reshape(next_state, -1)
+        row['done'] = done
+        if row['reward'] > 0:
+            self._positive.add(self.next)
+            self._positive_indices = None
+        elif self.next in self._positive:
+            self._positive.discard(self.next)
+            self._positive_indices = None
+        self.next = (self.next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        count = len(actions)
+        if count > self.capacity:
+            states, actions, rewards, next_states, dones = (a[-self.capacity:] for a in (states, actions, rewards, next_states, dones))
+            count = self.capacity
+        idx = (self.next + np.arange(count)) % self.capacity
+        self.data['state'][idx] = np.reshape(states, (count, -1))
+        self.data['action'][idx] = actions
+        self.data['reward'][idx] = rewards
+        self.data['next_state'][idx] = np.reshape(next_states, (count, -1))
+        self.data['done'][idx] = dones
+        self._index_rewards(idx)
+        self.next = (self.next + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    # updates the positive set for rows that were just written
+    def _index_rewards(self, indices):
+        self._positive.difference_update(indices.tolist())
+        self._positive.update(indices[self.data['reward'][indices] > 0].tolist())
+        self._positive_indices = None
+
+    # transitions with a positive reward, as sorted indices into data
+    def positive_indices(self):
+        if self._positive_indices is None:
+            self._positive_indices = np.array(sorted(self._positive), dtype=np.int64)
+        return self._positive_indices
+
+    def sample_indices(self, batch_size):
+        return self.rnd.choice(self.size, min(self.size, batch_size), replace=False)
+
+    def sample_positive_indices(self, batch_size):
+        positive = self.positive_indices()
+        return positive[self.rnd.choice(len(positive), min(len(positive), batch_size), replace=False)]
+
+    def get(self, indices):
+        rows = self.data[indices]
+        return rows['state'], rows['action'], rows['reward'], rows['next_state'], rows['done']
+
+    def sample(self, batch_size, positive_batch_size=0):
+        indices = self.sample_indices(batch_size)
+        if positive_batch_size > 0:
+            indices = np.concatenate((indices, self.sample_positive_indices(positive_batch_size)))
+        return self.get(indices)
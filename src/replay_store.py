@@ -0,0 +1,138 @@
+import fcntl
+import os
+
+import numpy as np
+from replay_memory import ReplayMemory
+
+# File layout: a fixed 64 byte header followed by transition records (replay_memory.transition_dtype).
+# Writers take an exclusive flock, append their records after the last one and then bump the count
+# in the header, so readers never see a record that is not completely written.
+
+MAGIC = b'QRPSTORE'
+VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('state_size', '<u4'),
+    ('state_type', 'S8'),
+    ('action_type', 'S8'),
+    ('count', '<u8'),
+    ('reserved', 'V24')
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+COUNT_OFFSET = HEADER_DTYPE.fields['count'][1]
+
+
+class ReplayStore(ReplayMemory):
+    def __init__(self, path, state_size, state_type=np.uint8, num_of_actions=None, seed=None, flush_every=1024):
+        self.path = path
+        # the store grows without bound, records are mapped from the file by refresh()
+        super().__init__(None, state_size, state_type, num_of_actions, seed)
+        self.flush_every = flush_every
+        self.pending = np.zeros(flush_every, dtype=self.dtype)
+        self.pending_size = 0
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                header = np.zeros(1, dtype=HEADER_DTYPE)
+                header['magic'] = MAGIC
+                header['version'] = VERSION
+                header['state_size'] = state_size
+                header['state_type'] = self.dtype['state'].base.str
+                header['action_type'] = self.dtype['action'].str
+                os.pwrite(self.fd, header.tobytes(), 0)
+            else:
+                self._check_header(os.pread(self.fd, HEADER_SIZE, 0))
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.refresh()
+
+    def _check_header(self, raw):
+        header = np.frombuffer(raw, dtype=HEADER_DTYPE)[0]
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            raise ValueError('{} is not a replay store'.format(self.path))
+        expected = (self.dtype['state'].shape[0], self.dtype['state'].base.str, self.dtype['action'].str)
+        found = (int(header['state_size']), header['state_type'].decode(), header['action_type'].decode())
+        if expected != found:
+            raise ValueError('{} stores {}, expected {}'.format(self.path, found, expected))
+
+    def _allocate(self):
+        return np.zeros(0, dtype=self.dtype)
+
+    def _count(self):
+        return int(np.frombuffer(os.pread(self.fd, 8, COUNT_OFFSET), dtype='<u8')[0])
+
+    # maps whatever other processes have appended since the last call
+    def refresh(self):
+        count = self._count()
+        if count != self.size:
+            self.data = np.memmap(self.path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+            # records are only ever appended, so only the new ones need indexing
+            self._index_rewards(np.arange(self.size, count))
+            self.size = count
+        return count
+
+    def __len__(self):
+        return self.size + self.pending_size
+
+    @property
+    def nbytes(self):
+        return HEADER_SIZE + self.size * self.dtype.itemsize
+
+    def append(self, state, action, reward, next_state, done):
+        row = self.pending[self.pending_size]
+        row['state'] = np.reshape(state, -1)
+        row['action'] = action
+        row['reward'] = reward
+        row['next_state'] = np.reshape(next_state, -1)
+        row['done'] = done
+        self.pending_size += 1
+        if self.pending_size == self.flush_every:
+            self.flush()
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        self.flush()
+        records = np.zeros(len(actions), dtype=self.dtype)
+        records['state'] = np.reshape(states, (len(actions), -1))
+        records['action'] = actions
+        records['reward'] = rewards
+        records['next_state'] = np.reshape(next_states, (len(actions), -1))
+        records['done'] = dones
+        self._write(records)
+
+    def flush(self):
+        if self.pending_size:
+            self._write(self.pending[:self.pending_size])
+            self.pending_size = 0
+
+    def _write(self, records):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            count = self._count()
+            os.pwrite(self.fd, records.tobytes(), HEADER_SIZE + count * self.dtype.itemsize)
+            os.pwrite(self.fd, np.array([count + len(records)], dtype='<u8').tobytes(), COUNT_OFFSET)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.refresh()
+
+    # zero-copy window onto the mapped records
+    def view(self, start=0, stop=None):
+        return self.data[start:stop]
+
+    def get(self, indices):
+        # sorted reads walk the mapped pages sequentially
+        order = np.argsort(indices)
+        rows = np.empty(len(indices), dtype=self.dtype)
+        rows[order] = self.data[indices[order]]
+        return rows['state'], rows['action'], rows['reward'], rows['next_state'], rows['done']
+
+    def sample(self, batch_size, positive_batch_size=0):
+        self.flush()
+        self.refresh()
+        return ReplayMemory.sample(self, batch_size, positive_batch_size)
+
+    def close(self):
+        self.flush()
+        self.data = np.zeros(0, dtype=self.dtype)
+        os.close(self.fd)
@@ -0,0 +1,175 @@
+import multiprocessing as mp
+import queue
+import sys
+import time
+
+import numpy as np
+import quoridor
+import quoridor_env
+from inference_server import QueueClient
+
+# Transitions travel as one message per episode:
+# (worker_id, weights_version, states, actions, rewards, next_states, dones)
+# With an inference server the workers hold no model and send their states to it instead.
+STATE_DTYPE = np.int16
+
+
+def play_episode(env, choose_action, max_turns, rnd):
+    states, actions, rewards, next_states, dones = [], [], [], [], []
+    state = env.reset()
+    done = False
+    turns = 0
+    while not done and turns < max_turns:
+        action = choose_action(state)
+        next_state, reward, done, _ = env.step(action)
+        states.append(state)
+        actions.append(action)
+        rewards.append(reward)
+        next_states.append(next_state)
+        dones.append(done)
+        # every other seat plays uniformly at random, as D2Solver.choose_op_action without a second model
+        for _ in range(env.num_of_players - 1):
+            state, _, done, _ = env.step(rnd.integers(env.action_space.n))
+        turns += 1
+    return (np.array(states, dtype=STATE_DTYPE), np.array(actions, dtype=np.int16),
+            np.array(rewards, dtype=np.float32), np.array(next_states, dtype=STATE_DTYPE),
+            np.array(dones, dtype=bool))
+
+
+def _worker(worker_id, model_builder, weights_queue, transitions_queue, stop, epsilon, max_turns, engine, seed, client=None, shape=(None, None, None)):
+    rnd = np.random.default_rng(seed)
+    env = quoridor_env.QuoridorEnv(engine=engine, num_of_players=shape[0], sx=shape[1], sy=shape[2])
+    if client is not None:
+        model = QueueClient(worker_id, *client)
+    else:
+        model = model_builder() if model_builder is not None else None
+    version = -1
+
+    def choose_action(state):
+        if model is None or rnd.random() <= epsilon:
+            return rnd.integers(env.action_space.n)
+        return int(np.argmax(model.predict(np.reshape(state, (1, -1)))))
+
+    while not stop.is_set():
+        # only the most recent weights matter, older refreshes are skipped
+        latest = None
+        while True:
+            try:
+                latest = weights_queue.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            version, weights, new_epsilon = latest
+            if model_builder is not None and weights is not None:
+                model.set_weights(weights)
+            if new_epsilon is not None:
+                epsilon = new_epsilon
+        episode = play_episode(env, choose_action, max_turns, rnd)
+        transitions_queue.put((worker_id, version) + episode)
+
+
+class SelfPlayPool:
+    def __init__(self, num_workers, model_builder=None, epsilon=1.0, max_turns=10000,
+                 engine=quoridor.ENGINE_ARRAY, seed=0, queue_size=256, inference=None, num_of_players=None, sx=None, sy=None):
+        self.num_workers = num_workers
+        self.shape = quoridor_env.env_shape(num_of_players, sx, sy)
+        self.model_builder = model_builder
+        self.epsilon = epsilon
+        self.max_turns = max_turns
+        self.engine = engine
+        self.seed = seed
+        self.version = 0
+        self.episodes = 0
+        self.transitions = 0
+        self.stop_event = mp.Event()
+        self.transitions_queue = mp.Queue(queue_size)
+        self.weights_queues = []
+        self.workers = []
+        # an InferenceServer whose model the trainer updates in place
+        self.inference = inference
+        self.request_queue = None
+
+    def start(self):
+        if self.inference is not None:
+            self.request_queue = mp.Queue()
+            response_queues = [mp.Queue() for _ in range(self.num_workers)]
+            self.inference.serve(self.request_queue, response_queues)
+        for worker_id in range(self.num_workers):
+            weights_queue = mp.Queue()
+            client = (self.request_queue, response_queues[worker_id]) if self.inference is not None else None
+            model_builder = self.model_builder if self.inference is None else None
+            worker = mp.Process(target=_worker, daemon=True, args=(
+                worker_id, model_builder, weights_queue, self.transitions_queue, self.stop_event,
+                self.epsilon, self.max_turns, self.engine, self.seed + worker_id, client, self.shape))
+            worker.start()
+            self.weights_queues.append(weights_queue)
+            self.workers.append(worker)
+        return self
+
+    def update_weights(self, weights, epsilon=None):
+        self.version += 1
+        if self.inference is not None:
+            # the trainer's model behind the server already has them
+            weights = None
+        for weights_queue in self.weights_queues:
+            weights_queue.put((self.version, weights, epsilon))
+
+    # yields episodes that are ready, waiting at most timeout seconds for the first one
+    def collect(self, max_episodes=None, timeout=0.0):
+        collected = 0
+        block = timeout > 0
+        while max_episodes is None or collected < max_episodes:
+            try:
+                episode = self.transitions_queue.get(block, timeout)
+            except queue.Empty:
+                return
+            block = False
+            collected += 1
+            self.episodes += 1
+            self.transitions += len(episode[3])
+            yield episode
+
+    def stop(self):
+        self.stop_event.set()
+        # workers may be blocked on a full queue
+        for _ in self.collect():
+            pass
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        if self.request_queue is not None:
+            self.request_queue.put(None)
+            self.request_queue = None
+        self.workers = []
+        self.weights_queues = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+# transitions/sec the learner receives for every worker count
+def measure_scaling(worker_counts, seconds=10.0, **pool_args):
+    res = []
+    for num_workers in worker_counts:
+        with SelfPlayPool(num_workers, **pool_args) as pool:
+            for _ in pool.collect(max_episodes=num_workers, timeout=60):
+                pass
+            received = pool.transitions
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                for _ in pool.collect(timeout=0.1):
+                    pass
+            elapsed = time.perf_counter() - start
+            res.append((num_workers, (pool.transitions - received) / elapsed))
+    return res
+
+
+if __name__ == '__main__':
+    counts = [int(c) for c in sys.argv[1:]] or [1, 2, 4, 8]
+    print('workers  transitions/sec')
+    for num_workers, rate in measure_scaling(counts):
+        print('{:7d}  {:15.1f}'.format(num_workers, rate))
@@ -1,17 +1,23 @@
-from keras import models
-
 import quoridor_env
-import tensorflow as tf
-from keras import backend as K
-import random
-import gym
+import encoding
+import numpy_model
+import self_play
+from replay_memory import ReplayMemory, state_dtype
+from replay_store import ReplayStore
+from zobrist import TranspositionTable
+from instrumentation import Instruments
+from checkpoint import CheckpointManager
+from inference_server import InferenceServer, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_US
+from opponent_pool import OpponentPool, DEFAULT_MEMORY_CAP
+from alpha_beta import AlphaBetaAgent
+from game_record import GameRecordWriter
 import math
 import numpy as np
 from collections import deque
-from keras.models import Sequential, load_model
-from keras.layers import Dense
-from keras.optimizers import Adam
-from keras.utils import plot_model
+from functools import partial
+
+# TensorFlow, Keras and gym are imported when a model or a solver is first built, so tools
+# that only need the helpers here do not pay for them
 
 GPU = False
 CPU = True
@@ -24,20 +30,51 @@ if CPU:
     num_CPU = 1
     num_GPU = 0
 
-config = tf.ConfigProto(intra_op_parallelism_threads=num_cores, \
-                        inter_op_parallelism_threads=num_cores, allow_soft_placement=True, \
-                        device_count = {'CPU' : num_CPU, 'GPU' : num_GPU})
-session = tf.Session(config=config)
-K.set_session(session)
+session = None
+
 
+# the shared TF session, created by the first solver
+def init_session():
+    global session
+    if session is None:
+        import tensorflow as tf
+        from keras import backend as K
+        config = tf.ConfigProto(intra_op_parallelism_threads=num_cores, \
+                                inter_op_parallelism_threads=num_cores, allow_soft_placement=True, \
+                                device_count = {'CPU' : num_CPU, 'GPU' : num_GPU})
+        session = tf.Session(config=config)
+        K.set_session(session)
+    return session
+
+
+def build_model(observation_size, action_size, alpha=0.01, alpha_decay=0.01):
+    from keras.models import Sequential
+    from keras.layers import Dense
+    from keras.optimizers import Adam
+    model = Sequential()
+    model.add(Dense(observation_size*2, input_dim=observation_size, activation='linear'))
+    model.add(Dense(observation_size, activation='linear'))
+    model.add(Dense(observation_size, activation='tanh'))
+    model.add(Dense(observation_size, activation='softmax'))
+    model.add(Dense(action_size, activation='linear'))
+    model.compile(loss='mse', optimizer=Adam(lr=alpha, decay=alpha_decay))
+    return model
 
 
 class D2Solver():
-    def __init__(self, n_episodes=101, n_win_ticks=195, max_env_steps=None, gamma=1.0, epsilon=1.0, epsilon_min=0.01, epsilon_log_decay=0.995, alpha=0.01, alpha_decay=0.01, batch_size=4096, minibatches_per_episode=5, monitor=False, quiet=False):
-        self.memory = deque(maxlen=1000000)
-        self.positive_memory = deque(maxlen=1000000)
+    def __init__(self, n_episodes=101, n_win_ticks=195, max_env_steps=None, gamma=1.0, epsilon=1.0, epsilon_min=0.01, epsilon_log_decay=0.995, alpha=0.01, alpha_decay=0.01, batch_size=4096, minibatches_per_episode=5, monitor=False, quiet=False, replay_store=None, stats_path=None, stats_every=10.0, profile_path=None, render_every=0, checkpoint_dir='models', checkpoint_every=1, checkpoint_seconds=None, keep_checkpoints=5, checkpoint_half=False, league_dir=None, league_memory_cap=DEFAULT_MEMORY_CAP, league_size=None, augment=False, search_opponent=None, record_path=None, num_of_players=None, sx=None, sy=None):
+        import gym
+        init_session()
+        quoridor_env.register()
+        # board size and player count of every env, model and worker of this solver
+        self.num_of_players, self.sx, self.sy = quoridor_env.env_shape(num_of_players, sx, sy)
+        self.env = gym.make(quoridor_env.ENV_ID, num_of_players=self.num_of_players, sx=self.sx, sy=self.sy)
+        # a replay store path keeps transitions on disk, shared with other trainers and later runs
+        if replay_store is not None:
+            self.memory = ReplayStore(replay_store, self.env.observation_space.n, state_dtype(self.sx, self.sy), self.env.action_space.n)
+        else:
+            self.memory = ReplayMemory(1000000, self.env.observation_space.n, state_dtype(self.sx, self.sy), self.env.action_space.n)
         self.positive_batch_injection = 10
-        self.env = gym.make('quoridor-v0')
         if monitor: self.env = gym.wrappers.Monitor(self.env, '../data/cartpole-1', force=True)
         self.gamma = gamma
         self.epsilon = epsilon
@@ -50,34 +87,79 @@ class D2Solver():
         self.batch_size = batch_size
         self.quiet = quiet
         self.minibatches_per_episode = minibatches_per_episode
+        # Q-values by state hash, only valid until the next fit
+        self.q_cache = TranspositionTable(100000)
+        # train on every board symmetry of each sampled transition
+        self.augment = augment
+        self.replay_batch = np.empty(((batch_size + self.positive_batch_injection) * 2, self.env.observation_space.n), dtype=np.float32)
         if max_env_steps is not None: self.env._max_episode_steps = max_env_steps
+        # phase timers and counters, snapshots go to stats_path as JSONL
+        self.instruments = Instruments(stats_path, stats_every)
+        self.profile_path = profile_path
+        # print the board every render_every episodes, 0 never does
+        self.render_every = render_every
+
+        # weights are written on a background thread every checkpoint_every episodes or checkpoint_seconds
+        self.checkpoints = CheckpointManager(checkpoint_dir, checkpoint_every, checkpoint_seconds, keep_checkpoints, checkpoint_half)
+
+        # past learner snapshots to play against, None keeps the uniformly random opponent
+        self.opponents = OpponentPool(league_dir, league_memory_cap, league_size) if league_dir is not None else None
+        self.opponent = None
+        self.generation = 0
+        # every played game is appended to record_path as a move list, see game_record
+        self.records = GameRecordWriter(record_path) if record_path is not None else None
+        # seconds per move for an alpha-beta opponent used instead of the random one, None keeps random
+        self.search_opponent = AlphaBetaAgent(self.env.action_space.n, search_opponent) if search_opponent is not None else None
 
         # Init model
-        self.model = Sequential()
-        self.model.add(Dense(self.env.observation_space.n*2, input_dim=self.env.observation_space.n, activation='linear'))
-        self.model.add(Dense(self.env.observation_space.n, activation='linear'))
-        self.model.add(Dense(self.env.observation_space.n, activation='tanh'))
-        self.model.add(Dense(self.env.observation_space.n, activation='softmax'))
-        self.model.add(Dense(self.env.action_space.n, activation='linear'))
-        self.model.compile(loss='mse', optimizer=Adam(lr=self.alpha, decay=self.alpha_decay))
+        self.model = build_model(self.env.observation_space.n, self.env.action_space.n, self.alpha, self.alpha_decay)
         self.init_second()#plot_model(self.model, to_file='models/last_episode.png')
         self.dump_model(0)
 
+    # adds the current learner to the league
     def init_second(self):
-        self.second_model = None
-        # import os.path
-        # if os.path.isfile('models/episode_latest.bin'):
-        #     self.second_model = load_model('models/episode_latest.bin')
+        if self.opponents is None:
+            return
+        self.opponents.add('generation_{}'.format(self.generation), self.model.get_weights())
+        self.generation += 1
+
+    def choose_opponent(self):
+        self.opponent = self.opponents.sample() if self.opponents is not None else None
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.append(state, action, reward, next_state, done)
 
+    # explores and exploits among legal actions only, so no samples are spent on no-op moves
     def choose_action(self, state, epsilon):
-        return self.env.action_space.sample() if (np.random.random() <= epsilon) else np.argmax(self.model.predict(state))
+        mask = self.env.unwrapped.legal_action_mask()
+        legal = np.flatnonzero(mask)
+        if len(legal) == 0:
+            return self.env.action_space.sample()
+        if np.random.random() <= epsilon:
+            return np.random.choice(legal)
+        return np.argmax(np.where(mask, self.predict(state)[0], -np.inf))
+
+    # state must be the env's current observation, the cache key comes from the env
+    def predict(self, state):
+        key = self.env.unwrapped.state_hash()
+        q = self.q_cache.get(key)
+        if q is None:
+            q = self.model.predict(state)
+            self.q_cache.put(key, q)
+            self.instruments.count('predictions')
+        else:
+            self.instruments.count('prediction_cache_hits')
+        return q
 
     def choose_op_action(self, state, epsilon):
-        if self.second_model is not None:
-            return self.env.action_space.sample() if (np.random.random() <= epsilon) else np.argmax(self.second_model.predict(state))
+        if self.opponent is not None:
+            if np.random.random() <= epsilon:
+                return self.env.action_space.sample()
+            with self.instruments.timer('opponent_predict'):
+                return np.argmax(self.opponents.predict(self.opponent, state)[0])
+        if self.search_opponent is not None:
+            with self.instruments.timer('opponent_search'):
+                return self.search_opponent.act(self.env.unwrapped.game, self.env.unwrapped.player)
         return self.env.action_space.sample()
 
 
@@ -88,66 +170,123 @@ class D2Solver():
         return np.reshape(state, [1, self.env.observation_space.n])
 
     def replay(self, batch_size):
-        #print("replay")
-        x_batch, y_batch = [], []
-        minibatch = random.sample(
-            self.memory, min(len(self.memory), batch_size))
-
         # we have very sparse rewards, so trying this to propagate it faster
-        minibatch += random.sample(
-            self.positive_memory, min(len(self.positive_memory), self.positive_batch_injection))
-        for state, action, reward, next_state, done in minibatch:
-            y_target = self.model.predict(state)
-            y_target[0][action] = reward if done else reward + self.gamma * np.max(self.model.predict(next_state)[0])
-            x_batch.append(state[0])
-            y_batch.append(y_target[0])
+        states, actions, rewards, next_states, dones = self.memory.sample(batch_size, self.positive_batch_injection)
+        if self.augment:
+            states, actions, rewards, next_states, dones = encoding.augment(
+                states, actions, rewards, next_states, dones, self.num_of_players, self.sx, self.sy)
+        count = len(actions)
+        if len(self.replay_batch) < count * 2:
+            self.replay_batch = np.empty((count * 2, self.env.observation_space.n), dtype=np.float32)
+        # states and next states share one buffer so both go through a single forward pass
+        batch = self.replay_batch[:count * 2]
+        batch[:count] = states
+        batch[count:] = next_states
+        q = self.model.predict(batch, batch_size=count * 2)
+        y_batch = q[:count]
+        targets = rewards + self.gamma * np.max(q[count:], axis=1)
+        y_batch[np.arange(count), actions] = np.where(dones, rewards, targets)
 
-        self.model.fit(np.array(x_batch), np.array(y_batch), batch_size=len(x_batch), verbose=0)
+        self.model.fit(batch[:count], y_batch, batch_size=count, verbose=0)
+        self.q_cache.clear()
 
+    # e is an episode number or checkpoint.LATEST; episodes are throttled, 'latest' always saves
     def dump_model(self, e):
-        self.model.save('models/episode_' + str(e) + '.bin')
+        with self.instruments.timer('dump_model'):
+            if e == 'latest':
+                self.checkpoints.save(e, self.model.get_weights())
+            elif self.checkpoints.maybe_save(e, self.model.get_weights):
+                self.instruments.count('checkpoints')
         # print("Layer weights")
         # for layer in self.model.layers:
         #     weights = layer.get_weights()
         #     print(weights)
 
+    def record_memory(self):
+        self.instruments.gauge('replay_buffer_size', len(self.memory))
+        capacity = getattr(self.memory, 'capacity', None)
+        if capacity:
+            self.instruments.gauge('replay_buffer_fill', len(self.memory) / capacity)
+
     def run(self):
+        if self.profile_path is not None:
+            self.instruments.start_profiler(self.profile_path)
+        try:
+            return self._run()
+        finally:
+            if self.profile_path is not None:
+                self.instruments.stop_profiler()
+            self.checkpoints.flush()
+            if self.records is not None:
+                self.records.flush()
+            self.instruments.export(force=True)
+
+    # One training game: the learner owns the seat the env starts with, the opponent every other
+    # seat, and a win is that seat winning. Returns the learner's total reward and its turns.
+    def play_episode(self, e):
+        instruments = self.instruments
+        state = self.preprocess_state(self.env.reset())
+        learner = self.env.unwrapped.player
+        self.choose_opponent()
+        done = False
+        totalReward = 0
+        turns = 0
+        moves = []
+        while not done and turns < 10000:
+            with instruments.timer('choose_action'):
+                action = self.choose_action(state, self.get_epsilon(e))
+            with instruments.timer('env_step'):
+                next_state, reward, done, _ = self.env.step(action)
+            next_state = self.preprocess_state(next_state)
+            self.remember(state, action, reward, next_state, done)
+            moves.append(action)
+            # every other seat moves before the learner's next turn
+            for _ in range(self.num_of_players - 1):
+                with instruments.timer('choose_op_action'):
+                    op_action = self.choose_op_action(next_state, self.get_epsilon(e))
+                with instruments.timer('env_step'):
+                    next_state, _, done, _ = self.env.step(op_action)
+                moves.append(op_action)
+                next_state = self.preprocess_state(next_state)
+            instruments.count('env_steps', self.num_of_players)
+            state = next_state
+            totalReward += reward
+            turns += 1
+        instruments.count('episodes')
+        finished, winner = self.env.unwrapped.game.is_finished()
+        if self.records is not None:
+            game = self.env.unwrapped.game
+            self.records.write(moves, game.num_of_players, game.sx, game.sy, learner, winner)
+        if self.opponent is not None:
+            self.opponents.record(self.opponent, finished and winner == learner)
+        return totalReward, turns
+
+    def _run(self):
+        instruments = self.instruments
         scores = deque(maxlen=100)
         episodes = range(5, 1000, 5)
         for num_of_episodes in episodes:
             for e in range(num_of_episodes):
-                state = self.preprocess_state(self.env.reset())
-                done = False
-                totalReward = 0
-                turns = 0
-                while not done and turns < 10000:
-                    action = self.choose_action(state, self.get_epsilon(e))
-                    next_state, reward, done, _ = self.env.step(action)
-                    #if done:
-
-                    next_state = self.preprocess_state(next_state)
-                    self.remember(state, action, reward, next_state, done)
-                    if reward > 0:
-                        self.positive_memory.append((state, action, reward, next_state, done))
-                    next_state, _, done, _ = self.env.step(self.choose_op_action(next_state, self.get_epsilon(e)))
-                    next_state = self.preprocess_state(next_state)
-                    state = next_state
-                    totalReward += reward
-                    turns += 1
-                print(self.env.render(mode='ansi'))
-                print("Turns: {}".format(turns))
-                print("Player: {}".format(self.env.player + 1))
-                print("Epsilon: {}".format(self.get_epsilon(e)))
+                totalReward, turns = self.play_episode(e)
+                if self.render_every and e % self.render_every == 0 and not self.quiet:
+                    print(self.env.render(mode='ansi'))
+                    print("Turns: {}".format(turns))
+                    print("Player: {}".format(self.env.player + 1))
+                    print("Epsilon: {}".format(self.get_epsilon(e)))
                 scores.append(totalReward)
                 mean_score = np.mean(scores)
                 if mean_score >= self.n_win_ticks and e >= 100:
                     if not self.quiet: print('Ran {} episodes. Solved after {} trials ?'.format(e, e - 100))
                     return e - 100
                 #if e % 100 == 0 and not self.quiet:
-                print('[Episode {}] - Score {} Mean score for last 100 {} Positive memories {}/{}'.format(e, totalReward, mean_score, len(self.positive_memory), len(self.memory)))
+                print('[Episode {}] - Score {} Mean score for last 100 {} Positive memories {}/{}'.format(e, totalReward, mean_score, len(self.memory.positive_indices()), len(self.memory)))
 
                 for i in range(self.minibatches_per_episode):
-                    self.replay(self.batch_size)
+                    with instruments.timer('replay'):
+                        self.replay(self.batch_size)
+                    instruments.count('replays')
+                self.record_memory()
+                instruments.export()
                 if self.epsilon > self.epsilon_min:
                     self.epsilon *= self.epsilon_decay
                 #plot_model(self.model, to_file='models/episode_' + str(e) + '.png')
@@ -158,6 +297,57 @@ class D2Solver():
         if not self.quiet: print('Did not solve after {} episodes ?'.format(e))
         return e
 
+    # predict for the inference server thread, Keras needs the graph of the training thread
+    def batched_predict(self, states):
+        with session.graph.as_default():
+            return self.model.predict(states, batch_size=len(states))
+
+    # self-play in worker processes, this process only trains on what they send back; with
+    # central_inference the workers send their states here and get batched predictions back
+    def run_actors(self, num_workers=4, n_replays=1000, refresh_every=10, central_inference=False,
+                   max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_us=DEFAULT_MAX_WAIT_US):
+        # actors only run inference, numpy_model spares them loading TensorFlow
+        model_builder = partial(numpy_model.build_model, self.env.observation_space.n, self.env.action_space.n)
+        inference = None
+        if central_inference:
+            self.model._make_predict_function()
+            inference = InferenceServer(self.batched_predict, max_batch_size, max_wait_us)
+        try:
+            self._run_actors(model_builder, num_workers, n_replays, refresh_every, inference)
+        finally:
+            if inference is not None:
+                inference.close()
+                self.instruments.gauge('inference', inference.stats())
+            self.instruments.export(force=True)
+
+    def _run_actors(self, model_builder, num_workers, n_replays, refresh_every, inference):
+        with self_play.SelfPlayPool(num_workers, model_builder, epsilon=self.epsilon, inference=inference,
+                                    num_of_players=self.num_of_players, sx=self.sx, sy=self.sy) as pool:
+            pool.update_weights(self.model.get_weights(), self.epsilon)
+            for r in range(n_replays):
+                with self.instruments.timer('collect'):
+                    for _, _, states, actions, rewards, next_states, dones in pool.collect(timeout=1.0):
+                        self.memory.extend(states, actions, rewards, next_states, dones)
+                        self.instruments.count('episodes')
+                        self.instruments.count('env_steps', len(actions))
+                self.record_memory()
+                self.instruments.export()
+                if len(self.memory) == 0:
+                    continue
+                with self.instruments.timer('replay'):
+                    self.replay(self.batch_size)
+                self.instruments.count('replays')
+                if self.epsilon > self.epsilon_min:
+                    self.epsilon *= self.epsilon_decay
+                if r % refresh_every == 0:
+                    with self.instruments.timer('update_weights'):
+                        pool.update_weights(self.model.get_weights(), self.epsilon)
+                    if inference is not None:
+                        self.instruments.gauge('inference', inference.stats())
+                    if not self.quiet: print('[Replay {}] Episodes {} Transitions {} Memory {}'.format(r, pool.episodes, pool.transitions, len(self.memory)))
+            self.dump_model('latest')
+        self.checkpoints.flush()
+
 
 if __name__ == '__main__':
     agent = D2Solver()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import sys
+
+import numpy as np
+import quoridor
+import quoridor_env
+from alpha_beta import AlphaBetaAgent, RandomAgent
+from numpy_model import NumpyModel
+
+# Two-player matches between checkpoints and baseline agents on a process pool. Players are given
+# as specs so they can be rebuilt in the workers:
+#   'random', 'alpha_beta' or 'alpha_beta:<seconds per move>', or the path of a checkpoint .npz
+# A worker plays a chunk of games in lockstep: at every ply the games where one side is to move go
+# through that side in one call, so a model runs one predict per ply for the whole chunk. Seats
+# alternate between games.
+#
+# Results are scores from the first player's point of view (1 win, 0.5 draw, 0 loss). Head-to-head
+# matches can stop early with a sequential probability ratio test of Elo elo0 against elo1.
+
+RANDOM = 'random'
+ALPHA_BETA = 'alpha_beta'
+ALPHA_BETA_BUDGET = 0.05
+
+DEFAULT_CHUNK = 16
+DEFAULT_MAX_MOVES = 500
+ELO0 = 0
+ELO1 = 30
+SPRT_ALPHA = 0.05
+SPRT_BETA = 0.05
+H0 = 'H0'
+H1 = 'H1'
+
+
+# Q-network player; illegal actions are never picked
+class ModelAgent:
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def load(cls, path):
+        return cls(NumpyModel.load(path))
+
+    def act(self, game, player):
+        return self.act_many([game], [player])[0]
+
+    def act_many(self, games, players):
+        states = np.array([game.get_game_state(player) for game, player in zip(games, players)], dtype=np.float32)
+        q = self.model.predict(states, batch_size=len(states))
+        num_of_actions = q.shape[1]
+        masks = np.array([game.legal_step_mask(player)[:num_of_actions] if num_of_actions <= 4
+                          else game.legal_action_mask(player)[:num_of_actions]
+                          for game, player in zip(games, players)])
+        # a pawn with no legal action keeps the network's choice, which is a no-op move
+        q = np.where(masks | ~masks.any(axis=1, keepdims=True), q, -np.inf)
+        return np.argmax(q, axis=1).tolist()
+
+
+def make_agent(spec, num_of_actions=None, seed=None):
+    if spec == RANDOM:
+        return RandomAgent(num_of_actions, seed)
+    if spec == ALPHA_BETA or spec.startswith(ALPHA_BETA + ':'):
+        budget = float(spec.split(':', 1)[1]) if ':' in spec else ALPHA_BETA_BUDGET
+        return AlphaBetaAgent(num_of_actions, budget)
+    if spec.endswith('.npz'):
+        return ModelAgent.load(spec)
+    raise ValueError('Unknown player: {}'.format(spec))
+
+
+def _act_many(agent, games, players):
+    if hasattr(agent, 'act_many'):
+        return agent.act_many(games, players)
+    return [agent.act(game, player) for game, player in zip(games, players)]
+
+
+# scores of agent a in num_of_games games; a sits in seat (first_seat + i) % 2 in game i
+def play_games(a, b, num_of_games, sx=quoridor_env.ROWS, sy=quoridor_env.COLS, max_moves=DEFAULT_MAX_MOVES,
+               first_seat=0, engine=quoridor.ENGINE_ARRAY):
+    games = [quoridor.create_game(2, sx, sy, engine) for _ in range(num_of_games)]
+    seat_of_a = [(first_seat + i) % 2 for i in range(num_of_games)]
+    for ply in range(max_moves):
+        active = [i for i, game in enumerate(games) if not game.is_finished()[0]]
+        if not active:
+            break
+        player = ply % 2
+        for agent, is_a in ((a, True), (b, False)):
+            turn = [i for i in active if (seat_of_a[i] == player) == is_a]
+            if not turn:
+                continue
+            actions = _act_many(agent, [games[i] for i in turn], [player] * len(turn))
+            for i, action in zip(turn, actions):
+                games[i].do_move(int(action), player)
+    scores = []
+    for game, seat in zip(games, seat_of_a):
+        finished, winner = game.is_finished()
+        scores.append(0.5 if not finished or winner == -1 else float(winner == seat))
+    return scores
+
+
+def _play_chunk(task):
+    spec_a, spec_b, num_of_games, first_seat, sx, sy, max_moves, num_of_actions, seed = task
+    a = make_agent(spec_a, num_of_actions, seed)
+    b = make_agent(spec_b, num_of_actions, seed + 1)
+    return play_games(a, b, num_of_games, sx, sy, max_moves, first_seat)
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+# (elo, low, high) of the first player from its scores, normal approximation of the mean score
+def elo_interval(scores, z=1.96):
+    scores = np.asarray(scores, dtype=np.float64)
+    mean = scores.mean()
+    error = z * scores.std() / math.sqrt(len(scores))
+    return elo(mean), elo(mean - error), elo(mean + error)
+
+
+# Log-likelihood ratio of "first player is elo1 stronger" over "elo0 stronger" with the normal
+# approximation of the score, and the decision once it crosses a bound (None while undecided).
+# One pseudo win and loss keep the variance estimate away from zero in short all-win matches.
+def sprt(scores, elo0=ELO0, elo1=ELO1, alpha=SPRT_ALPHA, beta=SPRT_BETA):
+    scores = np.asarray(scores, dtype=np.float64)
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    variance = np.var(np.concatenate([scores, [0.0, 1.0]]))
+    llr = (s1 - s0) * (2 * scores.sum() - len(scores) * (s0 + s1)) / (2 * variance)
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    decision = H1 if llr >= upper else H0 if llr <= lower else None
+    return {'llr': llr, 'lower': lower, 'upper': upper, 'decision': decision}
+
+
+def _tasks(spec_a, spec_b, max_games, chunk, sx, sy, max_moves, num_of_actions, seed):
+    for start in range(0, max_games, chunk):
+        yield spec_a, spec_b, min(chunk, max_games - start), start % 2, sx, sy, max_moves, num_of_actions, seed + start
+
+
+def _imap(function, tasks, workers):
+    if workers == 0:
+        return map(function, tasks), None
+    pool = mp.Pool(workers)
+    return pool.imap_unordered(function, tasks), pool
+
+
+# Head to head between spec_a and spec_b. With use_sprt the match stops as soon as the test
+# decides; remaining chunks are cancelled. workers=0 plays in this process.
+def run_match(spec_a, spec_b, max_games=1000, workers=None, chunk=DEFAULT_CHUNK, use_sprt=True, elo0=ELO0, elo1=ELO1,
+              alpha=SPRT_ALPHA, beta=SPRT_BETA, sx=quoridor_env.ROWS, sy=quoridor_env.COLS,
+              max_moves=DEFAULT_MAX_MOVES, num_of_actions=None, seed=0):
+    workers = mp.cpu_count() if workers is None else workers
+    tasks = _tasks(spec_a, spec_b, max_games, chunk, sx, sy, max_moves, num_of_actions, seed)
+    results, pool = _imap(_play_chunk, tasks, workers)
+    scores = []
+    test = None
+    try:
+        for chunk_scores in results:
+            scores += chunk_scores
+            if use_sprt:
+                test = sprt(scores, elo0, elo1, alpha, beta)
+                if test['decision'] is not None:
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    rating, low, high = elo_interval(scores)
+    return {
+        'players': [spec_a, spec_b],
+        'games': len(scores),
+        'score': float(np.mean(scores)),
+        'elo': rating,
+        'elo_low': low,
+        'elo_high': high,
+        'sprt': test
+    }
+
+
+# Elo of every player from pairwise (i, j, scores of i) results by maximum likelihood of the
+# logistic model, mean rating 0, with intervals from the inverse Fisher information
+def fit_ratings(num_of_players, results, z=1.96, iterations=200):
+    wins = np.zeros((num_of_players, num_of_players))
+    for i, j, scores in results:
+        wins[i, j] += np.sum(scores)
+        wins[j, i] += len(scores) - np.sum(scores)
+    games = wins + wins.T
+    # one pseudo draw between every pair keeps unbeaten players finite
+    wins += 0.5 * (1 - np.eye(num_of_players))
+    games += 1 - np.eye(num_of_players)
+    strength = np.ones(num_of_players)
+    for _ in range(iterations):
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength = wins.sum(axis=1) / denominator
+        strength /= np.exp(np.log(strength).mean())
+    ratings = 400 * np.log10(strength)
+    p = 1 / (1 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400))
+    scale = math.log(10) / 400
+    information = games * p * (1 - p) * scale ** 2
+    information = np.diag(information.sum(axis=1)) - information
+    errors = z * np.sqrt(np.maximum(np.diag(np.linalg.pinv(information)), 0))
+    return ratings, errors
+
+
+# every pair plays games_per_pair games, no early stopping
+def round_robin(specs, games_per_pair=100, workers=None, chunk=DEFAULT_CHUNK, sx=quoridor_env.ROWS,
+                sy=quoridor_env.COLS, max_moves=DEFAULT_MAX_MOVES, num_of_actions=None, seed=0):
+    workers = mp.cpu_count() if workers is None else workers
+    pairs = [(i, j) for i in range(len(specs)) for j in range(i + 1, len(specs))]
+    tasks = [(pair,) + task for k, pair in enumerate(pairs)
+             for task in _tasks(specs[pair[0]], specs[pair[1]], games_per_pair, chunk, sx, sy, max_moves,
+                                num_of_actions, seed + k * games_per_pair)]
+    results, pool = _imap(_play_pair_chunk, tasks, workers)
+    scores = {pair: [] for pair in pairs}
+    try:
+        for pair, chunk_scores in results:
+            scores[pair] += chunk_scores
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    ratings, errors = fit_ratings(len(specs), [(i, j, s) for (i, j), s in scores.items()])
+    return {
+        'players': list(specs),
+        'elo': ratings.tolist(),
+        'elo_error': errors.tolist(),
+        'pairs': [{'players': [specs[i], specs[j]], 'games': len(s), 'score': float(np.mean(s))}
+                  for (i, j), s in scores.items()]
+    }
+
+
+def _play_pair_chunk(task):
+    return task[0], _play_chunk(task[1:])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Play checkpoints and baseline agents against each other.')
+    parser.add_argument('players', nargs='+', help="'random', 'alpha_beta[:seconds]' or checkpoint .npz paths")
+    parser.add_argument('--games', type=int, default=200, help='games per pair, the maximum with --sprt')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK)
+    parser.add_argument('--sprt', action='store_true', help='stop a two player match once the test decides')
+    parser.add_argument('--elo0', type=float, default=ELO0)
+    parser.add_argument('--elo1', type=float, default=ELO1)
+    parser.add_argument('--actions', type=int, default=None, help='action space size, 4 for steps only')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args(argv)
+    if len(args.players) < 2:
+        parser.error('at least two players are needed')
+    if len(args.players) == 2:
+        report = run_match(args.players[0], args.players[1], args.games, args.workers, args.chunk, args.sprt,
+                           args.elo0, args.elo1, num_of_actions=args.actions)
+        print('{} vs {}: {} games, score {:.3f}, Elo {:+.0f} [{:+.0f}, {:+.0f}]'.format(
+            args.players[0], args.players[1], report['games'], report['score'], report['elo'],
+            report['elo_low'], report['elo_high']))
+        if report['sprt'] is not None:
+            print('SPRT: LLR {llr:.2f} in ({lower:.2f}, {upper:.2f}) -> {decision}'.format(**report['sprt']))
+    else:
+        report = round_robin(args.players, args.games, args.workers, args.chunk, num_of_actions=args.actions)
+        for spec, rating, error in sorted(zip(report['players'], report['elo'], report['elo_error']), key=lambda r: -r[1]):
+            print('{:>8.0f} +- {:<5.0f} {}'.format(rating, error, spec))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
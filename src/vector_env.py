@@ -0,0 +1,101 @@
+import numpy as np
+import quoridor
+from board_graph import RIGHT_BIT, DOWN_BIT, goal_masks, pawn_distances
+from quoridor_env import ROWS, COLS, NUMBER_OF_PLAYERS
+
+# (dx, dy) for MOVE_UP, MOVE_RIGHT, MOVE_DOWN, MOVE_LEFT
+STEP_DX = np.array([0, 1, 0, -1])
+STEP_DY = np.array([-1, 0, 1, 0])
+
+CENTRE_BIT = 1 << quoridor.DIR_RIGHT_AND_DOWN
+
+
+# N independent QuoridorEnv games stepped together; finished games are reset in place.
+class VectorQuoridorEnv:
+    def __init__(self, num_envs, player=0, num_of_players=NUMBER_OF_PLAYERS, sx=ROWS, sy=COLS):
+        self.num_envs = num_envs
+        self.num_of_players = num_of_players
+        self.sx = sx
+        self.sy = sy
+        self.init_positions = quoridor.QuoridorGame.init_positions(num_of_players, sx, sy).astype(np.int64)
+        self.goals = goal_masks(num_of_players, sx, sy)
+        self.positions = np.zeros((num_envs, num_of_players), dtype=np.int64)
+        self.dominoes = np.zeros((num_envs, num_of_players), dtype=np.int64)
+        self.boards = np.zeros((num_envs, sx, sy), dtype=np.int64)
+        self.init_player = np.full(num_envs, player)
+        self.player = np.full(num_envs, player)
+        self.wall_slots = (sx - 1) * (sy - 1)
+        self.tables = quoridor.board_tables(sx, sy)
+        self._clear(np.ones(num_envs, dtype=bool))
+
+    def num_of_possible_moves(self):
+        return 4 + self.wall_slots * 2
+
+    def _clear(self, mask):
+        self.positions[mask] = self.init_positions
+        self.dominoes[mask] = 5
+        self.boards[mask] = quoridor.ALL_FREE
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self._clear(mask)
+        self.init_player[mask] = (self.init_player[mask] + 1) % self.num_of_players
+        self.player[mask] = self.init_player[mask]
+        return self.get_game_states()
+
+    def get_game_states(self):
+        return np.concatenate((self.player[:, None], self.positions, self.dominoes,
+                               self.boards.reshape(self.num_envs, -1)), axis=1).astype(np.float64)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        envs = np.arange(self.num_envs)
+        player = self.player
+        steps = actions < 4
+        self._do_steps(envs[steps], player[steps], actions[steps])
+        walls = ~steps & (self.dominoes[envs, player] > 0)
+        self._add_borders(envs[walls], player[walls], actions[walls] - 4)
+
+        distances = pawn_distances(self.boards, self.positions, self.goals)
+        at_goal = distances == 0
+        done = at_goal.any(axis=1) | (distances == -1).all(axis=1)
+        winner = np.where(at_goal.any(axis=1), at_goal.argmax(axis=1), -1)
+        # same rule as QuoridorEnv._calculate_reward, -1 (no path) included
+        own = distances[envs, player]
+        rewards = np.where(winner == player, 1.0, np.maximum(0, (max(self.sx, self.sy) - own) * 0.1))
+        rewards = np.where(done, rewards, 0.0)
+
+        self.player = (player + 1) % self.num_of_players
+        final_observations = self.get_game_states()
+        observations = self.reset(done) if done.any() else final_observations
+        return observations, rewards, done, {'final_observation': final_observations}
+
+    def _do_steps(self, envs, player, moves):
+        position = self.positions[envs, player]
+        x, y = position // self.sy, position % self.sy
+        nx, ny = x + STEP_DX[moves], y + STEP_DY[moves]
+        inside = (nx >= 0) & (nx < self.sx) & (ny >= 0) & (ny < self.sy)
+        # the edge bit lives on the upper-left of the two cells
+        bit = np.where(STEP_DX[moves] != 0, RIGHT_BIT, DOWN_BIT)
+        cell = self.boards[envs, np.minimum(x, nx).clip(0, self.sx - 1), np.minimum(y, ny).clip(0, self.sy - 1)]
+        ok = inside & ((cell & bit) > 0)
+        self.positions[envs[ok], player[ok]] = nx[ok] * self.sy + ny[ok]
+
+    def _add_borders(self, envs, player, locations):
+        first_cell, second_cell = self.tables.slot_cells[locations].T
+        bit = self.tables.slot_bits[locations]
+        cells = self.boards.reshape(self.num_envs, -1)
+        first = cells[envs, first_cell]
+        second = cells[envs, second_cell]
+        ok = ((first & bit) > 0) & ((second & bit) > 0) & ((first & CENTRE_BIT) > 0)
+        envs, player, bit = envs[ok], player[ok], bit[ok]
+        first_cell, second_cell = first_cell[ok], second_cell[ok]
+        cells[envs, first_cell] &= ~(bit | CENTRE_BIT)
+        cells[envs, second_cell] &= ~bit
+        self.dominoes[envs, player] -= 1
+
+    def render(self, index=0):
+        game = quoridor.QuoridorGame(self.num_of_players, self.sx, self.sy)
+        game.init_from_state(self.get_game_states()[index, 1:])
+        return game.render()
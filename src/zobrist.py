@@ -0,0 +1,128 @@
+from collections import OrderedDict
+
+import numpy as np
+
+SEED = 0x5155
+DOMINO_KEYS = 32
+EDGE_DIRECTIONS = 3
+
+POLICY_LRU = 'lru'
+POLICY_DEPTH = 'depth'
+
+_tables = {}
+
+
+# Random keys for every (player, cell) pawn placement, removed edge bit, domino count and
+# player to move. Tables are shared by all games of the same size.
+class ZobristTable:
+    def __init__(self, num_of_players, sx, sy, seed=SEED):
+        rnd = np.random.default_rng([seed, num_of_players, sx, sy])
+        cells = sx * sy
+
+        def keys(*shape):
+            return rnd.integers(0, np.iinfo(np.uint64).max, shape, dtype=np.uint64, endpoint=True)
+
+        self.pawn_keys = keys(num_of_players, cells)
+        self.edge_keys = keys(EDGE_DIRECTIONS, cells)
+        self.domino_keys = keys(num_of_players, DOMINO_KEYS)
+        self.to_move_keys = keys(num_of_players)
+        # plain ints are much faster than numpy scalars for the incremental updates
+        self.pawn = self.pawn_keys.tolist()
+        self.edge = self.edge_keys.tolist()
+        self.domino = self.domino_keys.tolist()
+        self.to_move = self.to_move_keys.tolist()
+
+    def domino_key(self, player, count):
+        return self.domino[player][int(count) % DOMINO_KEYS]
+
+    def compute(self, positions, dominoes, board):
+        res = 0
+        for player, position in enumerate(positions):
+            res ^= self.pawn[player][int(position)]
+            res ^= self.domino_key(player, dominoes[player])
+        cells = np.asarray(board).astype(np.int64).reshape(-1)
+        for direction in range(EDGE_DIRECTIONS):
+            removed = ((cells >> direction) & 1) == 0
+            res ^= int(np.bitwise_xor.reduce(self.edge_keys[direction][removed]))
+        return res
+
+
+def table(num_of_players, sx, sy):
+    key = (num_of_players, sx, sy)
+    if key not in _tables:
+        _tables[key] = ZobristTable(num_of_players, sx, sy)
+    return _tables[key]
+
+
+# Bounded cache keyed by state hash. POLICY_LRU evicts the least recently used entry,
+# POLICY_DEPTH is a classic always-full table where a slot keeps the deeper search result.
+class TranspositionTable:
+    def __init__(self, capacity, policy=POLICY_LRU):
+        if policy not in (POLICY_LRU, POLICY_DEPTH):
+            raise ValueError('Unknown policy: {}'.format(policy))
+        self.capacity = capacity
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        if self.policy == POLICY_LRU:
+            self.entries = OrderedDict()
+        else:
+            self.slots = [None] * self.capacity
+
+    def __len__(self):
+        if self.policy == POLICY_LRU:
+            return len(self.entries)
+        return sum(1 for slot in self.slots if slot is not None)
+
+    def get(self, key, min_depth=0):
+        if self.policy == POLICY_LRU:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        else:
+            entry = self.slots[key % self.capacity]
+            if entry is not None and entry[0] != key:
+                entry = None
+        if entry is None or entry[1] < min_depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key, value, depth=0):
+        self.stores += 1
+        if self.policy == POLICY_LRU:
+            self.entries[key] = (key, depth, value)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return
+        index = key % self.capacity
+        slot = self.slots[index]
+        if slot is not None and slot[0] != key:
+            if slot[1] > depth:
+                return
+            self.evictions += 1
+        self.slots[index] = (key, depth, value)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'evictions': self.evictions
+        }
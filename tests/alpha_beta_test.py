@@ -0,0 +1,89 @@
+import time
+
+import alpha_beta
+import quoridor
+
+
+def test_should_take_the_winning_step():
+    game = quoridor.create_game(2, 5, 5)
+    for _ in range(3):
+        game.do_move(quoridor.MOVE_DOWN, 0)
+    agent = alpha_beta.AlphaBetaAgent(time_budget=0.2)
+    action, score, _ = agent.search(game, 0)
+    assert action == quoridor.MOVE_DOWN
+    assert score >= alpha_beta.WIN - 1
+
+
+def test_win_scores_keep_their_distance_through_the_table():
+    # player 0 walks down to its goal, the table is kept between the moves
+    game = quoridor.create_game(2, 7, 7)
+    game.do_move(quoridor.MOVE_DOWN, 0)
+    agent = alpha_beta.AlphaBetaAgent(4, time_budget=None, max_depth=9)
+    scores = []
+    for _ in range(5):
+        action, score, _ = agent.search(game, 0)
+        scores.append(score)
+        game.do_move(action, 0)
+        game.do_move(quoridor.MOVE_UP, 1)
+    assert scores == [alpha_beta.WIN - (2 * steps_left - 1) for steps_left in range(5, 0, -1)]
+    assert alpha_beta.from_table_score(alpha_beta.to_table_score(alpha_beta.WIN - 5, 3), 1) == alpha_beta.WIN - 3
+    assert alpha_beta.from_table_score(alpha_beta.to_table_score(5 - alpha_beta.WIN, 3), 1) == 3 - alpha_beta.WIN
+    assert alpha_beta.to_table_score(2.5, 3) == 2.5
+
+
+def test_start_position_is_balanced():
+    agent = alpha_beta.AlphaBetaAgent(max_depth=1, time_budget=None)
+    agent.root_player = 0
+    assert agent.evaluate(quoridor.create_game(2, 9, 9)) == 0
+
+
+def test_steps_only_agent_never_places_walls():
+    game = quoridor.create_game(2, 5, 5)
+    agent = alpha_beta.AlphaBetaAgent(num_of_actions=4, time_budget=0.05)
+    moves, winner = alpha_beta.play_game([agent, alpha_beta.RandomAgent(4, seed=0)], 5, 5, game=game, max_moves=60)
+    assert all(move < 4 for move in moves[::2])
+    assert winner == 0
+
+
+def test_should_beat_random_agent():
+    agent = alpha_beta.AlphaBetaAgent(time_budget=0.05)
+    for seed in range(3):
+        _, winner = alpha_beta.play_game([alpha_beta.RandomAgent(seed=seed), agent], 5, 5, max_moves=200)
+        assert winner == 1
+
+
+def test_should_stay_within_time_budget_on_9x9():
+    game = quoridor.create_game(2, 9, 9)
+    agent = alpha_beta.AlphaBetaAgent(time_budget=0.2)
+    for turn in range(6):
+        start = time.perf_counter()
+        game.do_move(agent.act(game, turn % 2), turn % 2)
+        assert time.perf_counter() - start < 1.0
+        assert agent.depth >= 1
+
+
+def test_should_reuse_table_between_moves():
+    game = quoridor.create_game(2, 7, 7)
+    agent = alpha_beta.AlphaBetaAgent(max_depth=3, time_budget=None)
+    game.do_move(agent.act(game, 0), 0)
+    game.do_move(quoridor.MOVE_UP, 1)
+    hits = agent.table(0).hits
+    agent.act(game, 0)
+    assert agent.table(0).hits > hits
+    assert agent.history
+
+
+def test_four_players():
+    agents = [alpha_beta.AlphaBetaAgent(time_budget=0.02) for _ in range(4)]
+    moves, winner = alpha_beta.play_game(agents, 5, 5, max_moves=100)
+    assert winner in range(4)
+    assert all(0 <= move < quoridor.create_game(4, 5, 5).num_of_possible_moves() for move in moves)
+
+
+def test_search_leaves_the_game_unchanged():
+    game = quoridor.create_game(2, 7, 7)
+    game.do_move(20, 1)
+    state, key = game.get_game_state(0), game.hash
+    alpha_beta.AlphaBetaAgent(max_depth=3, time_budget=None).act(game, 0)
+    assert (game.get_game_state(0) == state).all()
+    assert game.hash == key
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('gym')
+import benchmark
+import quoridor_env
+
+
+def test_run_reports_every_case():
+    res = benchmark.run(sizes=[5], player_counts=[2, 4], engines=[benchmark.quoridor.ENGINE_BITBOARD], repeat=1, env_games=2)
+    results = res['results']
+    for players in ['2p', '4p']:
+        for case in ['do_move', 'shortest_path', 'is_finished', 'render']:
+            assert results['{}/bitboard/5x5/{}'.format(case, players)]['seconds_per_op'] > 0
+        assert results['env_games/bitboard/5x5/' + players]['games_per_second'] > 0
+    assert results['replay_memory/5x5/4p']['bytes_per_transition'] > results['replay_memory/5x5/2p']['bytes_per_transition']
+    assert res['meta']['seed'] == benchmark.SEED
+    # sized envs get their size as arguments, the module defaults stay as they are
+    assert (quoridor_env.ROWS, quoridor_env.COLS, quoridor_env.NUMBER_OF_PLAYERS) == (9, 9, 2)
+    rows = benchmark.scaling_table(results, [5], 2, benchmark.quoridor.ENGINE_BITBOARD)
+    assert rows[1].startswith('do_move') and '1.0x' in rows[1]
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {'results': {
+        'a': {'seconds_per_op': 1.0},
+        'b': {'games_per_second': 100.0},
+        'c': {'skipped': 'no keras'},
+        'd': {'seconds_per_op': 1.0}
+    }}
+    current = {'results': {
+        'a': {'seconds_per_op': 1.6},
+        'b': {'games_per_second': 90.0},
+        'c': {'seconds_per_op': 5.0},
+        # cases without a baseline are not compared
+        'e': {'seconds_per_op': 9.0}
+    }}
+    assert benchmark.compare(current, baseline, tolerance=0.5) == [('a', 'seconds_per_op', 1.0, 1.6)]
+    assert benchmark.compare(current, baseline, tolerance=0.05) == [
+        ('a', 'seconds_per_op', 1.0, 1.6), ('b', 'games_per_second', 100.0, 90.0)]
+
+
+def test_baseline_comparison_is_advisory_unless_strict(tmp_path, capsys):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text('{"results": {"do_move/bitboard/5x5/2p": {"seconds_per_op": 1e-12}}}')
+    args = ['--sizes', '5', '--players', '2', '--engines', 'bitboard', '--repeat', '1', '--env-games', '1',
+            '--output', str(tmp_path / 'out.json'), '--baseline', str(baseline)]
+    assert benchmark.main(args) == 0
+    assert 'REGRESSION do_move/bitboard/5x5/2p' in capsys.readouterr().err
+    assert benchmark.main(args + ['--strict']) == 1
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+import bitboard
+import quoridor
+
+
+def play_random(num_of_players, sx, sy, seed, moves=120):
+    rnd = random.Random(seed)
+    game = quoridor.QuoridorGame(num_of_players, sx, sy)
+    fast = bitboard.BitboardQuoridorGame(num_of_players, sx, sy)
+    for turn in range(moves):
+        player = turn % num_of_players
+        # half pawn steps, half wall attempts, so games keep moving after the walls run out
+        move = rnd.randrange(4) if rnd.random() < 0.5 else rnd.randrange(4, game.num_of_possible_moves())
+        assert np.array_equal(game.do_move(move, player), fast.do_move(move, player))
+        yield rnd, game, fast, player
+
+
+@pytest.mark.parametrize('num_of_players,sx,sy', [(2, 3, 3), (2, 5, 5), (2, 9, 9), (4, 9, 9), (2, 4, 7), (4, 6, 5)])
+@pytest.mark.parametrize('seed', range(3))
+def test_should_match_array_engine_on_random_games(num_of_players, sx, sy, seed):
+    for rnd, game, fast, player in play_random(num_of_players, sx, sy, seed):
+        assert np.array_equal(game.get_game_state(player), fast.get_game_state(player))
+        assert game.is_finished() == fast.is_finished()
+        for p in range(num_of_players):
+            assert game.shortest_path_for_player_to_win(p) == fast.shortest_path_for_player_to_win(p)
+        x1, y1 = rnd.randrange(sx), rnd.randrange(sy)
+        x2, y2 = rnd.randrange(-1, sx), rnd.randrange(-1, sy)
+        assert game.shortest_path(x1, y1, x2, y2) == fast.shortest_path(x1, y1, x2, y2)
+
+
+def test_should_match_render():
+    for _, game, fast, _ in play_random(2, 5, 5, 7, moves=60):
+        assert game.render() == fast.render()
+
+
+def test_should_init_from_game_state():
+    game = quoridor.QuoridorGame(2, 9, 9)
+    for turn, move in enumerate([4, 20, 70, 100, 2, 1, 3]):
+        game.do_move(move, turn % 2)
+    fast = bitboard.BitboardQuoridorGame(2, 9, 9)
+    fast.init_from_state(game.get_game_state(0)[1:])
+    assert np.array_equal(game.get_game_state(1), fast.get_game_state(1))
+    assert game.is_finished() == fast.is_finished()
+
+
+def test_should_remove_edge_like_array_engine():
+    game = bitboard.BitboardQuoridorGame(2, 3, 3)
+    game.remove_edge((0, 0), (1, 0))
+    game.remove_edge((0, 1), (1, 1))
+    game.remove_edge((1, 1), (1, 2))
+    assert not game.connected((1, 0), (0, 0))
+    assert game.shortest_path(0, 0, 2, 0) == 6
+    assert game.shortest_path(0, 0, 1, 0) == 7
+
+
+def test_should_create_game_for_engine():
+    assert type(quoridor.create_game(2, 9, 9)) is quoridor.QuoridorGame
+    assert isinstance(quoridor.create_game(2, 9, 9, quoridor.ENGINE_BITBOARD), bitboard.BitboardQuoridorGame)
+    with pytest.raises(ValueError):
+        quoridor.create_game(2, 9, 9, 'unknown')
+
+
+def test_array_mirrors_are_read_only():
+    game = bitboard.BitboardQuoridorGame(2, 5, 5)
+    with pytest.raises(ValueError):
+        game.dominoes[:] = 10
+    with pytest.raises(ValueError):
+        game.copy().positions[0] = 3
+    game.do_move(4, 0)
+    assert game.dominoes.tolist() == [4, 5] == [game.walls_left(p) for p in range(2)]
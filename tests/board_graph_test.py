@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+import pytest
+
+import board_graph
+import quoridor
+
+
+def random_games(num_of_players, sx, sy, count, moves=80):
+    rnd = random.Random(count)
+    res = []
+    for _ in range(count):
+        game = quoridor.QuoridorGame(num_of_players, sx, sy)
+        for turn in range(rnd.randrange(moves)):
+            move = rnd.randrange(4) if rnd.random() < 0.3 else rnd.randrange(4, game.num_of_possible_moves())
+            game.do_move(move, turn % num_of_players)
+        res.append(game)
+    return res
+
+
+@pytest.mark.parametrize('num_of_players,sx,sy', [(2, 5, 5), (4, 9, 9), (2, 4, 7)])
+def test_distance_fields_match_distance_maps(num_of_players, sx, sy):
+    games = random_games(num_of_players, sx, sy, 6)
+    fields = board_graph.distance_fields(np.array([game.board for game in games]), num_of_players)
+    assert fields.shape == (len(games), num_of_players, sx, sy)
+    for game, field in zip(games, fields):
+        for player in range(num_of_players):
+            expected = [game.distance_maps[player].distance(position) for position in range(sx * sy)]
+            assert field[player].reshape(-1).tolist() == expected
+    assert np.array_equal(board_graph.distance_fields(games[0].board, num_of_players), fields[0])
+
+
+def test_all_pairs_distances_match_shortest_path():
+    games = random_games(2, 4, 5, 3)
+    tables = board_graph.all_pairs_distances(np.array([game.board for game in games]))
+    assert tables.shape == (3, 20, 20)
+    for game, table in zip(games, tables):
+        assert (table == table.T).all()
+        for a in range(20):
+            for b in range(20):
+                xa, ya = game.to_coordinates(a)
+                xb, yb = game.to_coordinates(b)
+                assert table[a, b] == game.shortest_path(xa, ya, xb, yb)
+
+
+def test_walled_off_cells_are_unreachable():
+    game = quoridor.QuoridorGame(2, 3, 3)
+    # cut the top row off with two vertical-slot walls (each blocks two down edges)
+    game.board[:, 0] &= ~(1 << quoridor.DIR_DOWN)
+    fields = board_graph.distance_fields(game.board, 2)
+    assert (fields[0, :, 0] == board_graph.UNREACHABLE).all()
+    assert (fields[1, :, 0] == 0).all()
+    assert (fields[1, :, 1:] == board_graph.UNREACHABLE).all()
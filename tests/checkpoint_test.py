@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import checkpoint
+
+
+def weights(value):
+    return [np.full((3, 2), value, dtype=np.float32), np.full(2, value, dtype=np.float32)]
+
+
+def test_saves_in_background_and_loads_latest(tmp_path):
+    with checkpoint.CheckpointManager(str(tmp_path)) as manager:
+        manager.save(0, weights(1.5))
+        manager.flush()
+        loaded = manager.load()
+        assert [w.shape for w in loaded] == [(3, 2), (2,)]
+        assert all((w == 1.5).all() and w.dtype == np.float32 for w in loaded)
+        assert [w.tolist() for w in manager.load(0)] == [w.tolist() for w in loaded]
+    assert sorted(os.listdir(str(tmp_path))) == ['episode_0.npz', 'episode_latest.npz']
+
+
+def test_snapshot_is_taken_at_save_time(tmp_path):
+    w = weights(1.0)
+    with checkpoint.CheckpointManager(str(tmp_path)) as manager:
+        manager.save(0, w)
+        w[0][:] = 7.0
+    assert (manager.load()[0] == 1.0).all()
+
+
+def test_throttles_by_episode_count(tmp_path):
+    calls = []
+
+    def get_weights():
+        calls.append(1)
+        return weights(len(calls))
+
+    with checkpoint.CheckpointManager(str(tmp_path), every_episodes=3, keep=10) as manager:
+        saved = [manager.maybe_save(e, get_weights) for e in range(7)]
+    assert saved == [True, False, False, True, False, False, True]
+    assert len(calls) == 3
+    # a save that is still pending when the next one arrives is replaced by it
+    assert manager.saved + manager.dropped == 3
+    assert manager.episodes()[-1] == 6
+
+
+def test_throttles_by_time(tmp_path):
+    with checkpoint.CheckpointManager(str(tmp_path), every_episodes=None, every_seconds=3600) as manager:
+        assert manager.maybe_save(0, lambda: weights(0))
+        assert not manager.maybe_save(1, lambda: weights(1))
+        manager.every_seconds = 1e-9
+        assert manager.maybe_save(2, lambda: weights(2))
+
+
+def test_keeps_last_k_by_write_order(tmp_path):
+    with checkpoint.CheckpointManager(str(tmp_path), keep=2) as manager:
+        for e in [5, 6, 0, 1]:
+            manager.save(e, weights(e))
+            manager.flush()
+    assert manager.episodes() == [0, 1]
+    assert (manager.load()[0] == 1).all()
+
+
+def test_half_precision_is_loaded_back_as_float32(tmp_path):
+    with checkpoint.CheckpointManager(str(tmp_path), half=True) as manager:
+        manager.save(0, weights(0.1))
+    with np.load(manager.path(0)) as data:
+        assert data['w0'].dtype == np.float16
+    loaded = manager.load()
+    assert loaded[0].dtype == np.float32
+    assert np.allclose(loaded[0], 0.1, atol=1e-3)
+
+
+def test_readers_never_see_partial_files(tmp_path):
+    manager = checkpoint.CheckpointManager(str(tmp_path), keep=3)
+    big = [np.random.default_rng(0).random((200, 200), dtype=np.float32)]
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                loaded = manager.load()
+            except Exception as e:
+                errors.append(e)
+                return
+            if loaded is not None:
+                assert loaded[0].shape == (200, 200)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for e in range(20):
+        manager.save(e, big)
+    manager.close()
+    stop.set()
+    thread.join()
+    assert errors == []
+    assert manager.saved + manager.dropped == 20
+
+
+def test_rejects_bad_keep(tmp_path):
+    with pytest.raises(ValueError):
+        checkpoint.CheckpointManager(str(tmp_path), keep=0)
+
+
+def test_failed_write_is_raised_and_does_not_hang(tmp_path, monkeypatch):
+    save_weights = checkpoint.save_weights
+
+    def failing(path, weights, half=False, **extra):
+        raise OSError('disk full')
+
+    manager = checkpoint.CheckpointManager(str(tmp_path))
+    monkeypatch.setattr(checkpoint, 'save_weights', failing)
+    manager.save(0, weights(0))
+    with pytest.raises(OSError):
+        manager.flush()
+    # the error is reported once and later saves go through
+    manager.flush()
+    monkeypatch.setattr(checkpoint, 'save_weights', save_weights)
+    manager.save(1, weights(1))
+    manager.close()
+    assert manager.episodes() == [1]
+
+
+def test_failed_write_is_raised_from_next_save(tmp_path, monkeypatch):
+    def failing(path, weights, half=False, **extra):
+        raise OSError('disk full')
+
+    manager = checkpoint.CheckpointManager(str(tmp_path))
+    monkeypatch.setattr(checkpoint, 'save_weights', failing)
+    manager.save(0, weights(0))
+    while manager._has_pending() or manager._writing:
+        time.sleep(0.001)
+    with pytest.raises(OSError):
+        manager.save(1, weights(1))
+    manager.close()
+
+
+def test_latest_never_replaces_a_pending_episode(tmp_path, monkeypatch):
+    release = threading.Event()
+    written = []
+    save_weights = checkpoint.save_weights
+
+    def slow(path, weights, half=False, **extra):
+        release.wait()
+        written.append(os.path.basename(path))
+        save_weights(path, weights, half, **extra)
+
+    monkeypatch.setattr(checkpoint, 'save_weights', slow)
+    with checkpoint.CheckpointManager(str(tmp_path), keep=10) as manager:
+        manager.save(0, weights(0))
+        while not manager._writing:
+            time.sleep(0.001)
+        # episode 0 is being written; episode 1 waits behind it and must survive the 'latest'
+        manager.save(1, weights(1))
+        manager.save(checkpoint.LATEST, weights(2))
+        release.set()
+    assert manager.episodes() == [0, 1]
+    assert written[-1] == 'episode_latest.npz'
+    assert (manager.load()[0] == 2).all()
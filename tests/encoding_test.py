@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+import encoding
+import quoridor
+from encoding import Encoder
+
+
+def random_states(num_of_players, sx, sy, seed, moves=60):
+    rnd = random.Random(seed)
+    game = quoridor.QuoridorGame(num_of_players, sx, sy)
+    for turn in range(moves):
+        player = turn % num_of_players
+        move = rnd.randrange(4) if rnd.random() < 0.5 else rnd.randrange(4, game.num_of_possible_moves())
+        game.do_move(move, player)
+        yield rnd, game, (turn + 1) % num_of_players
+
+
+def game_from_state(state, num_of_players, sx, sy):
+    game = quoridor.QuoridorGame(num_of_players, sx, sy)
+    game.init_from_state(np.array(state[1:]))
+    return game
+
+
+@pytest.mark.parametrize('sx,sy', [(5, 5), (4, 7)])
+def test_encode_matches_batch_encoding(sx, sy):
+    encoder = Encoder(2, sx, sy)
+    buffer = encoder.empty(60)
+    states = []
+    for i, (_, game, player) in enumerate(random_states(2, sx, sy, 0)):
+        encoder.encode(game, player, out=buffer[i])
+        states.append(game.get_game_state(player))
+    assert np.array_equal(encoder.encode_states(np.array(states)), buffer)
+
+
+def test_encoding_layout():
+    encoder = Encoder(2, 5, 5, dtype=np.uint8)
+    game = quoridor.QuoridorGame(2, 5, 5)
+    game.do_move(4, 0)
+    res = encoder.encode(game, 1)
+    assert res.dtype == np.uint8 and res.shape == (encoder.size,) == ((2 + 3) * 25 + 4,)
+    planes = encoder.planes_view(res)
+    for p in range(2):
+        x, y = game.to_coordinates(game.positions[p])
+        assert planes[p].sum() == 1 and planes[p, x, y] == 1
+    # the first wall slot blocks right edges at (0, 0) and (0, 1) and the centre at (0, 0)
+    assert list(zip(*np.nonzero(planes[2]))) == [(0, 0), (0, 1)]
+    assert planes[3].sum() == 0
+    assert list(zip(*np.nonzero(planes[4]))) == [(0, 0)]
+    assert res[encoder.to_move_offset:encoder.walls_offset].tolist() == [0, 1]
+    assert res[encoder.walls_offset:].tolist() == [4, 5]
+
+
+@pytest.mark.parametrize('symmetry', encoding.symmetries(2))
+@pytest.mark.parametrize('sx,sy', [(5, 5), (4, 7)])
+def test_symmetry_commutes_with_moves(symmetry, sx, sy):
+    for rnd, game, player in random_states(2, sx, sy, 1):
+        state = game.get_game_state(player)[None]
+        flipped = encoding.transform_states(state, symmetry, 2, sx, sy)
+        flipped_game = game_from_state(flipped[0], 2, sx, sy)
+        finished, winner = game.is_finished()
+        if winner >= 0 and symmetry in (encoding.SWAP, encoding.MIRROR_SWAP):
+            winner = 1 - winner
+        assert flipped_game.is_finished() == (finished, winner)
+        move = rnd.randrange(game.num_of_possible_moves())
+        flipped_move = int(encoding.transform_actions(np.array([move]), symmetry, 2, sx, sy)[0])
+        flipped_player = int(flipped[0, 0])
+        after = game.copy()
+        after.do_move(move, player)
+        flipped_game.do_move(flipped_move, flipped_player)
+        expected = encoding.transform_states(after.get_game_state(player)[None], symmetry, 2, sx, sy)[0]
+        assert np.array_equal(flipped_game.get_game_state(flipped_player), expected)
+
+
+@pytest.mark.parametrize('symmetry', encoding.symmetries(2))
+def test_plane_transform_matches_state_transform(symmetry):
+    encoder = Encoder(2, 5, 6)
+    states = np.array([game.get_game_state(player) for _, game, player in random_states(2, 5, 6, 2)])
+    flipped = encoding.transform_states(states, symmetry, 2, 5, 6)
+    assert np.array_equal(encoder.transform(encoder.encode_states(states), symmetry), encoder.encode_states(flipped))
+    # every symmetry here is its own inverse
+    assert np.array_equal(encoding.transform_states(flipped, symmetry, 2, 5, 6), states)
+
+
+def test_augment_multiplies_transitions():
+    states = np.array([game.get_game_state(player) for _, game, player in random_states(2, 5, 5, 3, moves=10)])
+    actions = np.arange(10) % 4
+    rewards = np.linspace(0, 1, 10)
+    dones = np.zeros(10, dtype=bool)
+    s, a, r, n, d = encoding.augment(states, actions, rewards, states, dones, 2, 5, 5)
+    assert len(s) == len(a) == len(r) == len(n) == len(d) == 40
+    assert np.array_equal(s[:10], states)
+    assert np.array_equal(a[10:20], encoding.STEP_MIRROR[actions])
+    assert np.array_equal(r[30:], rewards)
+
+
+def test_four_players_only_allow_identity():
+    assert encoding.symmetries(4) == [encoding.IDENTITY]
+    with pytest.raises(ValueError):
+        encoding.transform_actions(np.array([1]), encoding.MIRROR, 4, 5, 5)
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pytest
+
+import alpha_beta
+import game_record
+import quoridor
+import quoridor_env
+
+
+def play(seed, sx=5, sy=5, num_of_players=2):
+    agents = [alpha_beta.RandomAgent(seed=seed * 10 + p) for p in range(num_of_players)]
+    return alpha_beta.play_game(agents, sx, sy, max_moves=60)
+
+
+def test_should_round_trip_games(tmp_path):
+    path = str(tmp_path / 'games.qgr')
+    games = [play(seed) for seed in range(5)]
+    with game_record.GameRecordWriter(path) as writer:
+        for moves, winner in games:
+            writer.write(moves, 2, 5, 5, 0, winner)
+    records = list(game_record.read_records(path))
+    assert [(r.moves.tolist(), r.winner) for r in records] == [(list(m), w) for m, w in games]
+    assert os.path.getsize(path) == 16 + sum(8 + len(m) for m, _ in games)
+
+
+def test_large_boards_use_two_byte_moves(tmp_path):
+    path = str(tmp_path / 'games.qgr')
+    with game_record.GameRecordWriter(path) as writer:
+        writer.write([4 + 400, 2, 0], 2, 17, 17)
+    record = next(game_record.read_records(path))
+    assert record.moves.tolist() == [404, 2, 0]
+    assert (record.sx, record.sy, record.winner) == (17, 17, -1)
+
+
+def test_appending_writers_and_truncated_tail(tmp_path):
+    path = str(tmp_path / 'games.qgr')
+    for seed in range(2):
+        with game_record.GameRecordWriter(path) as writer:
+            writer.write(play(seed)[0], 2, 5, 5)
+    with open(path, 'ab') as f:
+        f.write(b'\x02\x05\x05')
+    assert len(list(game_record.read_records(path))) == 2
+
+
+def test_readers_see_every_written_game_while_the_writer_is_open(tmp_path):
+    path = str(tmp_path / 'games.qgr')
+    with game_record.GameRecordWriter(path) as writer:
+        for seed in range(3):
+            writer.write(play(seed)[0], 2, 5, 5)
+            assert len(list(game_record.read_records(path))) == seed + 1
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a game record')
+    with pytest.raises(ValueError):
+        list(game_record.read_records(str(path)))
+
+
+def test_transitions_replay_the_game():
+    moves, winner = play(3)
+    record = game_record.GameRecord(2, 5, 5, 0, winner, np.array(moves, dtype=np.uint8))
+    game = quoridor.create_game(2, 5, 5)
+    player = 0
+    rows = list(game_record.transitions(record))
+    assert len(rows) == len(moves)
+    for (state, action, reward, next_state, done), move in zip(rows, moves):
+        assert np.array_equal(state, game.get_game_state(player))
+        game.do_move(move, player)
+        assert action == move
+        assert reward == quoridor_env.reward(game, player)
+        player = (player + 1) % 2
+        assert np.array_equal(next_state, game.get_game_state(player))
+        assert done == game.is_finished()[0]
+    assert len(list(game_record.transitions(record, players=[1]))) == len(moves) // 2
+
+
+# learner and opponent alternate as in D2Solver._run: the opponent still moves after a winning
+# learner step, and the episode ends on the opponent's done
+def solver_episode(env, rnd):
+    state = env.reset()
+    learner = env.player
+    rows, moves = [], []
+    done = False
+    while not done:
+        action = int(rnd.integers(4))
+        next_state, reward, done, _ = env.step(action)
+        rows.append((state, action, reward, next_state, done))
+        op_action = int(rnd.integers(4))
+        state, _, done, _ = env.step(op_action)
+        moves += [action, op_action]
+    return learner, rows, moves
+
+
+def test_transitions_match_the_env_in_solver_episodes():
+    pytest.importorskip('gym')
+    env = quoridor_env.QuoridorEnv(num_of_players=2, sx=5, sy=5)
+    rnd = np.random.default_rng(0)
+    learner_wins = 0
+    for _ in range(20):
+        learner, rows, moves = solver_episode(env, rnd)
+        record = game_record.GameRecord(2, 5, 5, learner, env.game.is_finished()[1], np.array(moves, dtype=np.uint8))
+        replayed = list(game_record.transitions(record, players=[learner]))
+        assert len(replayed) == len(rows)
+        for (state, action, reward, next_state, done), expected in zip(replayed, rows):
+            assert np.array_equal(state, expected[0])
+            assert (action, reward, done) == expected[1:3] + expected[4:]
+            assert np.array_equal(next_state, expected[3])
+        learner_wins += rows[-1][2] == 1
+    # episodes where the learner's winning step is followed by one more opponent move
+    assert learner_wins > 0
+
+
+def test_batches_stream_every_transition_shuffled(tmp_path):
+    paths = []
+    total = 0
+    for i in range(3):
+        path = str(tmp_path / '{}.qgr'.format(i))
+        with game_record.GameRecordWriter(path) as writer:
+            for seed in range(4):
+                moves, winner = play(i * 4 + seed)
+                writer.write(moves, 2, 5, 5, 0, winner)
+                total += len(moves)
+        paths.append(path)
+    assert game_record.record_files(str(tmp_path)) == paths
+    out = list(game_record.batches(paths, 32, buffer_size=64, seed=0))
+    assert all(len(b[0]) == 32 for b in out[:-1])
+    assert sum(len(b[0]) for b in out) == total
+    states = np.concatenate([b[0] for b in out])
+    assert states.shape == (total, 1 + 4 + 25)
+    assert states.dtype == np.uint8
+    with pytest.raises(ValueError):
+        next(game_record.batches(paths, 32, buffer_size=16))
@@ -0,0 +1,95 @@
+import asyncio
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+from inference_server import InferenceServer, QueueClient
+
+
+def q_values(states):
+    # two "actions": the row sum and the first column
+    return np.stack([states.sum(axis=1), states[:, 0]], axis=1)
+
+
+def test_batches_concurrent_requests_and_routes_results():
+    calls = []
+
+    def predict(states):
+        calls.append(len(states))
+        return q_values(states)
+
+    with InferenceServer(predict, max_batch_size=64, max_wait_us=50000) as server:
+        states = np.arange(40 * 3, dtype=np.float32).reshape(40, 3)
+        futures = [server.submit(state) for state in states]
+        results = [f.result(timeout=10) for f in futures]
+    assert all(np.allclose(r, q_values(s[None])[0]) for r, s in zip(results, states))
+    assert len(calls) < len(states)
+    assert sum(calls) == len(states)
+    assert server.batch_sizes.count == len(calls)
+    assert server.queue_latency.count == len(states)
+
+
+def test_respects_max_batch_size_and_multi_row_requests():
+    calls = []
+
+    def predict(states):
+        calls.append(len(states))
+        return q_values(states)
+
+    with InferenceServer(predict, max_batch_size=4, max_wait_us=50000) as server:
+        blocks = [np.full((3, 2), i, dtype=np.float32) for i in range(5)]
+        futures = [server.submit(block) for block in blocks]
+        results = [f.result(timeout=10) for f in futures]
+    assert max(calls) <= 4
+    for block, result in zip(blocks, results):
+        assert result.shape == (3, 2)
+        assert np.allclose(result, q_values(block))
+
+
+def test_predict_async_from_many_coroutines():
+    async def play(server):
+        return await asyncio.gather(*[server.predict_async(np.array([i, 1.0])) for i in range(16)])
+
+    with InferenceServer(q_values, max_wait_us=20000) as server:
+        results = asyncio.run(play(server))
+    assert [r[0] for r in results] == [i + 1.0 for i in range(16)]
+    assert server.batches < 16
+
+
+def test_model_errors_reach_every_request_in_the_batch():
+    def broken(states):
+        raise ValueError('boom')
+
+    with InferenceServer(broken) as server:
+        future = server.submit(np.zeros(2))
+        with pytest.raises(ValueError):
+            future.result(timeout=10)
+    with pytest.raises(ValueError):
+        server.submit(np.zeros(2))
+
+
+def test_queue_clients_share_batches():
+    request_queue = queue.Queue()
+    response_queues = [queue.Queue() for _ in range(4)]
+    results = {}
+    with InferenceServer(q_values, max_wait_us=20000) as server:
+        server.serve(request_queue, response_queues)
+
+        def actor(client_id):
+            client = QueueClient(client_id, request_queue, response_queues[client_id])
+            results[client_id] = [client.predict(np.array([[client_id, step]], dtype=np.float32)) for step in range(5)]
+
+        threads = [threading.Thread(target=actor, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    for client_id, rows in results.items():
+        assert [r.tolist() for r in rows] == [[[client_id + step, client_id]] for step in range(5)]
+
+
+def test_rejects_bad_batch_size():
+    with pytest.raises(ValueError):
+        InferenceServer(q_values, max_batch_size=0)
@@ -0,0 +1,79 @@
+import json
+import signal
+
+from instrumentation import Histogram, Instruments
+
+
+def test_snapshot_reports_counters_timers_and_gauges():
+    instruments = Instruments()
+    instruments.count('env_steps', 3)
+    instruments.count('env_steps')
+    for _ in range(2):
+        with instruments.timer('replay'):
+            pass
+    instruments.gauge('replay_buffer_fill', 0.5)
+    res = instruments.snapshot()
+    assert res['counters'] == {'env_steps': 4}
+    assert res['rates']['env_steps_per_second'] > 0
+    assert res['timers']['replay']['count'] == 2
+    assert res['timers']['replay']['total'] >= 0
+    assert res['gauges'] == {'replay_buffer_fill': 0.5}
+    # rates cover the window since the previous snapshot
+    assert instruments.snapshot()['rates']['env_steps_per_second'] == 0
+
+
+def test_export_appends_jsonl_only_when_due(tmp_path):
+    path = tmp_path / 'stats.jsonl'
+    instruments = Instruments(str(path), every=3600)
+    instruments.count('episodes')
+    assert instruments.export() is None
+    assert instruments.export(force=True)['counters'] == {'episodes': 1}
+    instruments.count('episodes')
+    instruments.export(force=True)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['counters']['episodes'] for line in lines] == [1, 2]
+
+
+def test_profiler_writes_collapsed_stacks(tmp_path):
+    path = tmp_path / 'profile.txt'
+    instruments = Instruments()
+    instruments.start_profiler(str(path), interval=0.001)
+    try:
+        total = 0
+        while sum(instruments.samples.values()) < 5:
+            total += sum(range(1000))
+    finally:
+        instruments.stop_profiler()
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert 'instrumentation_test.py:test_profiler_writes_collapsed_stacks' in stack
+    assert int(count) > 0
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram.exponential(100)
+    assert histogram.bounds == [1, 2, 4, 8, 16, 32, 64, 128]
+    for value in [1, 3, 3, 5, 200]:
+        histogram.add(value)
+    assert histogram.counts == [1, 0, 2, 1, 0, 0, 0, 0, 1]
+    assert histogram.mean == 42.4
+    assert histogram.quantile(0.5) == 4
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.to_dict()['count'] == 5
+
+
+def test_stop_profiler_restores_the_previous_handler(tmp_path):
+    def handler(signum, frame):
+        pass
+
+    previous = signal.signal(signal.SIGPROF, handler)
+    try:
+        instruments = Instruments()
+        instruments.start_profiler(str(tmp_path / 'profile.txt'))
+        assert signal.getsignal(signal.SIGPROF) == instruments._sample
+        instruments.stop_profiler()
+        assert signal.getsignal(signal.SIGPROF) is handler
+        assert signal.getitimer(signal.ITIMER_PROF) == (0, 0)
+    finally:
+        signal.signal(signal.SIGPROF, previous)
@@ -0,0 +1,100 @@
+import numpy as np
+import mcts
+import quoridor
+
+
+class UniformEvaluator:
+    def __init__(self, num_of_actions):
+        self.num_of_actions = num_of_actions
+        self.batches = []
+
+    def __call__(self, states):
+        self.batches.append(len(states))
+        return np.full((len(states), self.num_of_actions), 1.0 / self.num_of_actions), np.zeros(len(states))
+
+
+def test_should_spread_visits_over_legal_actions():
+    game = quoridor.create_game(2, 5, 5, quoridor.ENGINE_BITBOARD)
+    evaluator = UniformEvaluator(game.num_of_possible_moves())
+    search = mcts.MCTS(evaluator, game.num_of_possible_moves(), batch_size=8)
+    policy = search.search(game, 0, num_simulations=200)
+    assert abs(policy.sum() - 1) < 1e-5
+    assert not policy[~game.legal_action_mask(0)].any()
+    assert search.visits[search.root] == 200
+    assert max(evaluator.batches) <= 8
+    assert max(evaluator.batches) > 1
+    assert search.evaluations == len(evaluator.batches)
+
+
+def test_should_find_the_winning_step():
+    game = quoridor.create_game(2, 5, 5, quoridor.ENGINE_BITBOARD)
+    for _ in range(3):
+        game.do_move(quoridor.MOVE_DOWN, 0)
+    search = mcts.MCTS(UniformEvaluator(4), 4, batch_size=4)
+    assert search.best_action(game, 0, num_simulations=100) == quoridor.MOVE_DOWN
+
+
+def test_should_reuse_subtree_after_both_moves():
+    game = quoridor.create_game(2, 5, 5)
+    search = mcts.MCTS(UniformEvaluator(4), 4, batch_size=4)
+    action = search.best_action(game, 0, num_simulations=300)
+    game.do_move(action, 0)
+    game.do_move(quoridor.MOVE_UP, 1)
+    search.advance(action)
+    node = search._find_root(game, 0)
+    assert node is not None
+    reused = search.visits[node]
+    assert reused > 0
+    search.search(game, 0, num_simulations=50)
+    assert search.visits[search.root] == reused + 50
+
+
+def test_should_respect_node_and_time_budgets():
+    game = quoridor.create_game(2, 9, 9, quoridor.ENGINE_BITBOARD)
+    moves = game.num_of_possible_moves()
+    search = mcts.MCTS(UniformEvaluator(moves), moves, capacity=4096)
+    search.search(game, 0, num_simulations=10 ** 6, max_nodes=2000)
+    assert search.size <= 2000
+    search.reset()
+    search.search(game, 0, num_simulations=10 ** 6, time_budget=0.2)
+    assert 0 < search.visits[search.root] < 10 ** 6
+
+
+def test_compaction_should_keep_the_subtree():
+    game = quoridor.create_game(2, 5, 5, quoridor.ENGINE_BITBOARD)
+    search = mcts.MCTS(UniformEvaluator(4), 4, capacity=2000)
+    search.search(game, 0, num_simulations=400)
+    first, last = search._children(search.root)
+    child = first + int(np.argmax(search.visits[first:last]))
+    visits, children = search.visits[child], search.num_children[child]
+    search.advance(int(search.action[child]))
+    assert search.root == mcts.ROOT
+    assert search.visits[mcts.ROOT] == visits
+    assert search.num_children[mcts.ROOT] == children
+    first, last = search._children(mcts.ROOT)
+    assert (search.parent[first:last] == mcts.ROOT).all()
+
+
+def test_search_leaves_the_game_unchanged():
+    for engine in [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]:
+        game = quoridor.create_game(2, 5, 5, engine)
+        game.do_move(7, 0)
+        state, key = game.get_game_state(1), game.hash
+        moves = game.num_of_possible_moves()
+        mcts.MCTS(UniformEvaluator(moves), moves, batch_size=8).search(game, 1, num_simulations=200)
+        assert (game.get_game_state(1) == state).all()
+        assert game.hash == key
+
+
+def test_arrays_grow_with_the_tree(monkeypatch):
+    monkeypatch.setattr(mcts, 'INITIAL_NODES', 64)
+    game = quoridor.create_game(2, 5, 5, quoridor.ENGINE_BITBOARD)
+    moves = game.num_of_possible_moves()
+    search = mcts.MCTS(UniformEvaluator(moves), moves, batch_size=8)
+    assert search.capacity == moves * mcts.DEFAULT_EXPANSIONS
+    assert search.allocated == 64
+    search.search(game, 0, num_simulations=300)
+    assert search.allocated >= search.size > 64
+    assert search.visits[search.root] == 300
+    first, last = search._children(search.root)
+    assert (search.parent[first:last] == search.root).all()
@@ -0,0 +1,96 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import numpy_model
+from numpy_model import NumpyModel
+
+
+def reference_predict(weights, states):
+    x = states.astype(np.float64)
+    for i, activation in enumerate(numpy_model.ACTIVATIONS):
+        x = x @ weights[2 * i] + weights[2 * i + 1]
+        if activation == 'tanh':
+            x = np.tanh(x)
+        elif activation == 'softmax':
+            x = np.exp(x) / np.exp(x).sum(axis=1, keepdims=True)
+    return x
+
+
+class FakeDense:
+    def __init__(self, activation):
+        self.activation = activation
+
+    def get_config(self):
+        return {'activation': self.activation}
+
+
+class FakeKerasModel:
+    def __init__(self, weights, activations):
+        self.weights = weights
+        self.layers = [FakeDense(a) for a in activations]
+
+    def get_weights(self):
+        return self.weights
+
+
+@pytest.fixture
+def model():
+    return numpy_model.build_model(90, 4, seed=0)
+
+
+def test_build_model_matches_server_layer_sizes(model):
+    assert [w.shape for w in model.get_weights()] == [
+        (90, 180), (180,), (180, 90), (90,), (90, 90), (90,), (90, 90), (90,), (90, 4), (4,)]
+
+
+def test_predict_reproduces_dense_stack(model):
+    rnd = np.random.default_rng(1)
+    model.set_weights([w + rnd.standard_normal(w.shape) * 0.1 for w in model.get_weights()])
+    states = rnd.integers(0, 8, (7, 90)).astype(np.float32)
+    q = model.predict(states)
+    assert q.shape == (7, 4) and q.dtype == np.float32
+    assert np.allclose(q, reference_predict(model.get_weights(), states), atol=1e-4)
+    assert np.allclose(model.predict(states, batch_size=3), q, atol=1e-6)
+
+
+def test_float16_stays_close_to_float32(model):
+    states = np.random.default_rng(2).integers(0, 8, (5, 90))
+    half = NumpyModel(model.get_weights(), dtype=np.float16)
+    assert half.predict(states).dtype == np.float16
+    assert np.allclose(half.predict(states), model.predict(states), atol=2e-2)
+
+
+def test_export_and_load_round_trip(tmp_path, model):
+    path = str(tmp_path / 'model.npz')
+    activations = ['relu', 'linear', 'tanh', 'sigmoid', 'linear']
+    numpy_model.export_model(FakeKerasModel(model.get_weights(), activations), path)
+    loaded = NumpyModel.load(path)
+    assert loaded.activations == activations
+    assert all(np.array_equal(a, b) for a, b in zip(loaded.get_weights(), model.get_weights()))
+    numpy_model.export_model(model, path, half=True)
+    loaded = NumpyModel.load(path)
+    assert loaded.activations == numpy_model.ACTIVATIONS
+    assert loaded.get_weights()[0].dtype == np.float32
+
+
+def test_loads_checkpoints_without_activations(tmp_path, model):
+    from checkpoint import save_weights
+    path = str(tmp_path / 'episode_1.npz')
+    save_weights(path, model.get_weights())
+    states = np.ones((2, 90))
+    assert np.allclose(NumpyModel.load(path).predict(states), model.predict(states))
+
+
+def test_rejects_mismatched_weights(model):
+    with pytest.raises(ValueError):
+        NumpyModel(model.get_weights()[:-2])
+    with pytest.raises(ValueError):
+        NumpyModel(model.get_weights(), ['linear'] * 4 + ['gelu']).predict(np.ones((1, 90)))
+
+
+def test_import_does_not_pull_in_tensorflow():
+    code = 'import sys, numpy_model; sys.exit(any(m in sys.modules for m in ("tensorflow", "keras")))'
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import opponent_pool
+from opponent_pool import OpponentPool
+
+
+def random_weights(rnd, sizes=(6, 12, 6, 6, 6, 4)):
+    res = []
+    for n_in, n_out in zip(sizes, sizes[1:]):
+        res += [rnd.standard_normal((n_in, n_out)).astype(np.float32), rnd.standard_normal(n_out).astype(np.float32)]
+    return res
+
+
+def reference_forward(weights, states):
+    x = states
+    for i, activation in enumerate(opponent_pool.ACTIVATIONS):
+        x = x @ weights[2 * i] + weights[2 * i + 1]
+        if activation == 'tanh':
+            x = np.tanh(x)
+        elif activation == 'softmax':
+            x = np.exp(x) / np.exp(x).sum(axis=1, keepdims=True)
+    return x
+
+
+def test_predict_matches_dense_stack(tmp_path):
+    rnd = np.random.default_rng(0)
+    pool = OpponentPool(str(tmp_path))
+    weights = random_weights(rnd)
+    pool.add('a', weights)
+    states = rnd.integers(0, 8, (5, 6)).astype(np.float32)
+    assert np.allclose(pool.predict('a', states), reference_forward(weights, states), atol=1e-5)
+
+
+def test_predict_many_runs_each_state_through_its_opponent(tmp_path):
+    rnd = np.random.default_rng(1)
+    pool = OpponentPool(str(tmp_path))
+    models = {name: random_weights(rnd) for name in ['a', 'b', 'c']}
+    for name, weights in models.items():
+        pool.add(name, weights)
+    names = ['b', 'a', 'b', 'c', 'b']
+    states = rnd.integers(0, 8, (5, 6)).astype(np.float32)
+    q = pool.predict_many(names, states)
+    for name, state, row in zip(names, states, q):
+        assert np.allclose(row, reference_forward(models[name], state[None])[0], atol=1e-5)
+
+
+def test_pfsp_prefers_opponents_the_learner_loses_to(tmp_path):
+    rnd = np.random.default_rng(2)
+    pool = OpponentPool(str(tmp_path), seed=0)
+    for name in ['easy', 'hard', 'new']:
+        pool.add(name, random_weights(rnd))
+    for _ in range(20):
+        pool.record('easy', True)
+        pool.record('hard', False)
+    p = dict(zip(pool.names(), pool.probabilities()))
+    assert p['hard'] > p['new'] > p['easy']
+    samples = [pool.sample() for _ in range(300)]
+    assert samples.count('hard') > samples.count('easy')
+
+
+def test_memory_cap_evicts_cold_opponents_and_reloads_them(tmp_path):
+    rnd = np.random.default_rng(3)
+    weights = {name: random_weights(rnd) for name in ['a', 'b', 'c']}
+    size = sum(w.nbytes for w in weights['a'])
+    pool = OpponentPool(str(tmp_path), memory_cap=size * 2)
+    for name in ['a', 'b', 'c']:
+        pool.add(name, weights[name])
+    assert list(pool.cache) == ['b', 'c']
+    assert pool.cached_bytes <= pool.memory_cap
+    pool.weights('b')
+    reloaded = pool.weights('a')
+    assert list(pool.cache) == ['b', 'a']
+    assert pool.loads == 1
+    assert all(np.array_equal(w, v) for w, v in zip(reloaded, weights['a']))
+
+
+def test_max_opponents_drops_the_oldest(tmp_path):
+    rnd = np.random.default_rng(4)
+    pool = OpponentPool(str(tmp_path), max_opponents=2)
+    for name in ['a', 'b', 'c']:
+        pool.add(name, random_weights(rnd))
+    assert pool.names() == ['b', 'c']
+    assert not (tmp_path / 'a.npz').exists()
+    with pytest.raises(KeyError):
+        pool.weights('a')
+
+
+def test_empty_pool_samples_nothing(tmp_path):
+    assert OpponentPool(str(tmp_path)).sample() is None
+    with pytest.raises(ValueError):
+        OpponentPool(str(tmp_path), weighting='nope')
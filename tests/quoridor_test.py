@@ -1,3 +1,5 @@
+import random
+
 import numpy as np
 import quoridor
 
@@ -174,4 +176,134 @@ def test_game_not_finished_if_not_all_locked():
     game.remove_edge((0, 1), (0, 2))
     game.remove_edge((1, 1), (1, 2))
     print(game.render())
-    assert not game.is_finished()[0]
\ No newline at end of file
+    assert not game.is_finished()[0]
+
+def test_distance_maps_follow_removed_edges():
+    rnd = random.Random(3)
+    game = quoridor.QuoridorGame(4, 9, 9)
+    goals = [(-1, 8), (-1, 0), (8, -1), (0, -1)]
+    for _ in range(60):
+        game.add_border(rnd.randrange(game.num_of_possible_moves() - 4), 0)
+        for player, distance_map in enumerate(game.distance_maps):
+            for position in range(81):
+                x, y = game.to_coordinates(position)
+                assert distance_map.distance(position) == game.shortest_path(x, y, *goals[player])
+
+
+def test_shortest_path_for_player_to_win_after_walls():
+    game = quoridor.QuoridorGame(2, 3, 3)
+    assert game.shortest_path_for_player_to_win(0) == 2
+    game.remove_edge((0, 1), (0, 2))
+    game.remove_edge((1, 0), (1, 1))
+    assert game.shortest_path_for_player_to_win(0) == 3
+    game.remove_edge((1, 1), (1, 2))
+    game.remove_edge((2, 1), (2, 2))
+    assert game.shortest_path_for_player_to_win(0) == -1
+
+
+def brute_force_mask(game, player):
+    mask = np.zeros(game.num_of_possible_moves(), dtype=bool)
+    state = game.get_game_state(player)[1:]
+    reachable = [p for p in range(game.num_of_players) if game.shortest_path_for_player_to_win(p) != -1]
+    for move in range(game.num_of_possible_moves()):
+        copy = quoridor.QuoridorGame(game.num_of_players, game.sx, game.sy)
+        copy.init_from_state(np.copy(state))
+        after = copy.do_move(move, player)
+        changed = not np.array_equal(after, state)
+        mask[move] = changed and all(copy.shortest_path_for_player_to_win(p) != -1 for p in reachable)
+    return mask
+
+
+def test_legal_action_mask_matches_brute_force():
+    # more dominoes than usual so that walls start cutting off paths
+    state = quoridor.QuoridorGame(2, 5, 5).get_game_state(0)[1:]
+    state[2:4] = 12
+    for engine in [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]:
+        rnd = random.Random(5)
+        game = quoridor.create_game(2, 5, 5, engine)
+        game.init_from_state(np.copy(state))
+        for turn in range(40):
+            player = turn % 2
+            mask = game.legal_action_mask(player)
+            assert np.array_equal(mask, brute_force_mask(game, player))
+            assert np.array_equal(game.legal_moves(player), np.flatnonzero(mask))
+            game.do_move(rnd.choice(game.legal_moves(player)), player)
+
+
+def test_blocking_wall_slots_cache_follows_pawn_steps_and_walls():
+    for engine in [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]:
+        for num_of_players, sx, sy in [(2, 5, 5), (4, 5, 6)]:
+            rnd = random.Random(7)
+            game = quoridor.create_game(num_of_players, sx, sy, engine)
+            state = game.get_game_state(0)[1:]
+            state[num_of_players:2 * num_of_players] = 10
+            game.init_from_state(state)
+            undo = []
+            for turn in range(80):
+                player = turn % num_of_players
+                fresh = quoridor.QuoridorGame(num_of_players, sx, sy)
+                fresh.init_from_state(np.copy(game.get_game_state(0)[1:]))
+                assert game.blocking_wall_slots() == fresh.blocking_wall_slots()
+                if undo and rnd.random() < 0.2:
+                    game.unmake_move(undo.pop())
+                    continue
+                # mostly steps, so the cached paths are followed and left
+                moves = game.legal_moves(player)
+                steps = [m for m in moves if m < 4]
+                move = rnd.choice(steps if steps and rnd.random() < 0.8 else moves)
+                undo.append(game.make_move(move, player))
+
+
+def snapshot(game):
+    return (game.get_game_state(0).tolist(), game.hash, game.wall_free.tolist(),
+            [game.shortest_path_for_player_to_win(p) for p in range(game.num_of_players)])
+
+
+def test_unmake_move_restores_every_field():
+    for engine in [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]:
+        for num_of_players, sx, sy in [(2, 9, 9), (4, 5, 6)]:
+            rnd = random.Random(3)
+            game = quoridor.create_game(num_of_players, sx, sy, engine)
+            for turn in range(60):
+                before = snapshot(game)
+                undo = []
+                for depth in range(rnd.randrange(1, 6)):
+                    player = (turn + depth) % num_of_players
+                    move = rnd.randrange(game.num_of_possible_moves())
+                    expected = game.copy()
+                    expected.do_move(move, player)
+                    undo.append(game.make_move(move, player))
+                    assert snapshot(game) == snapshot(expected)
+                for record in reversed(undo):
+                    game.unmake_move(record)
+                assert snapshot(game) == before
+                game.do_move(rnd.choice(game.legal_moves(turn % num_of_players)), turn % num_of_players)
+
+
+def test_state_view_matches_game_state_without_allocating():
+    for engine in [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD]:
+        game = quoridor.create_game(2, 5, 5, engine)
+        view = game.state_view(1)
+        game.do_move(4, 0)
+        assert game.state_view(1) is view
+        assert np.array_equal(view, game.get_game_state(1))
+        out = np.zeros(len(view))
+        assert game.state_view(0, out) is out
+        assert np.array_equal(out, game.get_game_state(0))
+        assert game.copy().state_view(0) is not view
+
+
+def test_board_tables_are_shared_and_match_coordinates():
+    game = quoridor.QuoridorGame(4, 5, 7)
+    assert game.tables is quoridor.board_tables(5, 7)
+    assert quoridor.create_game(2, 5, 7, quoridor.ENGINE_BITBOARD).tables is game.tables
+    for position in range(5 * 7):
+        x, y = game.to_coordinates(position)
+        for move, (target, _, _) in enumerate(game.tables.steps[position]):
+            nx, ny = game.calculate_new_position(x, y, move)
+            assert target == (game.to_position(nx, ny) if game.in_board(nx, ny) else -1)
+    slots = 4 * 6
+    assert game.find_nodes(0) == (((0, 0), (0, 1)), ((1, 0), (1, 1)))
+    assert game.find_nodes(slots + 7) == (((1, 1), (2, 1)), ((1, 2), (2, 2)))
+    assert game.tables.slot_cells.shape == (2 * slots, 2)
+    assert game.tables.goals[2] == [4 * 7 + y for y in range(7)]
@@ -0,0 +1,81 @@
+import numpy as np
+import replay_memory
+
+
+def make_states(count, size, offset=0):
+    return (np.arange(count * size).reshape(count, size) + offset) % 7
+
+
+def test_should_pick_smallest_state_type():
+    assert replay_memory.state_dtype(9, 9) == np.uint8
+    assert replay_memory.state_dtype(17, 17) == np.uint16
+    assert replay_memory.state_dtype(2, 2) == np.uint8
+
+
+def test_should_store_transitions_compactly():
+    memory = replay_memory.ReplayMemory(10, 86, num_of_actions=4)
+    state = np.arange(86, dtype=np.float64).reshape(1, 86)
+    memory.append(state, 3, 0.5, state + 1, True)
+    states, actions, rewards, next_states, dones = memory.get(np.array([0]))
+    assert len(memory) == 1
+    assert memory.data['state'].dtype == np.uint8
+    assert np.array_equal(states[0], state[0])
+    assert np.array_equal(next_states[0], state[0] + 1)
+    assert actions[0] == 3 and rewards[0] == 0.5 and dones[0]
+    assert memory.nbytes == 10 * (86 * 2 + 1 + 4 + 1)
+
+
+def test_should_overwrite_oldest_when_full():
+    memory = replay_memory.ReplayMemory(5, 3)
+    for i in range(7):
+        memory.append(np.full(3, i), i, 0, np.full(3, i), False)
+    assert len(memory) == 5
+    assert sorted(memory.data['action']) == [2, 3, 4, 5, 6]
+
+
+def test_should_extend_across_the_end_of_the_ring():
+    memory = replay_memory.ReplayMemory(5, 3)
+    memory.extend(make_states(3, 3), np.arange(3), np.zeros(3), make_states(3, 3), np.zeros(3, dtype=bool))
+    memory.extend(make_states(4, 3, 1), np.arange(3, 7), np.ones(4), make_states(4, 3, 1), np.ones(4, dtype=bool))
+    assert len(memory) == 5
+    assert memory.next == 2
+    assert memory.data['action'].tolist() == [5, 6, 2, 3, 4]
+    assert np.array_equal(memory.data['state'][0], make_states(4, 3, 1)[2])
+
+
+def test_should_sample_positive_transitions_by_index():
+    memory = replay_memory.ReplayMemory(100, 3, seed=0)
+    rewards = np.zeros(50)
+    rewards[[4, 17, 31]] = 1
+    memory.extend(make_states(50, 3), np.arange(50), rewards, make_states(50, 3), np.zeros(50, dtype=bool))
+    assert memory.positive_indices().tolist() == [4, 17, 31]
+    _, actions, rewards, _, _ = memory.sample(10, positive_batch_size=5)
+    assert len(actions) == 13
+    assert len(set(actions[:10])) == 10
+    assert sorted(actions[10:]) == [4, 17, 31]
+    assert (rewards[10:] == 1).all()
+    memory.append(np.zeros(3), 99, 2.0, np.zeros(3), True)
+    assert memory.positive_indices().tolist() == [4, 17, 31, 50]
+
+
+def test_should_size_actions_by_action_space():
+    assert replay_memory.action_dtype(4) == np.uint8
+    assert replay_memory.action_dtype(256) == np.uint8
+    assert replay_memory.action_dtype(516) == np.uint16
+    assert replay_memory.action_dtype() == np.uint16
+    memory = replay_memory.ReplayMemory(4, 3, num_of_actions=516)
+    memory.append(np.zeros(3), 515, 0, np.zeros(3), False)
+    assert memory.get(np.array([0]))[1][0] == 515
+
+
+def test_should_keep_positive_indices_through_overwrites():
+    memory = replay_memory.ReplayMemory(4, 3)
+    for reward in [1, 0, 1, 0]:
+        memory.append(np.zeros(3), 0, reward, np.zeros(3), False)
+    assert memory.positive_indices().tolist() == [0, 2]
+    memory.append(np.zeros(3), 0, 0, np.zeros(3), False)
+    memory.append(np.zeros(3), 0, 1, np.zeros(3), False)
+    assert memory.positive_indices().tolist() == [1, 2]
+    memory.extend(np.zeros((3, 3)), np.zeros(3), np.array([1, 0, 0]), np.zeros((3, 3)), np.zeros(3, dtype=bool))
+    assert memory.positive_indices().tolist() == [1, 2] and memory.next == 1
+    assert memory.positive_indices().tolist() == np.flatnonzero(memory.data['reward'] > 0).tolist()
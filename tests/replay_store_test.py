@@ -0,0 +1,60 @@
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+import replay_store
+
+
+def transitions(count, marker):
+    states = np.full((count, 4), marker)
+    return states, np.full(count, marker), np.arange(count) % 3, states + 1, np.zeros(count, dtype=bool)
+
+
+def test_should_reopen_with_previous_transitions(tmp_path):
+    path = str(tmp_path / 'replay.bin')
+    store = replay_store.ReplayStore(path, 4, flush_every=8)
+    store.extend(*transitions(20, 1))
+    for i in range(5):
+        store.append(np.full(4, 2), 2, 1.0, np.full(4, 3), True)
+    assert len(store) == 25
+    store.close()
+
+    store = replay_store.ReplayStore(path, 4)
+    assert len(store) == 25
+    assert store.view(20)['action'].tolist() == [2] * 5
+    assert store.positive_indices().tolist() == [1, 2, 4, 5, 7, 8, 10, 11, 13, 14, 16, 17, 19, 20, 21, 22, 23, 24]
+    states, actions, rewards, next_states, dones = store.sample(10, positive_batch_size=3)
+    assert len(actions) == 13
+    assert np.array_equal(next_states, states + 1)
+    assert isinstance(store.view(), np.memmap)
+    store.close()
+
+
+def test_should_reject_mismatched_layout(tmp_path):
+    path = str(tmp_path / 'replay.bin')
+    replay_store.ReplayStore(path, 4).close()
+    with pytest.raises(ValueError):
+        replay_store.ReplayStore(path, 5)
+
+
+def _append(path, marker):
+    store = replay_store.ReplayStore(path, 4)
+    for _ in range(10):
+        store.extend(*transitions(7, marker))
+    store.close()
+
+
+def test_should_append_from_several_processes(tmp_path):
+    path = str(tmp_path / 'replay.bin')
+    reader = replay_store.ReplayStore(path, 4)
+    workers = [mp.Process(target=_append, args=(path, marker)) for marker in range(1, 5)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert reader.refresh() == 280
+    records = reader.view()
+    for marker in range(1, 5):
+        assert (records['action'] == marker).sum() == 70
+    assert (records['state'] == records['action'][:, None]).all()
+    reader.close()
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+import quoridor_env
+import self_play
+
+
+def test_play_episode_records_learner_transitions():
+    env = quoridor_env.QuoridorEnv()
+    rnd = np.random.default_rng(0)
+    states, actions, rewards, next_states, dones = self_play.play_episode(env, lambda s: 2, 15, rnd)
+    assert len(states) == len(actions) == len(rewards) == len(next_states) == len(dones) <= 15
+    assert states.shape[1] == next_states.shape[1] == env.observation_space.n
+    assert (actions == 2).all()
+    # next_state is what the opponent sees right after the learner's move
+    assert (next_states[:, 0] != states[:, 0]).all()
+
+
+def test_play_episode_gives_the_learner_one_seat_of_four():
+    env = quoridor_env.QuoridorEnv(num_of_players=4, sx=5, sy=5)
+    rnd = np.random.default_rng(0)
+    states, _, _, next_states, _ = self_play.play_episode(env, lambda s: 2, 15, rnd)
+    # the learner is to move in every recorded state, the next seat right after its move
+    assert (states[:, 0] == states[0, 0]).all()
+    assert (next_states[:, 0] == (states[0, 0] + 1) % 4).all()
+
+
+def test_pool_streams_episodes_from_workers():
+    with self_play.SelfPlayPool(2, max_turns=20) as pool:
+        pool.update_weights(None, epsilon=1.0)
+        episodes = list(pool.collect(max_episodes=4, timeout=30))
+        while len(episodes) < 4:
+            episodes += list(pool.collect(max_episodes=4 - len(episodes), timeout=30))
+        assert pool.episodes == 4
+        assert pool.transitions == sum(len(episode[3]) for episode in episodes)
+    assert {episode[0] for episode in episodes} <= {0, 1}
+    for _, _, states, actions, rewards, next_states, dones in episodes:
+        assert states.dtype == self_play.STATE_DTYPE
+        assert 0 < len(actions) <= 20
+        assert not dones[:-1].any()
+
+
+def test_pool_workers_can_share_an_inference_server():
+    from inference_server import InferenceServer
+
+    def always_right(states):
+        q = np.zeros((len(states), 4), dtype=np.float32)
+        q[:, 1] = 1
+        return q
+
+    with InferenceServer(always_right, max_wait_us=2000) as server:
+        with self_play.SelfPlayPool(2, max_turns=5, epsilon=0.0, inference=server) as pool:
+            episodes = []
+            while len(episodes) < 2:
+                episodes += list(pool.collect(max_episodes=2 - len(episodes), timeout=30))
+        assert server.batches > 0
+    for episode in episodes:
+        assert (episode[3] == 1).all()
+
+
+def test_pool_workers_run_numpy_models():
+    from functools import partial
+    import numpy_model
+    size = quoridor_env.QuoridorEnv().observation_space.n
+    model = numpy_model.build_model(size, 4, seed=0)
+    weights = model.get_weights()
+    # the last layer ignores its input and always prefers action 2
+    weights[-2] = np.zeros_like(weights[-2])
+    weights[-1] = np.array([0, 0, 1, 0], dtype=np.float32)
+    with self_play.SelfPlayPool(1, partial(numpy_model.build_model, size, 4), max_turns=5, epsilon=0.0) as pool:
+        pool.update_weights(weights, epsilon=0.0)
+        # episodes started before the weights arrived carry an older version
+        deadline = time.monotonic() + 60
+        played = []
+        while not played and time.monotonic() < deadline:
+            played = [e for e in pool.collect(max_episodes=1, timeout=30) if e[1] == pool.version]
+    assert played
+    assert (played[0][3] == 2).all()
+
+
+def test_pool_plays_the_requested_board_size():
+    with self_play.SelfPlayPool(1, max_turns=10, num_of_players=4, sx=5, sy=5) as pool:
+        episodes = []
+        while not episodes:
+            episodes += list(pool.collect(max_episodes=1, timeout=30))
+    assert episodes[0][2].shape[1] == quoridor_env.observation_size(4, 5, 5)
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import server
+from zobrist import TranspositionTable
+
+
+class LinearModel:
+    def __init__(self, weights):
+        self.weights = weights
+        self.fitted = None
+
+    def predict(self, states, batch_size=None):
+        return np.asarray(states, dtype=np.float64) @ self.weights
+
+    def fit(self, x, y, batch_size=None, verbose=0):
+        self.fitted = (np.array(x), np.array(y))
+
+
+class FixedMemory:
+    def __init__(self, batch):
+        self.batch = batch
+
+    def sample(self, batch_size, positive_batch_size=0):
+        return self.batch
+
+
+def solver(model, batch, gamma):
+    res = object.__new__(server.D2Solver)
+    res.model = model
+    res.memory = FixedMemory(batch)
+    res.positive_batch_injection = 0
+    res.augment = False
+    res.gamma = gamma
+    res.env = SimpleNamespace(observation_space=SimpleNamespace(n=batch[0].shape[1]))
+    res.replay_batch = np.empty((0, batch[0].shape[1]), dtype=np.float32)
+    res.q_cache = TranspositionTable(16)
+    return res
+
+
+def test_replay_targets_match_per_transition_formula():
+    rnd = np.random.default_rng(0)
+    state_size, num_of_actions, count, gamma = 7, 4, 12, 0.9
+    model = LinearModel(rnd.normal(size=(state_size, num_of_actions)))
+    states = rnd.integers(0, 16, size=(count, state_size)).astype(np.uint8)
+    next_states = rnd.integers(0, 16, size=(count, state_size)).astype(np.uint8)
+    actions = rnd.integers(0, num_of_actions, size=count)
+    rewards = rnd.choice([-1.0, 0.0, 1.0], size=count).astype(np.float32)
+    dones = np.arange(count) % 3 == 0
+    d2 = solver(model, (states, actions, rewards, next_states, dones), gamma)
+    d2.q_cache.put(1, 'stale')
+
+    d2.replay(count)
+
+    expected = []
+    for state, action, reward, next_state, done in zip(states, actions, rewards, next_states, dones):
+        y_target = model.predict(state[None])
+        y_target[0][action] = reward if done else reward + gamma * np.max(model.predict(next_state[None])[0])
+        expected.append(y_target[0])
+    x, y = model.fitted
+    assert np.array_equal(x, states.astype(np.float32))
+    assert np.allclose(y, expected)
+    assert d2.q_cache.get(1) is None
+
+
+class RecordingPool:
+    def __init__(self):
+        self.results = []
+
+    def record(self, name, won):
+        self.results.append((name, won))
+
+
+def test_play_episode_gives_the_learner_one_seat():
+    pytest.importorskip('gym')
+    import quoridor_env
+    from instrumentation import Instruments
+    from replay_memory import ReplayMemory
+
+    for num_of_players in [2, 4]:
+        env = quoridor_env.QuoridorEnv(num_of_players=num_of_players, sx=5, sy=5)
+        d2 = object.__new__(server.D2Solver)
+        d2.env = env
+        d2.num_of_players = num_of_players
+        d2.instruments = Instruments()
+        d2.memory = ReplayMemory(10000, env.observation_space.n, num_of_actions=4)
+        d2.epsilon, d2.epsilon_min = 1.0, 1.0
+        d2.opponents = RecordingPool()
+        d2.search_opponent = None
+        d2.records = None
+        d2.choose_opponent = lambda: setattr(d2, 'opponent', 'past')
+        # seats the opponent is asked to move for
+        seats = []
+
+        def choose_op_action(state, epsilon):
+            seats.append(int(state[0][0]))
+            return np.random.randint(4)
+
+        d2.choose_op_action = choose_op_action
+        np.random.seed(0)
+        _, turns = d2.play_episode(0)
+        states = d2.memory.get(np.arange(len(d2.memory)))[0]
+        learner = states[0, 0]
+        assert (states[:, 0] == learner).all()
+        assert len(seats) == turns * (num_of_players - 1)
+        assert learner not in seats
+        finished, winner = env.game.is_finished()
+        assert d2.opponents.results == [('past', finished and winner == learner)]
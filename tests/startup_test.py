@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+# seconds for a cold `import <module>` in a fresh interpreter, numpy included
+IMPORT_BUDGETS = {'quoridor': 0.5, 'quoridor_env': 0.5, 'numpy_model': 0.5, 'server': 1.0}
+HEAVY_MODULES = ['gym', 'tensorflow', 'keras']
+ATTEMPTS = 3
+
+MEASURE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+'''
+
+
+def cold_import(module):
+    code = MEASURE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], cwd=SRC, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(out)
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS))
+def test_import_stays_within_cold_start_budget(module):
+    # best of a few runs, a busy machine should not fail the build
+    results = [cold_import(module) for _ in range(ATTEMPTS)]
+    assert results[0][1] == []
+    assert min(elapsed for elapsed, _ in results) < IMPORT_BUDGETS[module]
+
+
+def test_env_class_loads_gym_on_first_use():
+    pytest.importorskip('gym')
+    code = 'import sys, quoridor_env; quoridor_env.QuoridorEnv(); print("gym" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], cwd=SRC, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    assert out.split()[-1] == b'True'
+
+
+def test_register_is_idempotent():
+    gym = pytest.importorskip('gym')
+    import quoridor_env
+    quoridor_env.register()
+    quoridor_env.register()
+    env = gym.make(quoridor_env.ENV_ID)
+    assert isinstance(env.unwrapped, quoridor_env.QuoridorEnv)
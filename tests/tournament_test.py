@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+
+import numpy_model
+import tournament
+
+
+class CountingAgent(tournament.ModelAgent):
+    def __init__(self, model):
+        super().__init__(model)
+        self.calls = []
+
+    def act_many(self, games, players):
+        self.calls.append(len(games))
+        return super().act_many(games, players)
+
+
+def test_elo_of_scores():
+    assert tournament.elo(0.5) == 0
+    assert abs(tournament.elo(tournament.expected_score(200)) - 200) < 1e-9
+    rating, low, high = tournament.elo_interval([1, 0, 1, 0.5, 1, 1, 0, 1])
+    assert low < rating < high
+    assert rating > 0
+
+
+def test_sprt_decides_both_ways():
+    assert tournament.sprt([1.0] * 30)['decision'] == tournament.H1
+    assert tournament.sprt([0.0] * 30)['decision'] == tournament.H0
+    assert tournament.sprt([1.0, 0.0])['decision'] is None
+
+
+def test_model_agent_batches_every_game_of_a_chunk():
+    model = numpy_model.build_model(5 * 5 + 5, 4, seed=0)
+    a = CountingAgent(model)
+    b = tournament.make_agent(tournament.RANDOM, 4, seed=0)
+    scores = tournament.play_games(a, b, 8, 5, 5, max_moves=40)
+    assert len(scores) == 8
+    assert set(scores) <= {0.0, 0.5, 1.0}
+    # seats alternate, so half of the games have the model to move at every ply
+    assert a.calls[0] == 4
+
+
+def test_match_stops_early_with_sprt():
+    report = tournament.run_match(tournament.RANDOM, 'alpha_beta:0.002', max_games=400, workers=0, chunk=8,
+                                  sx=5, sy=5, num_of_actions=4)
+    assert report['sprt']['decision'] == tournament.H0
+    assert report['games'] < 400
+    assert report['elo_high'] < 0
+
+
+def test_match_on_process_pool(tmp_path):
+    path = str(tmp_path / 'model.npz')
+    numpy_model.export_model(numpy_model.build_model(5 * 5 + 5, 4, seed=1), path)
+    report = tournament.run_match(path, tournament.RANDOM, max_games=8, workers=2, chunk=2, use_sprt=False,
+                                  sx=5, sy=5, max_moves=40, num_of_actions=4)
+    assert report['games'] == 8
+    assert report['sprt'] is None
+
+
+def test_fit_ratings_orders_players():
+    results = [(0, 1, [1.0] * 8 + [0.0] * 2), (1, 2, [1.0] * 8 + [0.0] * 2), (0, 2, [1.0] * 10)]
+    ratings, errors = tournament.fit_ratings(3, results)
+    assert ratings[0] > ratings[1] > ratings[2]
+    assert abs(ratings.mean()) < 1e-6
+    assert (errors > 0).all()
+
+
+def test_round_robin_and_cli(tmp_path, capsys):
+    output = str(tmp_path / 'report.json')
+    assert tournament.main(['random', 'alpha_beta:0.002', '--games', '4', '--workers', '0', '--actions', '4',
+                            '--output', output]) == 0
+    with open(output) as f:
+        report = json.load(f)
+    assert report['games'] == 4
+    report = tournament.round_robin(['random', 'random', 'alpha_beta:0.002'], 4, workers=0, sx=5, sy=5,
+                                    num_of_actions=4)
+    assert len(report['pairs']) == 3
+    assert np.argmax(report['elo']) == 2
+    with pytest.raises(ValueError):
+        tournament.make_agent('minimax')
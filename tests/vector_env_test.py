@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import quoridor
+import vector_env
+
+pytest.importorskip('gym')
+import quoridor_env
+
+
+def random_actions(rnd, num_envs, num_of_moves):
+    steps = rnd.integers(0, 4, num_envs)
+    walls = rnd.integers(4, num_of_moves, num_envs)
+    return np.where(rnd.random(num_envs) < 0.6, steps, walls)
+
+
+@pytest.mark.parametrize('num_of_players,sx,sy', [(2, 9, 9), (4, 5, 7)])
+def test_should_match_single_envs_on_random_actions(num_of_players, sx, sy):
+    num_envs = 16
+    rnd = np.random.default_rng(0)
+    vector = vector_env.VectorQuoridorEnv(num_envs, num_of_players=num_of_players, sx=sx, sy=sy)
+    envs = [quoridor_env.QuoridorEnv(num_of_players=num_of_players, sx=sx, sy=sy) for _ in range(num_envs)]
+    observations = vector.reset()
+    for i, env in enumerate(envs):
+        assert np.array_equal(env._reset(), observations[i])
+
+    finished = 0
+    for _ in range(300):
+        actions = random_actions(rnd, num_envs, vector.num_of_possible_moves())
+        observations, rewards, done, info = vector.step(actions)
+        for i, env in enumerate(envs):
+            observation, reward, env_done, _ = env._step(actions[i])
+            assert np.array_equal(info['final_observation'][i], observation)
+            assert rewards[i] == reward
+            assert done[i] == env_done
+            if env_done:
+                finished += 1
+                observation = env._reset()
+            assert np.array_equal(observations[i], observation)
+    assert finished > 0
+
+
+def test_should_match_games_with_four_players():
+    vector = vector_env.VectorQuoridorEnv(4, num_of_players=4, sx=5, sy=5)
+    vector.reset()
+    games = [quoridor.QuoridorGame(4, 5, 5) for _ in range(4)]
+    rnd = np.random.default_rng(1)
+    for _ in range(40):
+        actions = random_actions(rnd, 4, vector.num_of_possible_moves())
+        players = vector.player.copy()
+        _, _, done, info = vector.step(actions)
+        for i, game in enumerate(games):
+            game.do_move(actions[i], players[i])
+            assert np.array_equal(info['final_observation'][i][1:], game.get_game_state(0)[1:])
+            if done[i]:
+                games[i] = quoridor.QuoridorGame(4, 5, 5)
+
+
+def test_pawn_distances_match_shortest_path():
+    game = quoridor.QuoridorGame(2, 3, 3)
+    game.remove_edge((0, 1), (0, 2))
+    game.remove_edge((1, 1), (1, 2))
+    boards = game.board[None].astype(np.int64)
+    positions = game.positions[None].astype(np.int64)
+    distances = vector_env.pawn_distances(boards, positions, vector_env.goal_masks(2, 3, 3))
+    assert distances.tolist() == [[game.shortest_path_for_player_to_win(0), game.shortest_path_for_player_to_win(1)]]
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+import quoridor
+import zobrist
+
+
+@pytest.mark.parametrize('engine', [quoridor.ENGINE_ARRAY, quoridor.ENGINE_BITBOARD])
+def test_hash_should_follow_moves_incrementally(engine):
+    rnd = random.Random(1)
+    game = quoridor.create_game(4, 7, 7, engine)
+    for turn in range(150):
+        move = rnd.randrange(4) if rnd.random() < 0.5 else rnd.randrange(4, game.num_of_possible_moves())
+        game.do_move(move, turn % 4)
+        assert game.hash == game.zobrist.compute(game.positions, game.dominoes, game.board)
+
+
+def test_hash_should_match_between_engines_and_transpositions():
+    game = quoridor.create_game(2, 9, 9)
+    fast = quoridor.create_game(2, 9, 9, quoridor.ENGINE_BITBOARD)
+    for move, player in [(quoridor.MOVE_RIGHT, 0), (20, 1), (quoridor.MOVE_LEFT, 0)]:
+        game.do_move(move, player)
+        fast.do_move(move, player)
+    assert game.hash == fast.hash
+    # pawn went right and back: same position as a game with only the wall
+    other = quoridor.create_game(2, 9, 9)
+    other.do_move(20, 1)
+    assert other.hash == game.hash
+    assert game.state_hash(0) != game.state_hash(1)
+
+
+def test_hash_should_survive_init_from_state():
+    game = quoridor.create_game(2, 5, 5)
+    game.do_move(7, 0)
+    game.do_move(quoridor.MOVE_DOWN, 1)
+    copy = quoridor.create_game(2, 5, 5)
+    copy.init_from_state(game.get_game_state(0)[1:])
+    assert copy.hash == game.hash
+
+
+def test_lru_table_should_evict_least_recently_used():
+    table = zobrist.TranspositionTable(2)
+    table.put(1, 'a')
+    table.put(2, 'b')
+    assert table.get(1) == 'a'
+    table.put(3, 'c')
+    assert table.get(2) is None
+    assert table.get(3) == 'c'
+    assert table.stats() == {'size': 2, 'capacity': 2, 'hits': 2, 'misses': 1, 'hit_rate': 2 / 3,
+                             'stores': 3, 'evictions': 1}
+
+
+def test_depth_table_should_keep_deeper_entries():
+    table = zobrist.TranspositionTable(4, zobrist.POLICY_DEPTH)
+    table.put(1, 'deep', depth=5)
+    table.put(5, 'shallow', depth=2)
+    assert table.get(1) == 'deep'
+    assert table.get(5) is None
+    assert table.get(1, min_depth=6) is None
+    table.put(9, 'deeper', depth=7)
+    assert table.get(9) == 'deeper'
+    assert table.evictions == 1
+
+
+def test_env_should_cache_rewards():
+    pytest.importorskip('gym')
+    import quoridor_env
+    env = quoridor_env.QuoridorEnv(cache=zobrist.TranspositionTable(100))
+    env._reset()
+    # both pawns step right and back, so every position comes round again
+    for _ in range(3):
+        for move in [quoridor.MOVE_RIGHT, quoridor.MOVE_RIGHT, quoridor.MOVE_LEFT, quoridor.MOVE_LEFT]:
+            env._step(move)
+    assert env.cache.hits > 0